@@ -1,3 +1,15 @@
-from . import configure, core, draw, io, interp, retrieve, qc
+import importlib
+
 __all__ = ["configure", "core", "draw", "io", "interp", "qc", "retrieve"]
 
+def __getattr__(name):
+    """
+    子模块在第一次访问时才导入, import pycwr.io不会导入draw(matplotlib/cartopy)等用不到的依赖
+    """
+    if name in __all__:
+        module = globals()[name] = importlib.import_module("." + name, __name__)
+        return module
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,6 +1,4 @@
 # -*- coding: utf-8 -*-
-import cartopy.io.shapereader as shpreader
-import pandas as pd
 import os
 
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -9,5 +7,42 @@ CN_shp_path = os.path.join(ROOT_DIR, "data", "CHN_pronvices.shp")
 last_open_dir = os.path.join(ROOT_DIR, "data", "default_opendir.json")
 mbf_path = os.path.join(ROOT_DIR, "data", "beta_function_parameters.nc")
 
-radar_info = pd.read_json(Radar_info_Path)
-CN_shp_info = shpreader.Reader(CN_shp_path)
+def _load_radar_info():
+    """雷达站信息表, pandas.DataFrame"""
+    import pandas as pd
+    return pd.read_json(Radar_info_Path)
+
+def _load_CN_shp_info():
+    """中国省界的shapefile"""
+    import cartopy.io.shapereader as shpreader
+    return shpreader.Reader(CN_shp_path)
+
+def _load_station_index():
+    """
+    站点表的索引, 不依赖pandas, 按站号查找时只需一次dict查找
+    :return: ({站号(int): 行号}, {列名: np.ndarray}), 数值列为float64, 其余为object, 缺测为nan
+    """
+    import json
+    import numpy as np
+    with open(Radar_info_Path, "r") as f:
+        table = json.load(f)
+    keys = list(next(iter(table.values())))
+    rows = {int(key): row for row, key in enumerate(keys)}
+    columns = {}
+    for name, values in table.items():
+        values = [np.nan if values.get(key) is None else values[key] for key in keys]
+        numeric = all(isinstance(value, (int, float)) for value in values)
+        columns[name] = np.array(values, dtype=np.float64 if numeric else object)
+    return rows, columns
+
+_lazy_resources = {"radar_info": _load_radar_info, "CN_shp_info": _load_CN_shp_info,
+                   "station_index": _load_station_index}
+
+def __getattr__(name):
+    """
+    radar_info, station_index和CN_shp_info在第一次用到时才读取(连同pandas/cartopy的导入), 之后作为模块属性缓存
+    """
+    if name in _lazy_resources:
+        value = globals()[name] = _lazy_resources[name]()
+        return value
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
@@ -5,6 +5,8 @@
 """
 import numpy as np
 import xarray as xr
+from xarray.backends import BackendArray
+from xarray.core import indexing
 import pyproj
 from ..configure.default_config import DEFAULT_METADATA, CINRAD_field_mapping
 from ..core.transforms import  cartesian_to_geographic_aeqd,\
@@ -12,6 +14,153 @@ from ..core.transforms import  cartesian_to_geographic_aeqd,\
     antenna_vectors_to_cartesian_vcs
 from .RadarGridC import get_CR_xy, get_CAPPI_xy
 
+class _SweepGeolocation(object):
+    """
+    一个sweep中每个库的x, y, z, lat, lon, 第一次用到时才计算, 之后直接用缓存
+    """
+    def __init__(self, range, azimuth, elevation, altitude, longitude, latitude):
+        self.range = range
+        self.azimuth = azimuth
+        self.elevation = elevation
+        self.altitude = altitude
+        self.longitude = longitude
+        self.latitude = latitude
+        self.shape = (len(azimuth), len(range))
+        self._cache = {}
+
+    def __getitem__(self, name):
+        if name not in self._cache:
+            if name in ("x", "y", "z"):
+                self._cache["x"], self._cache["y"], self._cache["z"] = \
+                    antenna_vectors_to_cartesian_cwr(self.range, self.azimuth, self.elevation, self.altitude)
+            else:
+                self._cache["lon"], self._cache["lat"] = cartesian_to_geographic_aeqd(self["x"], self["y"],
+                                                                                      self.longitude, self.latitude)
+        return self._cache[name]
+
+    def __deepcopy__(self, memo):
+        ##xarray的swap_dims/sortby等操作会深拷贝变量, 共用同一份缓存, 避免重复计算
+        return self
+
+    def lazy(self, name):
+        """
+        :param name: x, y, z, lat, lon
+        :return: 可以作为xarray变量数据的延迟数组
+        """
+        return indexing.LazilyIndexedArray(_LazyGeolocationArray(self, name))
+
+class _LazyGeolocationArray(BackendArray):
+    """xarray取值时才向_SweepGeolocation要数据"""
+    def __init__(self, geolocation, name):
+        self.geolocation = geolocation
+        self.name = name
+        self.shape = geolocation.shape
+        self.dtype = np.dtype("float64")
+
+    def __getitem__(self, key):
+        return indexing.explicit_indexing_adapter(key, self.shape, indexing.IndexingSupport.BASIC,
+                                                  self._getitem)
+
+    def _getitem(self, key):
+        return self.geolocation[self.name][key]
+
+class _PackedFieldArray(BackendArray):
+    """
+    以整型编码保存的要素, 取值时才解码为float32: (code - offset) / scale, code == fill为nan
+    """
+    def __init__(self, codes, scale, offset, fill):
+        self.codes = codes
+        self.encoding = (codes.dtype.str, scale, offset, fill)
+        self.scale = np.float32(scale)
+        self.offset = np.float32(offset)
+        self.fill = fill
+        self.shape = codes.shape
+        self.dtype = np.dtype("float32")
+
+    @classmethod
+    def pack(cls, value, dtype, scale, offset, fill):
+        """
+        :param value: 由整型编码解码得到的物理量, nan为缺测
+        :param dtype: 编码的类型, 如"u1", "u2", "i2"
+        :return: _PackedFieldArray
+        """
+        code = np.rint(value.astype(np.float64) * scale + offset)
+        return cls(np.where(np.isnan(value), fill, code).astype(dtype), scale, offset, fill)
+
+    def __getitem__(self, key):
+        return indexing.explicit_indexing_adapter(key, self.shape, indexing.IndexingSupport.BASIC,
+                                                  self._getitem)
+
+    def _getitem(self, key):
+        code = self.codes[key]
+        dat = np.asarray(code, dtype=np.float32)
+        dat -= self.offset
+        dat /= self.scale
+        dat[code == self.fill] = np.nan
+        return dat
+
+def _set_sweep_field(ppi, key, dat):
+    """
+    :param ppi: 一个sweep的xr.Dataset
+    :param key: 要素名
+    :param dat: (nrays, nbins)的物理量, 或_PackedFieldArray(保存整型编码, 取值时才解码)
+    """
+    if isinstance(dat, _PackedFieldArray):
+        ppi[key] = (['time', 'range'], indexing.LazilyIndexedArray(dat))
+        dtype, scale, offset, fill = dat.encoding
+        ##pycwr_packed标记该变量的数据就是dat, 切片/复制时保留, 计算/重新赋值后没有; 写netcdf时忽略
+        ppi[key].encoding = {"dtype": np.dtype(dtype), "scale_factor": 1. / scale,
+                             "add_offset": -offset / scale, "_FillValue": fill, "pycwr_packed": id(dat)}
+    else:
+        ppi[key] = (['time', 'range'], dat)
+    ppi[key].attrs = DEFAULT_METADATA[CINRAD_field_mapping[key]]
+
+def _sweep_dataset(time, geo):
+    """
+    生成一个sweep只含坐标的xr.Dataset, 要素用_set_sweep_field添加
+    :param time: (nrays)
+    :param geo: 该sweep的_SweepGeolocation, x, y, z, lat, lon在第一次用到时才计算
+    :return: xr.Dataset
+    """
+    ppi = xr.Dataset(coords={'azimuth': (['time', ], geo.azimuth),
+                             'elevation': (['time',], geo.elevation),
+                             'x':(['time','range'], geo.lazy('x')),
+                             'y':(['time', 'range'], geo.lazy('y')),
+                             'z':(['time', 'range'], geo.lazy('z')),
+                             'lat':(['time','range'], geo.lazy('lat')),
+                             'lon':(['time','range'], geo.lazy('lon')),
+                             'range': geo.range, 'time': time})
+    ppi.azimuth.attrs = DEFAULT_METADATA['azimuth']
+    ppi.elevation.attrs = DEFAULT_METADATA['elevation']
+    ppi.range.attrs = DEFAULT_METADATA['range']
+    ppi.time.attrs = DEFAULT_METADATA['time']
+    ppi.x.attrs = DEFAULT_METADATA['x']
+    ppi.y.attrs = DEFAULT_METADATA['y']
+    ppi.z.attrs = DEFAULT_METADATA['z']
+    ppi.lon.attrs = DEFAULT_METADATA['lon']
+    ppi.lat.attrs = DEFAULT_METADATA['lat']
+    return ppi
+
+class _VolumeFields(object):
+    """
+    类似dict, {要素名: (nrays, nbins)}, 取值时才由PRD各sweep的数据拼接, 不足nbins的部分为nan
+    """
+    def __init__(self, sweeps, nbins):
+        self.sweeps = sweeps
+        self.nbins = nbins
+
+    def keys(self):
+        return self.sweeps[0].data_vars.keys()
+
+    def __getitem__(self, key):
+        out = np.full((sum(ppi.sizes["time"] for ppi in self.sweeps), self.nbins), np.nan, dtype=np.float32)
+        istart = 0
+        for ppi in self.sweeps:
+            dat = ppi[key].values
+            out[istart:istart + dat.shape[0], :dat.shape[1]] = dat
+            istart += dat.shape[0]
+        return out
+
 class PRD(object):
     """
     Polarimetry Radar Data (PRD)
@@ -69,41 +218,44 @@ class PRD(object):
         Number of rays in the volume.
     nsweeps : int
         Number of sweep in the volume.
+    pyart_radar : Radar or callable
+        Py-ART Radar object, or a function returning it. A function is
+        called on the first :py:func:`ToPyartRadar`, so the Py-ART copy
+        of the fields is only built when it is actually used.
+    field_encoding : list (nsweeps) of dict, optional
+        Per sweep ``{field: (dtype, scale, offset, fill)}`` of the raw gate
+        codes, value = (code - offset) / scale. When given, those fields
+        are kept as integer codes and decoded to float32 on access; fields
+        without an encoding are stored as float.
+    pyart_meta : dict, optional
+        Py-ART Radar information not held by the PRD: original_container,
+        radar_name, meters_between_gates and instrument_parameters
+        ``{name: data}``. Used when the Radar is built from the PRD itself
+        (see :py:func:`ToPyartRadar`).
 
     """
 
     def __init__(self, fields,  scan_type, time, range, azimuth, elevation,latitude,
                  longitude, altitude, sweep_start_ray_index, sweep_end_ray_index,
                  fixed_angle, bins_per_sweep, nyquist_velocity, frequency, unambiguous_range,
-                 nrays, nsweeps, sitename, pyart_radar=None):
+                 nrays, nsweeps, sitename, pyart_radar=None, field_encoding=None, pyart_meta=None):
         super(PRD, self).__init__()
         keys = fields.keys()
         self.fields = []
+        ##各sweep生成时的xr.Dataset, _SweepGeolocation和{要素名: _PackedFieldArray}, 不依赖xarray内部的数据结构
+        self._sweeps = []
         for idx, (istart, iend) in enumerate(zip(sweep_start_ray_index, sweep_end_ray_index)):
-            x, y, z = antenna_vectors_to_cartesian_cwr(range[:bins_per_sweep[idx]], azimuth[istart:iend+1],\
-                                                   elevation[istart:iend+1], altitude)
-            lon, lat = cartesian_to_geographic_aeqd(x, y, longitude, latitude)
-            isweep_data = xr.Dataset(coords={'azimuth': (['time', ], azimuth[istart:iend+1]),
-                                            'elevation': (['time',], elevation[istart:iend+1]),
-                                             'x':(['time','range'], x),
-                                             'y':(['time', 'range'], y),
-                                             'z':(['time', 'range'], z),
-                                             'lat':(['time','range'], lat),
-                                             'lon':(['time','range'], lon),
-                                            'range': range[:bins_per_sweep[idx]], 'time': time[istart:iend+1]})
-            isweep_data.azimuth.attrs = DEFAULT_METADATA['azimuth']
-            isweep_data.elevation.attrs = DEFAULT_METADATA['elevation']
-            isweep_data.range.attrs = DEFAULT_METADATA['range']
-            isweep_data.time.attrs = DEFAULT_METADATA['time']
-            isweep_data.x.attrs = DEFAULT_METADATA['x']
-            isweep_data.y.attrs = DEFAULT_METADATA['y']
-            isweep_data.z.attrs = DEFAULT_METADATA['z']
-            isweep_data.lon.attrs = DEFAULT_METADATA['lon']
-            isweep_data.lat.attrs = DEFAULT_METADATA['lat']
-            for ikey in keys:
-                isweep_data[ikey] = (['time','range'], fields[ikey][istart:iend+1, :bins_per_sweep[idx]])
-                isweep_data[ikey].attrs = DEFAULT_METADATA[CINRAD_field_mapping[ikey]]
+            geo = _SweepGeolocation(range[:bins_per_sweep[idx]], azimuth[istart:iend+1], elevation[istart:iend+1],
+                                    altitude, longitude, latitude)
+            isweep_data = _sweep_dataset(time[istart:iend+1], geo)
             self.fields.append(isweep_data)
+            self._sweeps.append((isweep_data, geo, {}))
+            for ikey in keys:
+                dat = fields[ikey][istart:iend+1, :bins_per_sweep[idx]]
+                encoding = None if field_encoding is None else field_encoding[idx].get(ikey, None)
+                if encoding is not None:  ##保存整型编码, 取值时才解码
+                    dat = _PackedFieldArray.pack(dat, *encoding)
+                self._set_field(idx, ikey, dat)
         self.scan_info = xr.Dataset(data_vars={"latitude":latitude,"longitude":longitude,
                         "altitude":altitude,"scan_type":scan_type,  "frequency":frequency,
                         "start_time":time[0], "end_time":time[-1],
@@ -128,12 +280,240 @@ class PRD(object):
         self.nsweeps = nsweeps
         self.nrays = nrays
         self.sitename = sitename
-        self.get_vol_data()
+        self._vol = None  ##(生成时各sweep的dBZ变量, 插值用的体扫数据), 变量为None时为直接赋值的vol
         self.product = xr.Dataset()
-        self.PyartRadar = pyart_radar
+        self._pyart_radar = pyart_radar  ##Py-ART Radar或生成它的函数, 第一次用到时才生成
+        self._pyart_meta = pyart_meta
+
+    def _set_field(self, isweep, key, dat):
+        """
+        :param dat: (nrays, nbins)的物理量, 或_PackedFieldArray
+        """
+        ppi, _, packed = self._sweeps[isweep]
+        _set_sweep_field(ppi, key, dat)
+        if isinstance(dat, _PackedFieldArray):
+            packed[key] = dat
+
+    def _packed_field(self, isweep, key):
+        """
+        :return: 第isweep个sweep中要素key的_PackedFieldArray, 该sweep已被替换(切片/排序)或该要素已被重新赋值时为None
+        """
+        if isweep >= len(self._sweeps):
+            return None
+        ppi, _, packed = self._sweeps[isweep]
+        dat = packed.get(key, None)
+        if dat is None or self.fields[isweep] is not ppi or key not in ppi.data_vars or \
+                ppi[key].encoding.get("pycwr_packed", None) != id(dat):
+            return None
+        return dat
 
     def ToPyartRadar(self):
-        return self.PyartRadar
+        """
+        第一次调用时才生成Py-ART的Radar对象, 之后直接返回缓存的对象
+        没有给出pyart_radar时(如多进程读取, 缓存, load_prd)由PRD中的数据生成
+        :return: pycwr.core.PyartRadar.Radar
+        """
+        if self._pyart_radar is None:
+            self._pyart_radar = self._build_pyart_radar()
+        elif callable(self._pyart_radar):
+            self._pyart_radar = self._pyart_radar()
+        return self._pyart_radar
+
+    def _build_pyart_radar(self):
+        """
+        由PRD中的数据生成Py-ART的Radar对象, 与各格式ToPyartRadar的结果相同
+        PRD中没有的信息取自pyart_meta, 没有时由PRD估计
+        :return: pycwr.core.PyartRadar.Radar
+        """
+        from netCDF4 import date2num
+        from ..configure.pyart_config import get_metadata, get_fillvalue
+        from ..io.util import make_time_unit_str
+        from .PyartRadar import Radar
+        scan_info = self.scan_info
+        pyart_meta = self._pyart_meta if self._pyart_meta is not None else {}
+        dts = np.concatenate([ppi.time.values for ppi in self.fields]).astype("datetime64[us]").astype(object)
+        units = make_time_unit_str(min(dts))
+        time = get_metadata('time')
+        time['units'] = units
+        time['data'] = date2num(dts, units).astype('float32')
+
+        _range = get_metadata('range')
+        _range['data'] = max([ppi.range.values for ppi in self.fields], key=len)
+        gate_width = pyart_meta.get("meters_between_gates", _range['data'][0])  ##第一个库的中心距离为库长
+        _range['meters_to_center_of_first_gate'] = gate_width
+        _range['meters_between_gates'] = gate_width
+
+        latitude = get_metadata('latitude')
+        longitude = get_metadata('longitude')
+        altitude = get_metadata('altitude')
+        latitude['data'] = np.array([scan_info["latitude"].values], dtype='float64')
+        longitude['data'] = np.array([scan_info["longitude"].values], dtype='float64')
+        altitude['data'] = np.array([scan_info["altitude"].values], dtype='float64')
+
+        metadata = get_metadata('metadata')
+        metadata['original_container'] = pyart_meta.get("original_container", "pycwr")
+        metadata['site_name'] = self.sitename
+        metadata['radar_name'] = pyart_meta.get("radar_name", "pycwr")
+
+        rays_per_sweep = scan_info["rays_per_sweep"].values
+        sweep_start_ray_index = get_metadata('sweep_start_ray_index')
+        sweep_end_ray_index = get_metadata('sweep_end_ray_index')
+        sweep_end_ray_index['data'] = np.cumsum(rays_per_sweep) - 1
+        sweep_start_ray_index['data'] = sweep_end_ray_index['data'] - rays_per_sweep + 1
+
+        sweep_number = get_metadata('sweep_number')
+        sweep_number['data'] = np.arange(self.nsweeps, dtype='int32')
+
+        scan_type = str(scan_info["scan_type"].values)
+        sweep_mode = get_metadata('sweep_mode')
+        sweep_mode['data'] = np.array(self.nsweeps * [{"ppi": "azimuth_surveillance", "rhi": "rhi"}.get(
+            scan_type, "sector")], dtype='S')
+
+        elevation = get_metadata('elevation')
+        elevation['data'] = np.concatenate([ppi.elevation.values for ppi in self.fields])
+        azimuth = get_metadata('azimuth')
+        azimuth['data'] = np.concatenate([ppi.azimuth.values for ppi in self.fields])
+        fixed_angle = get_metadata('fixed_angle')
+        fixed_angle['data'] = scan_info["fixed_angle"].values
+
+        instrument = pyart_meta.get("instrument_parameters", None)
+        if instrument is None:
+            instrument = {"frequency": np.array([scan_info["frequency"].values * 10 ** 9], dtype='float32'),
+                          "nyquist_velocity": np.repeat(scan_info["nyquist_velocity"].values, rays_per_sweep)}
+        instrument_parameters = {}
+        for key, value in instrument.items():
+            instrument_parameters[key] = get_metadata(key)
+            instrument_parameters[key]['data'] = value
+
+        fields = {}
+        volume = self.get_volume_fields(len(_range['data']))
+        for field_name_abbr in volume.keys():
+            field_name = CINRAD_field_mapping[field_name_abbr]
+            if field_name is None:
+                continue
+            dat = volume[field_name_abbr]
+            field_dic = get_metadata(field_name)
+            field_dic['data'] = np.ma.masked_array(dat, mask=np.isnan(dat), fill_value=get_fillvalue())
+            field_dic['_FillValue'] = get_fillvalue()
+            fields[field_name] = field_dic
+        return Radar(time, _range, fields, metadata, scan_type,
+                     latitude, longitude, altitude,
+                     sweep_number, sweep_mode, fixed_angle, sweep_start_ray_index,
+                     sweep_end_ray_index,
+                     azimuth, elevation,
+                     instrument_parameters=instrument_parameters)
+
+    def to_cfradial(self, filename, fields=None, packed=False, zlib=True, complevel=4, shuffle=True,
+                    chunk_rays=None):
+        """
+        不经过Py-ART, 直接写为CfRadial格式, 要素逐sweep写入分块压缩的变量
+        :param filename: 输出的文件名
+        :param fields: 需要写入的要素名, 如["dBZ", "V"], None为全部
+        :param packed: True时要素保存为int16(scale_factor/add_offset), 否则为float32
+        :param zlib: 是否压缩
+        :param complevel: 压缩等级 1~9
+        :param shuffle: 压缩前是否做shuffle
+        :param chunk_rays: 每个分块的径向数, None为最大的sweep径向数
+        :return:
+        """
+        from ..io.CfRadialWriter import write_cfradial
+        return write_cfradial(self, filename, fields=fields, packed=packed, zlib=zlib, complevel=complevel,
+                              shuffle=shuffle, chunk_rays=chunk_rays)
+
+    def save(self, filename, geolocation=True):
+        """
+        保存为可以memmap的二进制文件, 用pycwr.io.load_prd读取, 不需要重新解码
+        :param filename: 输出的文件名
+        :param geolocation: 是否同时保存各sweep的x, y, z, lat, lon, 读取后不需要重新计算
+        :return:
+        """
+        from ..io.PRDFile import save_prd
+        return save_prd(self, filename, geolocation=geolocation)
+
+    def _to_arrays(self, geolocation=False):
+        """
+        将PRD拆成可以直接传输/保存的numpy数组和少量元数据, 不含product和Py-ART Radar(由pyart_meta重新生成)
+        :param geolocation: 是否包含各sweep的x, y, z, lat, lon(没有计算过的会先计算)
+        :return: meta(dict), arrays({名称: np.ndarray})
+        """
+        scan_info = self.scan_info
+        arrays = {"time": np.concatenate([ppi.time.values for ppi in self.fields]),
+                  "azimuth": np.concatenate([ppi.azimuth.values for ppi in self.fields]),
+                  "elevation": np.concatenate([ppi.elevation.values for ppi in self.fields]),
+                  "range": max([ppi.range.values for ppi in self.fields], key=len),
+                  "bins_per_sweep": np.array([ppi.sizes["range"] for ppi in self.fields]),
+                  "rays_per_sweep": scan_info["rays_per_sweep"].values,
+                  "fixed_angle": scan_info["fixed_angle"].values,
+                  "nyquist_velocity": scan_info["nyquist_velocity"].values,
+                  "unambiguous_range": scan_info["unambiguous_range"].values}
+        keys, encoding = [], []
+        for isweep, ppi in enumerate(self.fields):
+            keys.append(list(ppi.data_vars))
+            encoding.append({})
+            for ikey in ppi.data_vars:
+                packed = self._packed_field(isweep, ikey)
+                if packed is not None:  ##未经切片/排序的整型编码
+                    arrays["%d/%s" % (isweep, ikey)] = packed.codes
+                    encoding[isweep][ikey] = packed.encoding
+                else:
+                    arrays["%d/%s" % (isweep, ikey)] = ppi[ikey].values
+            if geolocation:
+                for iname in ("x", "y", "z", "lat", "lon"):
+                    arrays["%d/geolocation/%s" % (isweep, iname)] = ppi[iname].values
+        meta = {"sitename": self.sitename, "scan_type": str(scan_info["scan_type"].values),
+                "latitude": float(scan_info["latitude"].values), "longitude": float(scan_info["longitude"].values),
+                "altitude": float(scan_info["altitude"].values), "frequency": float(scan_info["frequency"].values),
+                "nsweeps": self.nsweeps, "nrays": self.nrays, "keys": keys, "encoding": encoding}
+        if self._pyart_meta is not None:
+            meta["pyart"] = {key: value for key, value in self._pyart_meta.items() if key != "instrument_parameters"}
+            for key, value in self._pyart_meta.get("instrument_parameters", {}).items():
+                arrays["pyart/" + key] = np.asarray(value)
+        return meta, arrays
+
+    @classmethod
+    def _from_arrays(cls, meta, arrays, pyart_radar=None):
+        """
+        由_to_arrays的结果重建PRD
+        :param pyart_radar: Py-ART Radar或生成它的函数, None时由重建的PRD生成
+        :return: PRD
+        """
+        pyart_meta = meta.get("pyart", None)
+        if pyart_meta is not None:
+            pyart_meta = dict(pyart_meta, instrument_parameters={key[len("pyart/"):]: value for key, value in \
+                                                                  arrays.items() if key.startswith("pyart/")})
+        sweep_end_ray_index = np.cumsum(arrays["rays_per_sweep"]) - 1
+        prd = cls(fields={}, scan_type=meta["scan_type"], time=arrays["time"], range=arrays["range"],
+                  azimuth=arrays["azimuth"], elevation=arrays["elevation"], latitude=meta["latitude"],
+                  longitude=meta["longitude"], altitude=meta["altitude"],
+                  sweep_start_ray_index=sweep_end_ray_index - arrays["rays_per_sweep"] + 1,
+                  sweep_end_ray_index=sweep_end_ray_index, fixed_angle=arrays["fixed_angle"],
+                  bins_per_sweep=arrays["bins_per_sweep"], nyquist_velocity=arrays["nyquist_velocity"],
+                  frequency=meta["frequency"], unambiguous_range=arrays["unambiguous_range"], nrays=meta["nrays"],
+                  nsweeps=meta["nsweeps"], sitename=meta["sitename"], pyart_radar=pyart_radar,
+                  pyart_meta=pyart_meta)
+        for isweep in range(len(prd.fields)):
+            for ikey in meta["keys"][isweep]:
+                dat = arrays["%d/%s" % (isweep, ikey)]
+                encoding = meta["encoding"][isweep].get(ikey, None)
+                if encoding is not None:
+                    dat = _PackedFieldArray(dat, *encoding[1:])
+                prd._set_field(isweep, ikey, dat)
+            geo = prd._sweeps[isweep][1]
+            if "%d/geolocation/x" % isweep in arrays:  ##直接使用保存的x, y, z, lat, lon
+                geo._cache.update({iname: arrays["%d/geolocation/%s" % (isweep, iname)] for iname in \
+                                   ("x", "y", "z", "lat", "lon")})
+        return prd
+
+    def get_volume_fields(self, nbins):
+        """
+        :param nbins: 体扫的库数
+        :return: 类似dict, {要素名: (nrays, nbins)}, 取值时才由各sweep拼接, 不足nbins的部分为nan
+        """
+        return _VolumeFields(self.fields, nbins)
+
+    @property
+    def PyartRadar(self):
+        return self.ToPyartRadar()
 
     def ordered_az(self, inplace=False):
         """
@@ -289,20 +669,50 @@ class PRD(object):
 
     def get_vol_data(self, field_name="dBZ", fillvalue=-999.):
         """
-        获取用于插值的雷达体扫数据
-        :return:
+        生成用于插值的雷达体扫数据, 每次调用都重新生成, dBZ的结果同时更新vol
+        fields中的数据被原地修改后, 调用它使之后的产品用新的数据
+        :param field_name: 要素名
+        :param fillvalue: 缺测值
+        :return: vol_azimuth, vol_range, fix_elevation, vol_value, radar_height, radar_lon_0, radar_lat_0
+        """
+        variables = [ppi[field_name].variable for ppi in self.fields]
+        fixed_angle = self.scan_info["fixed_angle"].values
+        sweep_order = np.argsort(fixed_angle)
+        vol_azimuth, vol_range, vol_value = [], [], []
+        for isweep in sweep_order:  ##按仰角排序, 每个sweep内按方位角排序
+            azimuth = self.fields[isweep].azimuth.values
+            az_order = np.argsort(azimuth, kind="stable")
+            value = variables[isweep].values[az_order]
+            vol_azimuth.append(azimuth[az_order])
+            vol_range.append(self.fields[isweep].range.values)
+            vol_value.append(np.where(np.isnan(value), fillvalue, value).astype(np.float64))
+        radar_height = float(self.scan_info["altitude"].values)
+        radar_lon_0 = float(self.scan_info["longitude"].values)
+        radar_lat_0 = float(self.scan_info["latitude"].values)
+        vol = vol_azimuth, vol_range, fixed_angle[sweep_order].astype(np.float64), vol_value, radar_height, \
+              radar_lon_0, radar_lat_0
+        if field_name == "dBZ" and fillvalue == -999.:
+            self._vol = (variables, vol)
+        return vol
+
+    @property
+    def vol(self):
         """
-        order_vol = self.ordered_az()
-        order_vol.fields = [order_vol.fields[i] for i in order_vol.scan_info["fixed_angle"].argsort().values]
-        order_vol.scan_info["fixed_angle"] = order_vol.scan_info["fixed_angle"].sortby("sweep")
-        vol_azimuth = [ppi.azimuth.values for ppi in order_vol.fields]
-        vol_range = [ppi.range.values for ppi in order_vol.fields]
-        fix_elevation = order_vol.scan_info["fixed_angle"].values
-        vol_value = [np.where(np.isnan(ppi[field_name].values), fillvalue, ppi[field_name].values).astype(np.float64) for ppi in order_vol.fields]
-        radar_height = float(order_vol.scan_info["altitude"].values)
-        radar_lon_0 = float(order_vol.scan_info["longitude"].values)
-        radar_lat_0 = float(order_vol.scan_info["latitude"].values)
-        self.vol = vol_azimuth, vol_range, fix_elevation.astype(np.float64), vol_value, radar_height, radar_lon_0, radar_lat_0
+        dBZ的插值用体扫数据, 见get_vol_data, 各产品都用它计算
+        第一次用到时才生成, 之后直接返回; fields中的dBZ被替换(如ordered_az(inplace=True))后重新生成
+        """
+        if self._vol is not None:
+            variables, vol = self._vol
+            if variables is None:  ##直接赋值的vol
+                return vol
+            current = [ppi["dBZ"].variable for ppi in self.fields]
+            if len(variables) == len(current) and all(old is new for old, new in zip(variables, current)):
+                return vol
+        return self.get_vol_data()
+
+    @vol.setter
+    def vol(self, value):
+        self._vol = None if value is None else (None, value)
 
     def get_RHI_data(self, az, field_name="dBZ"):
         """
@@ -372,7 +782,50 @@ class PRD_AZ:
         self.fields = []
         self.product = xr.Dataset()
 
+class ScanInfo(object):
+    """
+    只包含头信息的轻量级对象, 由read_auto(..., header_only=True)返回, 不解码要素数据
+    Attributes
+    ----------
+    sitename : str
+    task_name : str
+        体扫模式/任务名称, 如VCP21, 没有时为None
+    scan_type : str
+        'ppi', 'rhi', 'sector' or 'other'
+    latitude, longitude, altitude, frequency : scalar
+        units:degree, degree, m, GHZ
+    start_time, end_time : datetime object
+    nrays, nsweeps : int
+    fixed_angle : numpy array (nsweeps) units:degree
+    rays_per_sweep : numpy array (nsweeps)
+    bins_per_sweep : numpy array (nsweeps)
+        每个sweep V探测的库数, 没有V的sweep为0
+    nyquist_velocity : numpy array (nsweeps) (m/s)
+    unambiguous_range : numpy array (nsweeps)
+    sweep的顺序与文件中的仰角层一致, 未合并分开扫描的dBZ/V层
+    """
+    def __init__(self, sitename, task_name, scan_type, latitude, longitude, altitude, frequency,
+                 start_time, end_time, fixed_angle, rays_per_sweep, bins_per_sweep,
+                 nyquist_velocity, unambiguous_range):
+        super(ScanInfo, self).__init__()
+        self.sitename = sitename
+        self.task_name = task_name
+        self.scan_type = scan_type
+        self.latitude = latitude
+        self.longitude = longitude
+        self.altitude = altitude
+        self.frequency = frequency
+        self.start_time = start_time
+        self.end_time = end_time
+        self.fixed_angle = np.asarray(fixed_angle)
+        self.rays_per_sweep = np.asarray(rays_per_sweep)
+        self.bins_per_sweep = np.asarray(bins_per_sweep)
+        self.nyquist_velocity = np.asarray(nyquist_velocity)
+        self.unambiguous_range = np.asarray(unambiguous_range)
+        self.nsweeps = len(self.fixed_angle)
+        self.nrays = int(np.sum(self.rays_per_sweep))
 
-
-
-
+    def __repr__(self):
+        return "<ScanInfo %s %s %s %s-%s, %d sweeps, %d rays>" % (self.sitename, self.task_name, self.scan_type,
+                                                               self.start_time, self.end_time,
+                                                               self.nsweeps, self.nrays)
@@ -4,9 +4,10 @@ from matplotlib.ticker import MaxNLocator
 from ..configure.default_config import CINRAD_COLORMAP, CINRAD_field_bins, \
     CINRAD_field_normvar, CINRAD_field_mapping
 import numpy as np
-from ..configure.location_config import CN_shp_info
+from ..configure import location_config
 import cartopy.feature as cfeature
 from ..core.transforms import geographic_to_cartesian_aeqd, cartesian_to_geographic_aeqd, antenna_vectors_to_cartesian
+from . import colormap  ##注册CN_ref等色标, CINRAD_COLORMAP中按名称使用
 from .VerticalSectionPlot import VerticalSection
 from cartopy.mpl.ticker import LongitudeFormatter, LatitudeFormatter
 import cartopy, matplotlib
@@ -383,7 +384,7 @@ class GraphMap(object):
         ax.add_feature(cfeature.LAKES.with_scale('50m'), zorder=2)
         ax.add_feature(cfeature.RIVERS.with_scale('50m'), zorder=3)
 
-        ax.add_feature(cfeature.ShapelyFeature(CN_shp_info.geometries(), self.transform, \
+        ax.add_feature(cfeature.ShapelyFeature(location_config.CN_shp_info.geometries(), self.transform, \
                                                edgecolor='k', facecolor='none'), linewidth=0.5, \
                        linestyle='-', zorder=5, alpha=0.8)
         parallels = np.arange(int(min_lat), np.ceil(max_lat) + 1, 1)
@@ -457,7 +458,7 @@ class GraphMap(object):
         ax.add_feature(cfeature.LAKES.with_scale('50m'), zorder=2)
         ax.add_feature(cfeature.RIVERS.with_scale('50m'), zorder=3)
 
-        ax.add_feature(cfeature.ShapelyFeature(CN_shp_info.geometries(), self.transform, \
+        ax.add_feature(cfeature.ShapelyFeature(location_config.CN_shp_info.geometries(), self.transform, \
                                                edgecolor='k', facecolor='none'), linewidth=0.5, \
                        linestyle='-', zorder=5, alpha=0.8)
         parallels = np.arange(int(min_lat), np.ceil(max_lat) + 1, 1)
@@ -530,7 +531,7 @@ class GraphMap(object):
         ax.add_feature(cfeature.LAKES.with_scale('50m'), zorder=2)
         ax.add_feature(cfeature.RIVERS.with_scale('50m'), zorder=3)
 
-        ax.add_feature(cfeature.ShapelyFeature(CN_shp_info.geometries(), self.transform, \
+        ax.add_feature(cfeature.ShapelyFeature(location_config.CN_shp_info.geometries(), self.transform, \
                                                edgecolor='k', facecolor='none'), linewidth=0.5, \
                        linestyle='-', zorder=5, alpha=0.8)
         parallels = np.arange(int(min_lat), np.ceil(max_lat) + 1, 1)
@@ -787,7 +788,7 @@ def plot_lonlat_map(ax, lon, lat, data, transform, extend=None, cmap="CN_ref", b
     ax.add_feature(cfeature.LAKES.with_scale('50m'), zorder=2)
     ax.add_feature(cfeature.RIVERS.with_scale('50m'), zorder=3)
 
-    ax.add_feature(cfeature.ShapelyFeature(CN_shp_info.geometries(), transform, \
+    ax.add_feature(cfeature.ShapelyFeature(location_config.CN_shp_info.geometries(), transform, \
                                            edgecolor='k', facecolor='none'), linewidth=0.5, \
                    linestyle='-', zorder=5, alpha=0.8)
     parallels = np.arange(int(min_lat), np.ceil(max_lat) + 1, 1)
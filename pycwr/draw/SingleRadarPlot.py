@@ -15,6 +15,7 @@ import pandas as pd
 from ..configure.default_config import CINRAD_COLORMAP, CINRAD_field_bins, \
     CINRAD_field_normvar, CINRAD_field_mapping, DEFAULT_METADATA
 from ..core.transforms import antenna_vectors_to_cartesian_cwr
+from . import colormap  ##注册CN_ref等色标, CINRAD_COLORMAP中按名称使用
 
 class RadarGraph(object):
     """雷达绘图显示部分"""
@@ -7,7 +7,7 @@ this script is created to plot Stereotypical radar  images
 @author: zy
 """
 import cartopy.feature as cfeature
-from ..configure.location_config import CN_shp_info
+from ..configure import location_config
 import matplotlib.pyplot as plt
 from matplotlib.colors import BoundaryNorm
 from matplotlib.ticker import MaxNLocator
@@ -17,6 +17,7 @@ import cartopy.crs as ccrs
 import numpy as np
 import pandas as pd
 from ..core.transforms import cartesian_to_geographic_aeqd, antenna_vectors_to_cartesian_cwr
+from . import colormap  ##注册CN_ref等色标, CINRAD_COLORMAP中按名称使用
 from ..configure.default_config import CINRAD_COLORMAP, CINRAD_field_bins, \
     CINRAD_field_normvar, CINRAD_field_mapping, DEFAULT_METADATA
 
@@ -216,7 +217,7 @@ class RadarGraphMap(object):
         ax.add_feature(cfeature.LAKES.with_scale('50m'), zorder=2)
         ax.add_feature(cfeature.RIVERS.with_scale('50m'), zorder=3)
         ax.set_extent([min_lon, max_lon, min_lat, max_lat], projection)
-        ax.add_feature(cfeature.ShapelyFeature(CN_shp_info.geometries(), projection,\
+        ax.add_feature(cfeature.ShapelyFeature(location_config.CN_shp_info.geometries(), projection,\
                                                edgecolor='k', facecolor='none'), linewidth=0.5, \
                                                 linestyle='-' , zorder=5, alpha=0.8)
         if continuously:
@@ -7,6 +7,7 @@ from ..configure.default_config import CINRAD_COLORMAP, CINRAD_field_bins,\
     CINRAD_field_normvar, CINRAD_field_mapping
 import pandas as pd
 from ..core.transforms import geographic_to_cartesian_aeqd, cartesian_to_geographic_aeqd
+from . import colormap  ##注册CN_ref等色标, CINRAD_COLORMAP中按名称使用
 
 class VerticalSection(object):
 
@@ -1,2 +1,15 @@
-from . import colormap, SingleRadarPlot, SingleRadarPlotMap, VerticalSectionPlot
+import importlib
+
 __all__ = ["colormap", "SingleRadarPlot", "SingleRadarPlotMap", "VerticalSectionPlot"]
+
+def __getattr__(name):
+    """
+    绘图模块在第一次访问时才导入(连同matplotlib/cartopy), 色标在导入colormap或任一绘图模块时注册
+    """
+    if name in __all__:
+        module = globals()[name] = importlib.import_module("." + name, __name__)
+        return module
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,10 +1,9 @@
 # -*- coding: utf-8 -*-
 import numpy as np
 from .BaseDataProtocol.CCProtocol import dtype_cc
-from .util import _prepare_for_read, _unpack_from_buf, make_time_unit_str, get_radar_sitename
+from .util import _prepare_for_read, _unpack_from_buf, make_time_unit_str, get_radar_sitename, _select_sweeps
 import datetime
-import pandas as pd
-from ..core.NRadar import PRD
+from ..core.NRadar import PRD, ScanInfo
 from ..configure.pyart_config import get_metadata, get_fillvalue
 from ..configure.default_config import CINRAD_field_mapping, _LIGHT_SPEED
 from ..core.PyartRadar import Radar
@@ -15,25 +14,34 @@ class CCBaseData(object):
         解码CC/CCJ的数据格式
     """
 
-    def __init__(self, filename, station_lon=None, station_lat=None, station_alt=None):
+    def __init__(self, filename, station_lon=None, station_lat=None, station_alt=None, header_only=False,
+                 fields=None, sweeps=None, elevation_range=None):
         """
                 :param filename:  radar basedata filename
                 :param station_lon:  radar station longitude //units: degree east
                 :param station_lat:  radar station latitude //units:degree north
                 :param station_alt:  radar station altitude //units: meters
+                :param header_only:  只解析头, 不解码要素数据
+                :param fields:  需要解码的要素名, 如["dBZ"], None为全部(dBZ, V, W)
+                :param sweeps:  需要解码的sweep序号(文件中的顺序, 从0开始), None为全部
+                :param elevation_range:  (最小仰角, 最大仰角), 只解码仰角在该范围内的sweep
         """
         super(CCBaseData, self).__init__()
         self.filename = filename
+        self.field_names = fields
+        self.sweeps = None
         self.station_lon = station_lon
         self.station_lat = station_lat
         self.station_alt = station_alt
         self.fid = _prepare_for_read(self.filename)  ##判断是否是压缩文件
-        # print(len(self.fid.read()))
-        buf_header = self.fid.read(dtype_cc.BaseDataHeaderSize)  ##取出header的buf
-        self.header = self._parse_BaseDataHeader(buf_header)
+        self.header = self._parse_BaseDataHeader(self.fid.read(dtype_cc.BaseDataHeaderSize))  ##header的buf
         self._check_cc_basedata()
-        self.fid.seek(dtype_cc.BaseDataHeaderSize, 0)  ##移动到径向数据的位置
-        self.radial = self._parse_radial()
+        self.sweep_record_offset = self.sweep_start_ray_index  ##每个sweep在文件中的起始记录
+        if sweeps is not None or elevation_range is not None:
+            self._subset_sweeps(sweeps, elevation_range)
+        if not header_only:
+            self.sweep_fields = self._parse_sweep_fields()
+        self.fid.close()
 
     def _check_cc_basedata(self):
         """检查雷达数据是否完整"""
@@ -56,38 +64,57 @@ class CCBaseData(object):
         self.nsweeps = BaseDataHeader_dict['ObsParam1']['ucScanMode'] - 100
         BaseDataHeader_dict['CutConfig'] = np.frombuffer(buf_header, \
                                                          dtype_cc.BaseDataHeader['CutConfigX30'], count=self.nsweeps,
-                                                         offset=dtype_cc.CutSize_pos)
+                                                         offset=dtype_cc.CutSize_pos).copy()
         ##解码第二部分观测参数
         BaseDataHeader_dict['ObsParam2'], _ = _unpack_from_buf(buf_header, \
                                                                dtype_cc.HeaderSize2_pos,
                                                                dtype_cc.BaseDataHeader['RadarHeader2'])
 
         self.nrays = np.sum(BaseDataHeader_dict['CutConfig']['usRecordNumber'])
+        self.volume_nrays = self.nrays  ##文件中的径向数, 只读取部分sweep时不变
         self.sweep_end_ray_index_add1 = (np.cumsum(BaseDataHeader_dict['CutConfig']['usRecordNumber'])).astype(int)  ##python格式的结束
         self.sweep_start_ray_index = (self.sweep_end_ray_index_add1 - BaseDataHeader_dict['CutConfig']['usRecordNumber']).astype(int)
         return BaseDataHeader_dict
 
-    def _parse_radial_single(self, buf_radial, radialnumber):
-        """解析径向的数据"""
-        Radial = {}
-        RadialData = np.frombuffer(buf_radial, dtype_cc.RadialData(radialnumber))
-        Radial['fields'] = {}
-        Radial['fields']['dBZ'] = np.where(RadialData['dBZ'] != -32768, RadialData['dBZ'] / 10.,
-                                           np.nan).astype(np.float32)
-        Radial['fields']['V'] = np.where(RadialData['V'] != -32768, RadialData['V'] / 10.,
-                                         np.nan).astype(np.float32)
-        Radial['fields']['W'] = np.where(RadialData['W'] != -32768, RadialData['W'] / 10.,
-                                         np.nan).astype(np.float32)
-        return Radial
-
-    def _parse_radial(self):
-        radial = []
+    def _subset_sweeps(self, sweeps, elevation_range):
+        """
+        只保留需要的sweep的头信息, 解码时直接跳到这些sweep的记录
+        """
+        CutConfig = self.header['CutConfig']
+        self.sweeps = _select_sweeps(self.nsweeps, sweeps, elevation_range, CutConfig['usAngle'] / 100.)
+        self.sweep_record_offset = self.sweep_record_offset[self.sweeps]
+        self.header['CutConfig'] = CutConfig[self.sweeps]
+        self.nsweeps = len(self.sweeps)
+        self.nrays = np.sum(self.header['CutConfig']['usRecordNumber'])
+        self.sweep_end_ray_index_add1 = (np.cumsum(self.header['CutConfig']['usRecordNumber'])).astype(int)
+        self.sweep_start_ray_index = (self.sweep_end_ray_index_add1 - self.header['CutConfig']['usRecordNumber']).astype(int)
+
+    def _parse_sweep_fields(self):
+        """
+        每个sweep的径向为等长记录的连续块, 整块读入后一次性解码
+        :return: list(nsweeps), 每个sweep为{要素名: (nrays, nbins)}
+        """
+        field_keys = [ikey for ikey in ('dBZ', 'V', 'W') if self.field_names is None or ikey in self.field_names]
+        sweep_fields = []
         for isweep in range(self.nsweeps):
-            radialnumber = self.header['CutConfig']['usBinNumber'][isweep]
-            for _ in range(self.header['CutConfig']['usRecordNumber'][isweep]):
-                buf_radial = self.fid.read(dtype_cc.PerRadialSize)
-                radial.append(self._parse_radial_single(buf_radial, radialnumber))
-        return radial
+            radialnumber = int(self.header['CutConfig']['usBinNumber'][isweep])
+            nrays = int(self.header['CutConfig']['usRecordNumber'][isweep])
+            self.fid.seek(dtype_cc.BaseDataHeaderSize + dtype_cc.PerRadialSize * int(self.sweep_record_offset[isweep]), 0)
+            buf_sweep = self.fid.read(dtype_cc.PerRadialSize * nrays)
+            RadialData = np.ndarray(shape=(nrays,), dtype=dtype_cc.RadialData(radialnumber), buffer=buf_sweep,
+                                    strides=(dtype_cc.PerRadialSize,))
+            sweep_fields.append({ikey: self._decode_moment(RadialData[ikey]) for ikey in field_keys})
+        return sweep_fields
+
+    def _decode_moment(self, code):
+        """
+        :param code: 原始编码值 (nrays, nbins) int16
+        :return: 物理量 (nrays, nbins) float32, 缺测为nan
+        """
+        dat = code.astype(np.float32)
+        dat /= 10.
+        dat[code == -32768] = np.nan
+        return dat
 
     def get_nyquist_velocity(self):
         """get nyquist vel per ray
@@ -122,7 +149,13 @@ class CCBaseData(object):
         end_time = datetime.datetime(year=end_year, month=params['ucEMonth'],
                                      day=params['ucEDay'], hour=params['ucEHour'],
                                      minute=params['ucEMinute'], second=params['ucESecond'])
-        return pd.date_range(start_time, end_time, periods=self.nrays).to_pydatetime()
+        import pandas as pd  ##只有这里用到pandas, 用到时才导入
+        scan_time = pd.date_range(start_time, end_time, periods=self.volume_nrays).to_pydatetime()
+        if self.sweeps is None:
+            return scan_time
+        ##只读取了部分sweep时, 取这些sweep的径向在整个体扫中的时间
+        return np.concatenate([scan_time[int(offset):int(offset) + int(nrays)] for offset, nrays in
+                               zip(self.sweep_record_offset, self.header['CutConfig']['usRecordNumber'])])
 
     def get_sweep_end_ray_index(self):
         """
@@ -190,12 +223,26 @@ class CCBaseData(object):
     def get_sitename(self):
         return get_radar_sitename(self.filename)
 
+    def get_scan_info(self):
+        """
+        只用头的信息生成ScanInfo
+        :return: ScanInfo
+        """
+        lat, lon, alt, frequency = self.get_latitude_longitude_altitude_frequency()
+        scan_time = self.get_scan_time()
+        CutConfig = self.header['CutConfig']
+        return ScanInfo(sitename=self.get_sitename(), task_name=None, scan_type=self.get_scan_type(),
+                        latitude=lat, longitude=lon, altitude=alt, frequency=frequency,
+                        start_time=scan_time[0], end_time=scan_time[-1], fixed_angle=CutConfig['usAngle'] / 100.,
+                        rays_per_sweep=self.get_rays_per_sweep(), bins_per_sweep=CutConfig['usBinNumber'].astype(int),
+                        nyquist_velocity=CutConfig['usMaxV'] / 100., unambiguous_range=CutConfig['usMaxL'] * 10.)
+
 class CC2NRadar(object):
     """到NusitRadar object 的桥梁"""
 
     def __init__(self, CC):
         self.CC = CC
-        self.radial = self.CC.radial
+        self.sweep_fields = self.CC.sweep_fields
         self.azimuth = self.get_azimuth()
         self.elevation = self.get_elevation()
         self.sweep_start_ray_index = self.get_sweep_start_ray_index()
@@ -210,6 +257,8 @@ class CC2NRadar(object):
         self.range = self.get_range_per_radial(self.max_bins)
         self.fields = self._get_fields()
         self.sitename = self.CC.get_sitename()
+        self.field_encoding = [{ikey: ('<i2', 10., 0., -32768) for ikey in ('dBZ', 'V', 'W')} \
+                               for _ in range(self.nsweeps)]  ##与CCBaseData._decode_moment一致
 
     def get_azimuth(self):
         """
@@ -284,13 +333,19 @@ class CC2NRadar(object):
         return np.linspace(Resolution, Resolution * length, length)
 
     def _get_fields(self):
-        """将所有的field的数据提取出来"""
+        """将所有的field的数据提取出来, 库数不足max_bins的sweep补nan"""
         fields = {}
-        field_keys = self.radial[0]['fields'].keys()
+        field_keys = self.sweep_fields[0].keys()
         for ikey in field_keys:
-            fields[ikey] = np.array([(iray['fields'][ikey]).ravel() for iray in self.radial])
+            fields[ikey] = np.concatenate([self._pad_bins(ifields[ikey]) for ifields in self.sweep_fields], axis=0)
         return fields
 
+    def _pad_bins(self, dat):
+        """将(nrays, nbins)的数据补齐到max_bins"""
+        if dat.shape[1] == self.max_bins:
+            return dat
+        return np.pad(dat, ((0, 0), (0, self.max_bins - dat.shape[1])), mode="constant", constant_values=np.nan)
+
     def get_NRadar_nyquist_speed(self):
         """array shape (nsweeps)"""
         return self.CC.header['CutConfig']['usMaxV'] / 100.
@@ -302,17 +357,32 @@ class CC2NRadar(object):
     def get_fixed_angle(self):
         return self.CC.header['CutConfig']['usAngle'] / 100.
 
-    def ToPRD(self):
-        """将WSR98D数据转为PRD 的数据格式"""
+    def ToPRD(self, packed=False):
+        """
+        将WSR98D数据转为PRD 的数据格式
+        :param packed: True时PRD中的要素保存为原始的整型编码, 取值时才解码为float32
+        """
 
-        return PRD(fields=self.fields, scan_type=self.scan_type, time=self.get_scan_time(), \
+        ##PRD保留本对象用于延迟生成Py-ART Radar, 逐sweep的数据已经合并到fields中, 释放掉
+        self.sweep_fields = self.CC.sweep_fields = None
+        prd = PRD(fields=self.fields, scan_type=self.scan_type, time=self.get_scan_time(), \
                           range=self.range, azimuth=self.azimuth, elevation=self.elevation, latitude=self.latitude, \
                           longitude=self.longitude, altitude=self.altitude,
                           sweep_start_ray_index=self.sweep_start_ray_index, \
                           sweep_end_ray_index=self.sweep_end_ray_index, fixed_angle=self.get_fixed_angle(), \
                           bins_per_sweep=self.bins_per_sweep, nyquist_velocity=self.get_NRadar_nyquist_speed(), \
                           frequency=self.frequency, unambiguous_range=self.get_NRadar_unambiguous_range(), \
-                          nrays=self.nrays, nsweeps=self.nsweeps, sitename = self.sitename, pyart_radar=self.ToPyartRadar())
+                          nrays=self.nrays, nsweeps=self.nsweeps, sitename = self.sitename, pyart_radar=self.ToPyartRadar,
+                          field_encoding=self.field_encoding if packed else None, pyart_meta=self._pyart_meta())
+        if packed:  ##不再保留浮点的体扫数据, 生成Py-ART Radar时由PRD解码
+            self.fields = prd.get_volume_fields(len(self.range))
+        return prd
+
+    def _pyart_meta(self):
+        """PRD中没有的Py-ART Radar信息, 由PRD生成Radar(多进程读取, 缓存, load_prd)时使用"""
+        return {"original_container": "CINRAD/CC", "radar_name": "CINRAD/CC", "meters_between_gates": self.CC.header['CutConfig']['usBindWidth'][0] * 2,
+                "instrument_parameters": {key: value["data"] for key, value in \
+                                          self._get_instrument_parameters().items()}}
 
     def ToPyartRadar(self):
 
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+不经过Py-ART, 直接将PRD写为CfRadial格式的netCDF文件, 逐sweep写入分块压缩的变量
+"""
+import datetime
+import numpy as np
+from netCDF4 import Dataset
+from ..configure.pyart_config import get_metadata, get_fillvalue
+from ..configure.default_config import CINRAD_field_mapping
+from .util import make_time_unit_str
+
+_sweep_mode = {"ppi": "azimuth_surveillance", "rhi": "rhi", "sector": "sector"}
+
+def _create_variable(ncfile, name, datatype, dimensions, attrs, **kwargs):
+    """创建变量并写入属性, 不写入meta_group等Py-ART内部使用的属性"""
+    var = ncfile.createVariable(name, datatype, dimensions, **kwargs)
+    var.setncatts({key: value for key, value in attrs.items() if key not in ("data", "meta_group", "_FillValue")})
+    return var
+
+def _packed_encoding(prd, key):
+    """
+    int16打包的scale_factor和add_offset, 由该要素在体扫中的最小值和最大值确定
+    :return: scale_factor, add_offset
+    """
+    vmin = min(np.nanmin(ppi[key].values, initial=np.inf) for ppi in prd.fields if key in ppi.data_vars)
+    vmax = max(np.nanmax(ppi[key].values, initial=-np.inf) for ppi in prd.fields if key in ppi.data_vars)
+    if not np.isfinite(vmin):  ##全部缺测
+        return 1., 0.
+    scale_factor = max(float(vmax - vmin) / 65533., 1e-6)  ##-32768留作缺测
+    return scale_factor, float(vmin + vmax) / 2.
+
+def write_cfradial(prd, filename, fields=None, packed=False, zlib=True, complevel=4, shuffle=True, chunk_rays=None,
+                   format="NETCDF4"):
+    """
+    将PRD写为CfRadial格式
+    :param prd: PRD object
+    :param filename: 输出的文件名
+    :param fields: 需要写入的要素名, 如["dBZ", "V"], None为全部
+    :param packed: True时要素保存为int16(scale_factor/add_offset), 否则为float32
+    :param zlib: 是否压缩
+    :param complevel: 压缩等级 1~9
+    :param shuffle: 压缩前是否做shuffle
+    :param chunk_rays: 每个分块的径向数, None为最大的sweep径向数
+    :param format: netCDF文件格式, 分块和压缩需要NETCDF4或NETCDF4_CLASSIC
+    :return:
+    """
+    keys = []  ##各sweep要素的并集, 按第一次出现的顺序
+    for ppi in prd.fields:
+        keys.extend(ikey for ikey in ppi.data_vars if CINRAD_field_mapping.get(ikey, None) is not None and \
+                    (fields is None or ikey in fields) and ikey not in keys)
+    scan_info = prd.scan_info
+    scan_type = str(scan_info.scan_type.values)
+    rays_per_sweep = scan_info.rays_per_sweep.values.astype(np.int32)
+    sweep_end_ray_index = np.cumsum(rays_per_sweep) - 1
+    sweep_start_ray_index = sweep_end_ray_index - rays_per_sweep + 1
+    nrays = int(rays_per_sweep.sum())
+    _range = max((ppi.range.values for ppi in prd.fields), key=len)
+    times = np.concatenate([ppi.time.values for ppi in prd.fields]).astype("datetime64[us]")
+    start = times.min().astype(datetime.datetime)
+    end = times.max().astype(datetime.datetime)
+    chunksizes = (min(chunk_rays or int(rays_per_sweep.max()), nrays), len(_range))
+
+    with Dataset(filename, "w", format=format) as ncfile:
+        ncfile.setncatts({"Conventions": "CF/Radial instrument_parameters", "version": "1.3",
+                          "title": "", "institution": "", "references": "", "source": "pycwr", "comment": "",
+                          "instrument_name": str(prd.sitename), "platform_is_mobile": "false",
+                          "history": "created by pycwr " + datetime.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+                          "time_coverage_start": start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                          "time_coverage_end": end.strftime("%Y-%m-%dT%H:%M:%SZ")})
+        ncfile.createDimension("time", nrays)
+        ncfile.createDimension("range", len(_range))
+        ncfile.createDimension("sweep", prd.nsweeps)
+        ncfile.createDimension("string_length", 32)
+        ncfile.createDimension("frequency", 1)
+
+        for name, value in (("time_coverage_start", start), ("time_coverage_end", end)):
+            var = ncfile.createVariable(name, "S1", ("string_length",))
+            var[:] = np.array([value.strftime("%Y-%m-%dT%H:%M:%SZ")], dtype="S32").view("S1")
+        ncfile.createVariable("volume_number", "i4")[:] = 0
+        for name in ("latitude", "longitude", "altitude"):
+            _create_variable(ncfile, name, "f8", (), get_metadata(name))[:] = float(scan_info[name].values)
+
+        time = _create_variable(ncfile, "time", "f8", ("time",), get_metadata("time"))
+        time.units = make_time_unit_str(start)
+        ##units只精确到秒, 偏移量也相对于整秒的开始时间
+        time[:] = (times - times.min().astype("datetime64[s]")).astype(np.float64) / 1e6
+        _create_variable(ncfile, "range", "f4", ("range",), get_metadata("range"))[:] = _range
+        _create_variable(ncfile, "azimuth", "f4", ("time",), get_metadata("azimuth"))[:] = \
+            np.concatenate([ppi.azimuth.values for ppi in prd.fields])
+        _create_variable(ncfile, "elevation", "f4", ("time",), get_metadata("elevation"))[:] = \
+            np.concatenate([ppi.elevation.values for ppi in prd.fields])
+
+        _create_variable(ncfile, "sweep_number", "i4", ("sweep",), get_metadata("sweep_number"))[:] = \
+            np.arange(prd.nsweeps, dtype=np.int32)
+        sweep_mode = _create_variable(ncfile, "sweep_mode", "S1", ("sweep", "string_length"),
+                                      get_metadata("sweep_mode"))
+        sweep_mode[:] = np.array([_sweep_mode.get(scan_type, "sector")] * prd.nsweeps, dtype="S32").view("S1"). \
+            reshape(prd.nsweeps, 32)
+        _create_variable(ncfile, "fixed_angle", "f4", ("sweep",), get_metadata("fixed_angle"))[:] = \
+            scan_info.fixed_angle.values
+        _create_variable(ncfile, "sweep_start_ray_index", "i4", ("sweep",),
+                         get_metadata("sweep_start_ray_index"))[:] = sweep_start_ray_index
+        _create_variable(ncfile, "sweep_end_ray_index", "i4", ("sweep",),
+                         get_metadata("sweep_end_ray_index"))[:] = sweep_end_ray_index
+
+        _create_variable(ncfile, "frequency", "f4", ("frequency",), get_metadata("frequency"))[:] = \
+            float(scan_info.frequency.values) * 1e9  ##GHz -> Hz
+        for name in ("nyquist_velocity", "unambiguous_range"):
+            _create_variable(ncfile, name, "f4", ("time",), get_metadata(name))[:] = \
+                np.repeat(scan_info[name].values, rays_per_sweep)
+
+        for ikey in keys:
+            field_name = CINRAD_field_mapping[ikey]
+            if packed:
+                var = _create_variable(ncfile, field_name, "i2", ("time", "range"), get_metadata(field_name),
+                                       fill_value=np.int16(-32768), zlib=zlib, complevel=complevel,
+                                       shuffle=shuffle, chunksizes=chunksizes)
+                var.scale_factor, var.add_offset = _packed_encoding(prd, ikey)
+                for name in ("valid_min", "valid_max"):  ##打包后valid_min/valid_max按CF约定为打包后的值
+                    if name in var.ncattrs():
+                        value = np.round((var.getncattr(name) - var.add_offset) / var.scale_factor)
+                        var.setncattr(name, np.int16(np.clip(value, -32767, 32767)))
+            else:
+                var = _create_variable(ncfile, field_name, "f4", ("time", "range"), get_metadata(field_name),
+                                       fill_value=np.float32(get_fillvalue()), zlib=zlib, complevel=complevel,
+                                       shuffle=shuffle, chunksizes=chunksizes)
+            for ppi, istart, iend in zip(prd.fields, sweep_start_ray_index, sweep_end_ray_index):
+                ##逐sweep写入, 不生成整个体扫的浮点数组, 超出该sweep库数的部分和该sweep没有的要素为缺测
+                if ikey not in ppi.data_vars:
+                    continue
+                dat = ppi[ikey].values
+                mask = np.isnan(dat)
+                dat = np.ma.masked_array(np.where(mask, 0, dat), mask=mask)  ##缺测处置0, 打包为int16时不产生nan的转换
+                var[istart:iend + 1, :dat.shape[1]] = dat
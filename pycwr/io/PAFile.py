@@ -1,8 +1,10 @@
 # -*- coding: utf-8 -*-
 import numpy as np
 from .BaseDataProtocol.PAProtocol import dtype_PA
-from .util import _prepare_for_read, _unpack_from_buf, julian2date_SEC, make_time_unit_str
-from ..core.NRadar import PRD
+from .util import _prepare_for_read, _unpack_from_buf, julian2date_SEC, make_time_unit_str, \
+    _index_radial_blocks, _gather_structure, _structure_dtype, _decode_sweep_moments, _sweep_moment_gates, \
+    _select_moments, _select_sweeps, _sweep_ray_index, _sweep_moment_encoding
+from ..core.NRadar import PRD, ScanInfo
 from ..configure.pyart_config import get_metadata, get_fillvalue
 from ..configure.default_config import CINRAD_field_mapping
 from ..core.PyartRadar import Radar
@@ -13,27 +15,53 @@ class PABaseData(object):
     解码新一代双偏振的数据格式
     """
 
-    def __init__(self, filename, station_lon=None, station_lat=None, station_alt=None):
+    def __init__(self, filename, station_lon=None, station_lat=None, station_alt=None, header_only=False,
+                 fields=None, sweeps=None, elevation_range=None):
         """
         :param filename:  radar basedata filename
         :param station_lon:  radar station longitude //units: degree east
         :param station_lat:  radar station latitude //units:degree north
         :param station_alt:  radar station altitude //units: meters
+        :param header_only:  只解析头和径向头, 不解码要素数据
+        :param fields:  需要解码的要素名, 如["dBZ", "V"], None为全部, 其余要素的数据块直接跳过
+        :param sweeps:  需要解码的sweep序号(文件中的顺序, 从0开始), None为全部
+        :param elevation_range:  (最小仰角, 最大仰角), 只解码仰角在该范围内的sweep
         """
         super(PABaseData, self).__init__()
         self.filename = filename
+        self.field_names = fields
+        self.sweeps = None
         self.station_lon = station_lon
         self.station_lat = station_lat
         self.station_alt = station_alt
         self.fid = _prepare_for_read(self.filename)  ##对压缩的文件进行解码
         self._check_standard_basedata()  ##确定文件是standard文件
         self.header = self._parse_BaseDataHeader()
-        self.radial = self._parse_radial()
+        raw = np.frombuffer(self.fid.read(), dtype="u1")  ##径向数据的buf
+        self.radial, moment, moment_ray, data_pos = self._parse_radial(raw)
         self.nrays = len(self.radial)
-        # print(self.nrays)
         self.nsweeps = self.header['TaskConfig']['CutNumber']
-        self.sweep_start_ray_index = np.arange(0, self.nrays, self.nrays // self.nsweeps)
-        self.sweep_end_ray_index = self.sweep_start_ray_index + self.nrays // self.nsweeps - 1
+        order, rays_per_sweep = self._index_sweeps()
+        ##按sweep重排径向, 要素按所属径向排序, 使每个sweep的径向和要素都连续
+        rank = np.full(self.nrays, -1, dtype=np.int64)
+        rank[order] = np.arange(order.size)
+        self.radial = self.radial[order]
+        self.nrays = len(self.radial)
+        moment_ray = rank[moment_ray]
+        moment_order = np.argsort(moment_ray, kind="stable")[np.count_nonzero(moment_ray < 0):]
+        self.sweep_end_ray_index = np.cumsum(rays_per_sweep) - 1
+        self.sweep_start_ray_index = self.sweep_end_ray_index - rays_per_sweep + 1
+        moment, moment_ray, data_pos = moment[moment_order], moment_ray[moment_order], data_pos[moment_order]
+        self.sweep_gates = _sweep_moment_gates(moment, moment_ray, self.sweep_start_ray_index,
+                                               self.sweep_end_ray_index, dtype_PA.flag2Product)
+        if sweeps is not None or elevation_range is not None:
+            moment, moment_ray, data_pos = self._subset_sweeps(sweeps, elevation_range, moment, moment_ray, data_pos)
+        self.bins_per_sweep = np.array([igates.get("V", 0) for igates in self.sweep_gates])  ##每个sweep V的库数
+        self.sweep_encoding = _sweep_moment_encoding(moment, moment_ray, self.sweep_start_ray_index,
+                                                     self.sweep_end_ray_index, dtype_PA.flag2Product)
+        if not header_only:
+            self.sweep_fields = self._parse_sweep_fields(raw, moment, moment_ray, data_pos)
+        del raw  ##close会释放文件的buf, 之前不能再有引用
         self.fid.close()
 
     def _check_standard_basedata(self):
@@ -63,39 +91,75 @@ class PABaseData(object):
                                 BaseDataHeader['TaskConfig']['BeamNumber'])
         cut_buf = self.fid.read(dtype_PA.CutConfigurationBlockSize * \
                                 BaseDataHeader['TaskConfig']['CutNumber'])
-        BaseDataHeader["BeamConfig"] = np.frombuffer(beam_buf, dtype_PA.BaseDataHeader['BeamConfigurationBlock'])
-        BaseDataHeader['CutConfig'] = np.frombuffer(cut_buf, dtype_PA.BaseDataHeader['CutConfigurationBlock'])
+        BaseDataHeader["BeamConfig"] = np.frombuffer(beam_buf,
+                                                     dtype_PA.BaseDataHeader['BeamConfigurationBlock']).copy()
+        BaseDataHeader['CutConfig'] = np.frombuffer(cut_buf, dtype_PA.BaseDataHeader['CutConfigurationBlock']).copy()
         return BaseDataHeader
 
-    def _parse_radial(self):
-        radial = []
-        buf = self.fid.read(dtype_PA.RadialHeaderBlockSize)
-        while len(buf) == dtype_PA.RadialHeaderBlockSize:  ##read until EOF
-            RadialDict, _ = _unpack_from_buf(buf, 0, dtype_PA.RadialHeader())
-            self.MomentNum = RadialDict['MomentNumber']
-            self.LengthOfData = RadialDict['LengthOfData']
-            RadialDict['fields'] = self._parse_radial_single()
-            if RadialDict["fields"]:
-                radial.append(RadialDict)
-            buf = self.fid.read(dtype_PA.RadialHeaderBlockSize)
-        return radial
-
-    def _parse_radial_single(self):
-        radial_var = {}
-        for _ in range(self.MomentNum):
-            Mom_buf = self.fid.read(dtype_PA.MomentHeaderBlockSize)
-            Momheader, _ = _unpack_from_buf(Mom_buf, 0, dtype_PA.RadialData())
-            Data_buf = self.fid.read(Momheader['Length'])
-            assert (Momheader['BinLength'] == 1) | (Momheader['BinLength'] == 2), "Bin Length has problem!"
-            if Momheader['BinLength'] == 1:
-                dat_tmp = (np.frombuffer(Data_buf, dtype="u1", offset=0)).astype(int)
-            else:
-                dat_tmp = (np.frombuffer(Data_buf, dtype="u2", offset=0)).astype(int)
-            radial_var[dtype_PA.flag2Product[Momheader['DataType']]] = np.where(dat_tmp >= 5, \
-                                                                                 (dat_tmp - Momheader['Offset']) /
-                                                                                 Momheader['Scale'],
-                                                                                 np.nan).astype(np.float32)
-        return radial_var
+    def _parse_radial(self, raw):
+        """
+        扫描一遍径向数据, 建立径向头和要素数据块的索引, 去掉没有要素的径向
+        :param raw: 径向数据, uint8
+        :return: 径向头(nrays), 要素头(nmoments), 要素所属的径向(nmoments), 要素数据的位置(nmoments)
+        """
+        radial_pos, moment_pos, moment_ray, _ = _index_radial_blocks(raw, 0, dtype_PA.RadialHeader(),
+                                                                      dtype_PA.RadialData())
+        radial = _gather_structure(raw, radial_pos, _structure_dtype(dtype_PA.RadialHeader()))
+        moment = _gather_structure(raw, moment_pos, _structure_dtype(dtype_PA.RadialData()))
+        keep = radial['MomentNumber'] > 0
+        moment_ray = (np.cumsum(keep) - 1)[moment_ray]
+        return radial[keep], moment, moment_ray, moment_pos + dtype_PA.MomentHeaderBlockSize
+
+    def _index_sweeps(self):
+        """
+        根据径向头的ElevationNumber(对应CutConfig/BeamConfig)将径向分组到各个sweep,
+        仰角编号与CutNumber不一致时, 退回到按径向数均分的方式
+        :return: 按sweep排列的径向序号(nrays), 每个sweep的径向数(nsweeps)
+        """
+        ElevationNumber = self.radial['ElevationNumber']
+        numbers, rays_per_sweep = np.unique(ElevationNumber, return_counts=True)
+        if numbers.size == self.nsweeps:
+            return np.argsort(ElevationNumber, kind="stable"), rays_per_sweep
+        nrays = self.nrays // self.nsweeps
+        if self.nrays > 1 and self.radial['Azimuth'][0] == self.radial['Azimuth'][1]:  ##不同仰角交替扫描
+            order = np.arange(nrays * self.nsweeps).reshape(nrays, self.nsweeps).T.ravel()
+        else:
+            order = np.arange(nrays * self.nsweeps)
+        return order, np.full(self.nsweeps, nrays, dtype=np.int64)
+
+    def _subset_sweeps(self, sweeps, elevation_range, moment, moment_ray, data_pos):
+        """
+        只保留需要的sweep的径向, 其余径向的要素数据块不做解码
+        :return: 保留的要素头, 要素所属的新径向序号, 要素数据的位置
+        """
+        CutConfig = self.header['CutConfig']
+        self.sweeps = _select_sweeps(self.nsweeps, sweeps, elevation_range, CutConfig['Elevation'], self.sweep_gates)
+        ray_index, self.sweep_start_ray_index, self.sweep_end_ray_index = \
+            _sweep_ray_index(self.sweeps, self.sweep_start_ray_index, self.sweep_end_ray_index)
+        rank = np.full(self.nrays, -1, dtype=np.int64)
+        rank[ray_index] = np.arange(ray_index.size)
+        moment_ray = rank[moment_ray]
+        keep = moment_ray >= 0
+        self.radial = self.radial[ray_index]
+        self.nrays = len(self.radial)
+        self.nsweeps = len(self.sweeps)
+        self.sweep_gates = [self.sweep_gates[isweep] for isweep in self.sweeps]
+        self.header['CutConfig'] = CutConfig[self.sweeps]
+        return moment[keep], moment_ray[keep], data_pos[keep]
+
+    def _parse_sweep_fields(self, raw, moment, moment_ray, data_pos):
+        """
+        按sweep批量解码需要的要素
+        :return: list(nsweeps), 每个sweep为{要素名: (nrays, nbins)}
+        """
+        select = _select_moments(moment['DataType'], dtype_PA.flag2Product, self.field_names)
+        moment, moment_ray, data_pos = moment[select], moment_ray[select], data_pos[select]
+        sweep_fields = []
+        for istart, iend in zip(self.sweep_start_ray_index, self.sweep_end_ray_index):
+            lo, hi = np.searchsorted(moment_ray, [istart, iend + 1])
+            sweep_fields.append(_decode_sweep_moments(raw, moment[lo:hi], data_pos[lo:hi], moment_ray[lo:hi] - istart,
+                                                      iend - istart + 1, dtype_PA.flag2Product))
+        return sweep_fields
 
     def get_nyquist_velocity(self):
         """get nyquist vel per ray
@@ -118,7 +182,7 @@ class PABaseData(object):
         获取每根径向的扫描时间
         :return:(nRays)
         """
-        return np.array([julian2date_SEC(self.header["TaskConfig"]['VolumeStartTime'], 0) for iray in self.radial])
+        return julian2date_SEC(np.full(self.nrays, self.header["TaskConfig"]['VolumeStartTime']), np.zeros(self.nrays))
 
     def get_sweep_end_ray_index(self):
         """
@@ -146,14 +210,14 @@ class PABaseData(object):
         获取每根径向的方位角
         :return:(nRays)
         """
-        return np.array([self.radial[iray]['Azimuth'] for iray in range(self.nrays)])
+        return self.radial['Azimuth'].astype(np.float64)
 
     def get_elevation(self):
         """
         获取每根径向的仰角
         :return: (nRays)
         """
-        return np.array([self.radial[iray]['Elevation'] for iray in range(self.nrays)])
+        return self.radial['Elevation'].astype(np.float64)
 
     def get_latitude_longitude_altitude_frequency(self):
         """
@@ -182,6 +246,23 @@ class PABaseData(object):
     def get_sitename(self):
         return (self.header['SiteConfig']['SiteName']).decode('UTF-8', 'ignore').strip().strip(b'\x00'.decode())
 
+    def get_scan_info(self):
+        """
+        只用头和径向头的信息生成ScanInfo
+        :return: ScanInfo
+        """
+        lat, lon, alt, frequency = self.get_latitude_longitude_altitude_frequency()
+        scan_time = [julian2date_SEC(self.header["TaskConfig"]['VolumeStartTime'], 0)] * 2
+        scan_type = self.get_scan_type()
+        CutConfig = self.header['CutConfig'][:self.nsweeps]
+        return ScanInfo(sitename=self.get_sitename(),
+                        task_name=self.header['TaskConfig']['TaskName'].decode('UTF-8', 'ignore').strip('\x00 '),
+                        scan_type=scan_type, latitude=lat, longitude=lon, altitude=alt, frequency=frequency,
+                        start_time=scan_time[0], end_time=scan_time[-1],
+                        fixed_angle=CutConfig['Azimuth'] if scan_type == "rhi" else CutConfig['Elevation'],
+                        rays_per_sweep=self.get_rays_per_sweep(), bins_per_sweep=self.bins_per_sweep,
+                        nyquist_velocity=CutConfig['NyquistSpeed'], unambiguous_range=CutConfig['MaximumRange'])
+
 
 class PA2NRadar(object):
     """到NRadar object 的桥梁"""
@@ -189,24 +270,16 @@ class PA2NRadar(object):
     def __init__(self, WSR98D):
         super(PA2NRadar, self).__init__()
         self.WSR98D = WSR98D
-        self.nrays = len(self.WSR98D.radial)
-        self.nsweeps = self.WSR98D.header['TaskConfig']['CutNumber']
-        # print(self.nsweeps, self.nrays)
-        self.rays_per_sweep = self.nrays // self.nsweeps
-        self.radial = []
-        if self.WSR98D.get_azimuth()[0] == self.WSR98D.get_azimuth()[1]:
-            for i in range(self.nsweeps):
-                self.radial.extend(self.WSR98D.radial[i::self.nsweeps])
-        else:
-            for i in range(self.nsweeps):
-                self.radial.extend(
-                    self.WSR98D.radial[i * self.rays_per_sweep:i * self.rays_per_sweep + self.rays_per_sweep])
+        self.nrays = self.WSR98D.nrays
+        self.nsweeps = self.WSR98D.nsweeps
+        self.radial = self.WSR98D.radial  ##已按sweep排列
+        self.sweep_fields = self.WSR98D.sweep_fields
+        self.field_encoding = self.WSR98D.sweep_encoding  ##每个sweep各要素的整型编码方式
         self.scan_type = self.WSR98D.get_scan_type()
         self.latitude, self.longitude, self.altitude, self.frequency = \
             self.WSR98D.get_latitude_longitude_altitude_frequency()
         self.header = self.WSR98D.header
         self.bins_per_sweep = self.get_nbins_per_sweep()
-        # print(self.bins_per_sweep)
         self.range = self.get_range_per_radial(self.bins_per_sweep.max())
         self.azimuth = self.get_azimuth()
         self.elevation = self.get_elevation()
@@ -221,21 +294,21 @@ class PA2NRadar(object):
         确定每个sweep V探测的库数
         :return:
         """
-        return np.array([self.WSR98D.radial[idx]['fields']['V'].size for idx in range(self.nsweeps)])
+        return np.array([igates['V'] for igates in self.WSR98D.sweep_gates])
 
     def get_azimuth(self):
         """
         获取每根径向的方位角
         :return:(nRays)
         """
-        return np.array([self.radial[iray]['Azimuth'] for iray in range(self.nrays)])
+        return self.WSR98D.get_azimuth()
 
     def get_elevation(self):
         """
         获取每根径向的仰角
         :return: (nRays)
         """
-        elevation = np.array([self.radial[iray]['Elevation'] for iray in range(self.nrays)])
+        elevation = self.WSR98D.get_elevation()
         return np.where(elevation>180, elevation-360, elevation)
 
     def get_scan_time(self):
@@ -243,21 +316,21 @@ class PA2NRadar(object):
         获取每根径向的扫描时间
         :return:(nRays)
         """
-        return np.array([julian2date_SEC(self.header["TaskConfig"]['VolumeStartTime'], 0) for _ in self.radial])
+        return self.WSR98D.get_scan_time()
 
     def get_nyquist_velocity(self):
         """get nyquist vel per ray
         获取每根径向的不模糊速度
         :return:(nRays)
         """
-        return np.concatenate([[nyquist, ] * self.rays_per_sweep for nyquist in self.header['CutConfig']['NyquistSpeed']], axis=0)
+        return self.WSR98D.get_nyquist_velocity()
 
     def get_unambiguous_range(self):
         """
         获取每根径向的不模糊距离
         :return:(nRays)
         """
-        return np.concatenate([[nyquist, ] * self.rays_per_sweep for nyquist in self.header['CutConfig']['MaximumRange']], axis=0)
+        return self.WSR98D.get_unambiguous_range()
 
     def get_range_per_radial(self, length):
         """
@@ -286,30 +359,31 @@ class PA2NRadar(object):
     def _get_fields(self):
         """将所有的field的数据提取出来"""
         fields = {}
-        field_keys = self.radial[0]['fields'].keys()
+        field_keys = self.sweep_fields[0].keys()
         for ikey in field_keys:
-            fields[ikey] = np.array([self._add_or_del_field(iray['fields'], ikey) for iray in self.radial])
+            fields[ikey] = np.concatenate([self._add_or_del_field(ifields, ikey, nrays) for ifields, nrays in \
+                                           zip(self.sweep_fields, self.WSR98D.get_rays_per_sweep())], axis=0)
         return fields
 
-    def _add_or_del_field(self, dat_fields, key):
+    def _add_or_del_field(self, dat_fields, key, nrays):
         """
-        根据fields的key提取数据
-        :param dat_fields: fields的数据
+        根据fields的key提取一个sweep的数据
+        :param dat_fields: 一个sweep的fields的数据
         :param key: key words
-        :param flag_match: dop和dbz分辨率是否匹配, 匹配则为True，不匹配为False
-        :return:
+        :param nrays: sweep的径向数
+        :return: (nrays, max_bins)
         """
         length = self.bins_per_sweep.max()
         if key not in dat_fields.keys():
-            return np.full((length,), np.nan)
+            return np.full((nrays, length), np.nan, dtype=np.float32)
 
-        dat_ray = dat_fields[key]
-        assert dat_ray.ndim == 1, "check dat_ray"
-        if dat_ray.size >= length:
-            return dat_ray[:length]
+        dat_sweep = dat_fields[key]
+        assert dat_sweep.ndim == 2, "check dat_sweep"
+        if dat_sweep.shape[1] >= length:
+            return dat_sweep[:, :length]
         else:
-            out = np.full((length,), np.nan)
-            out[:dat_ray.size] = dat_ray
+            out = np.full((nrays, length), np.nan, dtype=np.float32)
+            out[:, :dat_sweep.shape[1]] = dat_sweep
             return out
 
     def get_NRadar_nyquist_speed(self):
@@ -326,16 +400,31 @@ class PA2NRadar(object):
         else:
             return self.header['CutConfig']['Elevation']
 
-    def ToPRD(self):
-        """将WSR98D数据转为PRD的数据格式"""
-        return PRD(fields=self.fields, scan_type=self.scan_type, time=self.get_scan_time(), \
+    def ToPRD(self, packed=False):
+        """
+        将WSR98D数据转为PRD的数据格式
+        :param packed: True时PRD中的要素保存为原始的整型编码, 取值时才解码为float32
+        """
+        ##PRD保留本对象用于延迟生成Py-ART Radar, 逐sweep的数据已经合并到fields中, 释放掉
+        self.sweep_fields = self.WSR98D.sweep_fields = None
+        prd = PRD(fields=self.fields, scan_type=self.scan_type, time=self.get_scan_time(), \
                           range=self.range, azimuth=self.azimuth, elevation=self.elevation, latitude=self.latitude, \
                           longitude=self.longitude, altitude=self.altitude,
                           sweep_start_ray_index=self.sweep_start_ray_index, \
                           sweep_end_ray_index=self.sweep_end_ray_index, fixed_angle=self.get_fixed_angle(), \
                           bins_per_sweep=self.bins_per_sweep, nyquist_velocity=self.get_NRadar_nyquist_speed(), \
                           frequency=self.frequency, unambiguous_range=self.get_NRadar_unambiguous_range(), \
-                          nrays=self.nrays, nsweeps=self.nsweeps, sitename = self.sitename, pyart_radar=self.ToPyartRadar())
+                          nrays=self.nrays, nsweeps=self.nsweeps, sitename = self.sitename, pyart_radar=self.ToPyartRadar,
+                          field_encoding=self.field_encoding if packed else None, pyart_meta=self._pyart_meta())
+        if packed:  ##不再保留浮点的体扫数据, 生成Py-ART Radar时由PRD解码
+            self.fields = prd.get_volume_fields(len(self.range))
+        return prd
+
+    def _pyart_meta(self):
+        """PRD中没有的Py-ART Radar信息, 由PRD生成Radar(多进程读取, 缓存, load_prd)时使用"""
+        return {"original_container": "WSR98D", "radar_name": "WSR98D", "meters_between_gates": self.header['CutConfig']['DopplerResolution'][0],
+                "instrument_parameters": {key: value["data"] for key, value in \
+                                          self._get_instrument_parameters().items()}}
 
     def ToPyartRadar(self):
         """转化为Pyart Radar的对象"""
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+PRD的二进制存储格式: 文件头(标识, json长度) + json(元数据和数组的偏移表) + 按64字节对齐的数组数据,
+读取时可以直接memmap, 不需要重新解码和解压
+"""
+import json
+import os
+import struct
+import tempfile
+import numpy as np
+from ..core.NRadar import PRD
+
+_MAGIC = b"PYCWRPRD"
+_VERSION = 1
+_ALIGN = 64
+_head = struct.Struct("<8sQ")  ##标识, json的长度
+
+def _json_default(obj):
+    """numpy的标量转为python的类型"""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError("%r is not JSON serializable" % (obj,))
+
+def _aligned(pos):
+    return (pos + _ALIGN - 1) // _ALIGN * _ALIGN
+
+def _write_arrays(filename, meta, arrays):
+    """
+    将元数据和数组写入一个文件
+    :param filename: 输出的文件名
+    :param meta: 可以json序列化的dict
+    :param arrays: {名称: np.ndarray}
+    :return:
+    """
+    ##np.ascontiguousarray会把0维数组变为1维
+    arrays = {key: np.require(arr, requirements="C") for key, arr in arrays.items()}
+    table = {}
+    pos = 0
+    for key, arr in arrays.items():  ##数据相对于数据区开始位置的偏移
+        table[key] = [pos, list(arr.shape), arr.dtype.str]
+        pos = _aligned(pos + arr.nbytes)
+    header = json.dumps({"version": _VERSION, "meta": meta, "arrays": table}, default=_json_default).encode("UTF-8")
+    start = _aligned(_head.size + len(header))
+    ##先写临时文件再改名: 其他进程不会读到不完整的文件, 覆盖正在memmap的文件也是安全的
+    fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(os.path.abspath(filename)))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_head.pack(_MAGIC, len(header)))
+            f.write(header)
+            f.write(b"\x00" * (start - _head.size - len(header)))
+            for key, arr in arrays.items():
+                f.write(arr.reshape(-1).view("u1").data)
+                f.write(b"\x00" * (_aligned(arr.nbytes) - arr.nbytes))
+        os.replace(tmp, filename)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+def _read_arrays(filename, mmap=True):
+    """
+    :param filename: _write_arrays写的文件
+    :param mmap: True时数组为文件的memmap(copy-on-write, 修改不会写回文件), 否则一次读入内存
+    :return: meta, {名称: np.ndarray}
+    """
+    with open(filename, "rb") as f:
+        magic, length = _head.unpack(f.read(_head.size))
+        assert magic == _MAGIC, "file is not a pycwr PRD file!"
+        header = json.loads(f.read(length).decode("UTF-8"))
+        assert header["version"] <= _VERSION, "PRD file version is not supported!"
+        start = _aligned(_head.size + length)
+        if mmap:
+            buf = np.memmap(f, dtype="u1", mode="c") if header["arrays"] else np.zeros(start, dtype="u1")
+        else:
+            f.seek(0, 0)
+            buf = np.frombuffer(bytearray(f.read()), dtype="u1")
+    arrays = {}
+    for key, (offset, shape, dtype) in header["arrays"].items():
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        arrays[key] = buf[start + offset:start + offset + nbytes].view(dtype).reshape(shape)
+    return header["meta"], arrays
+
+def save_prd(prd, filename, geolocation=True):
+    """
+    将PRD保存为可以memmap的二进制文件, 不含product和Py-ART Radar
+    :param prd: PRD object
+    :param filename: 输出的文件名
+    :param geolocation: 是否同时保存各sweep的x, y, z, lat, lon, 读取后不需要重新计算(文件会大几倍)
+    :return:
+    """
+    meta, arrays = prd._to_arrays(geolocation=geolocation)
+    _write_arrays(filename, meta, arrays)
+
+def load_prd(filename, mmap=True):
+    """
+    读取save_prd保存的PRD
+    :param filename: PRD文件名
+    :param mmap: True时要素和坐标直接memmap文件(copy-on-write, 修改不会写回文件), 按需读入; 否则一次读入内存
+    :return: PRD, ToPyartRadar()在第一次调用时由PRD中的数据生成Py-ART Radar
+    """
+    meta, arrays = _read_arrays(filename, mmap=mmap)
+    return PRD._from_arrays(meta, arrays)
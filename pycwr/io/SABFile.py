@@ -2,10 +2,10 @@
 import numpy as np
 from scipy import interpolate
 from .BaseDataProtocol.SABProtocol import dtype_sab
-from .util import _prepare_for_read, _unpack_from_buf, julian2date, \
-    get_radar_info, make_time_unit_str, get_radar_sitename
+from .util import _prepare_for_read, julian2date, _structure_dtype, _radial_headers, \
+    get_radar_info, make_time_unit_str, get_radar_sitename, _select_sweeps, _sweep_ray_index
 from netCDF4 import date2num
-from ..core.NRadar import PRD
+from ..core.NRadar import PRD, ScanInfo
 from ..configure.pyart_config import get_metadata, get_fillvalue
 from ..configure.default_config import CINRAD_field_mapping, _LIGHT_SPEED
 from ..core.PyartRadar import Radar
@@ -16,27 +16,54 @@ class SABBaseData(object):
     解码SA/SB/CB/SC2.0的雷达数据，仅仅对数据（dBZ, V, W）做了转换
     """
 
-    def __init__(self, filename, station_lon=None, station_lat=None, station_alt=None):
+    def __init__(self, filename, station_lon=None, station_lat=None, station_alt=None, header_only=False,
+                 fields=None, sweeps=None, elevation_range=None):
         """
         :param filename:  radar basedata filename
         :param station_lon:  radar station longitude //units: degree east
         :param station_lat:  radar station latitude //units:degree north
         :param station_alt:  radar station altitude //units: meters
+        :param header_only:  只解析头和径向头, 不解码要素数据
+        :param fields:  需要解码的要素名, 如["dBZ"], None为全部(dBZ, V, W)
+        :param sweeps:  需要解码的sweep序号(文件中的顺序, 从0开始), None为全部
+        :param elevation_range:  (最小仰角, 最大仰角), 只解码仰角在该范围内的sweep
         """
         super(SABBaseData, self).__init__()
         self.filename = filename
+        self.field_names = fields
+        self.sweeps = None
         self.station_lon = station_lon
         self.station_lat = station_lat
         self.station_alt = station_alt
         self.fid = _prepare_for_read(self.filename)
         self.RadialNum, self.nrays = self._RadialNum_SAB_CB()  ##检查文件有无问题
         self.radial = self._parse_radial()
-        status = np.array([istatus['RadialStatus'] for istatus in self.radial[:]])
+        status = self.radial['RadialStatus']
         self.sweep_start_ray_index = np.where((status == 0) | (status == 3))[0]
         self.sweep_end_ray_index = np.where((status == 2) | (status == 4))[0]
         self.nsweeps = len(self.sweep_start_ray_index)
+        self.sweep_gates = self._parse_sweep_gates()
+        if sweeps is not None or elevation_range is not None:
+            self._subset_sweeps(sweeps, elevation_range)
+        if not header_only:
+            self.sweep_fields = self._parse_sweep_fields()
+        self.radial = _radial_headers(self.radial)  ##库数据已经解码, 只保留径向头的副本
+        del status  ##close会释放文件的buf, 之前不能再有引用
         self.fid.close()
 
+    def _subset_sweeps(self, sweeps, elevation_range):
+        """
+        只保留需要的sweep的径向记录, 其余记录不做解码
+        """
+        fixed_angle = self.radial['El'][self.sweep_start_ray_index] / 8. * 180. / 4096.
+        self.sweeps = _select_sweeps(self.nsweeps, sweeps, elevation_range, fixed_angle, self.sweep_gates)
+        ray_index, self.sweep_start_ray_index, self.sweep_end_ray_index = \
+            _sweep_ray_index(self.sweeps, self.sweep_start_ray_index, self.sweep_end_ray_index)
+        self.radial = self.radial[ray_index]
+        self.nrays = len(self.radial)
+        self.nsweeps = len(self.sweeps)
+        self.sweep_gates = [self.sweep_gates[isweep] for isweep in self.sweeps]
+
     def _RadialNum_SAB_CB(self):
         """f: a file-like object was provided, 确定雷达数据的径向字节长度"""
         assert self.fid.read(28)[14:16] == b'\x01\x00', 'file in not a valid SA/SB/CB file!'
@@ -58,57 +85,87 @@ class SABBaseData(object):
 
     def _parse_radial(self):
         """
-        循环读取所有径向数据
-        :param fid:
-        :return:
+        将整个文件读为结构化数组, 每个元素为一根径向(径向头 + 库数据)
+        :return:(nRays)
         """
-        radial = []
-        for _ in range(self.nrays):
-            radial.append(self._parse_radial_single(self.fid.read(self.RadialNum)))
-        return radial
-
-    def _parse_radial_single(self, radial_buf):
-        Radial = {}
-        RadialHeader, size_tmp = _unpack_from_buf(radial_buf, 0, dtype_sab.RadialHeader())
-        Radial.update(RadialHeader)
-        dBZ = np.frombuffer(radial_buf[RadialHeader['PtrOfReflectivity'] + dtype_sab.InfSize:\
-                                                     RadialHeader['PtrOfReflectivity'] + dtype_sab.InfSize +\
-                                                     RadialHeader['GatesNumberOfReflectivity']],\
-                                                    dtype="u1")
-        V = np.frombuffer(radial_buf[RadialHeader['PtrOfVelocity'] + dtype_sab.InfSize: \
-                                                     RadialHeader['PtrOfVelocity'] + dtype_sab.InfSize + \
-                                                     RadialHeader['GatesNumberOfDoppler']], \
-                                                    dtype="u1")
-        W = np.frombuffer(radial_buf[RadialHeader['PtrOfSpectrumWidth'] + dtype_sab.InfSize: \
-                                                   RadialHeader['PtrOfSpectrumWidth']  + dtype_sab.InfSize+ \
-                                                   RadialHeader['GatesNumberOfDoppler']], \
-                                                    dtype="u1")
-        Radial['fields'] = {}
-        Radial['fields']['dBZ'] = np.where(dBZ > 1, (dBZ.astype(int) - 2) / 2. - 32, np.nan).astype(np.float32)
-        Radial['fields']['V'] = np.where(V > 1, (V.astype(int) - 2) / 2. - 63.5, np.nan).astype(np.float32)
-        Radial['fields']['W'] = np.where(W > 1, (W.astype(int) - 2) / 2. - 63.5, np.nan).astype(np.float32)
-        return Radial
+        RadialRecord = np.dtype(_structure_dtype(dtype_sab.RadialHeader()).descr + \
+                                [('data', 'u1', (self.RadialNum - dtype_sab.RadialHeaderSize,))])
+        return np.frombuffer(self.fid.read(self.RadialNum * self.nrays), dtype=RadialRecord)
+
+    def _parse_sweep_fields(self):
+        """
+        对整个体扫一次性解码dBZ, V, W, 再按sweep切分
+        :return: list(nsweeps), 每个sweep为{要素名: (nrays, nbins)}
+        """
+        code = np.arange(256)
+        dBZ_table = np.where(code > 1, (code - 2) / 2. - 32, np.nan).astype(np.float32)
+        V_table = np.where(code > 1, (code - 2) / 2. - 63.5, np.nan).astype(np.float32)
+        moments = {'dBZ': ('PtrOfReflectivity', 'GatesNumberOfReflectivity', dBZ_table),
+                   'V': ('PtrOfVelocity', 'GatesNumberOfDoppler', V_table),
+                   'W': ('PtrOfSpectrumWidth', 'GatesNumberOfDoppler', V_table)}
+        vol_fields = {ikey: self._decode_moment(*moments[ikey]) for ikey in moments.keys() \
+                      if self.field_names is None or ikey in self.field_names}
+        sweep_fields = []
+        for isweep, (istart, iend) in enumerate(zip(self.sweep_start_ray_index, self.sweep_end_ray_index)):
+            sweep_fields.append({ikey: vol_fields[ikey][istart:iend + 1, :self.sweep_gates[isweep][ikey]] \
+                                 for ikey in vol_fields.keys()})
+        return sweep_fields
+
+    def _parse_sweep_gates(self):
+        """
+        只用径向头统计每个sweep中各要素的最大库数
+        :return: list(nsweeps), 每个sweep为{要素名: 库数}
+        """
+        sweep_gates = []
+        for istart, iend in zip(self.sweep_start_ray_index, self.sweep_end_ray_index):
+            radial = self.radial[istart:iend + 1]
+            dop_gates = int(radial['GatesNumberOfDoppler'].max())
+            sweep_gates.append({'dBZ': int(radial['GatesNumberOfReflectivity'].max()), 'V': dop_gates,
+                                'W': dop_gates})
+        return sweep_gates
+
+    def _decode_moment(self, ptr_key, gates_key, table):
+        """
+        用查找表一次性解码整个体扫的一个要素
+        :param ptr_key: 数据指针的key
+        :param gates_key: 库数的key
+        :param table: 编码值到物理量的查找表(256)
+        :return: (nRays, nbins), 超出该径向库数的部分为nan
+        """
+        gates = self.radial[gates_key].astype(np.int64)
+        start = self.radial[ptr_key].astype(np.int64) + dtype_sab.InfSize - dtype_sab.RadialHeaderSize
+        nbins = int(gates.max())
+        data = self.radial['data']
+        if np.all(start == start[0]):
+            code = data[:, start[0]:start[0] + nbins]
+        else:
+            idx = np.minimum(start.reshape(-1, 1) + np.arange(nbins), data.shape[1] - 1)
+            code = np.take_along_axis(data, idx, axis=1)
+        dat = table[code]
+        if np.any(gates != nbins):
+            dat[np.arange(nbins) >= gates.reshape(-1, 1)] = np.nan
+        return dat
 
     def get_nyquist_velocity(self):
         """get nyquist vel per ray
         获取每根径向的不模糊速度
         :return:(nRays)
         """
-        return np.array([iradial['Nyquist'] / 100. for iradial in self.radial])
+        return self.radial['Nyquist'] / 100.
 
     def get_unambiguous_range(self):
         """
         获取每根径向的不模糊距离 units:km
         :return:(nRays)
         """
-        return np.array([iradial['URange'] / 10. for iradial in self.radial])
+        return self.radial['URange'] / 10.
 
     def get_scan_time(self):
         """
         获取每根径向的扫描时间
         :return:(nRays)
         """
-        return np.array([julian2date(iradial['JulianDate'], iradial['mSends']) for iradial in self.radial])
+        return julian2date(self.radial['JulianDate'], self.radial['mSends'])
 
     def get_sweep_end_ray_index(self):
         """
@@ -136,14 +193,14 @@ class SABBaseData(object):
         获取每根径向的方位角
         :return:(nRays)
         """
-        return np.array([iradial['AZ'] / 8. * 180. / 4096. for iradial in self.radial])
+        return self.radial['AZ'] / 8. * 180. / 4096.
 
     def get_elevation(self):
         """
         获取每根径向的仰角
         :return: (nRays)
         """
-        return np.array([iradial['El'] / 8. * 180. / 4096. for iradial in self.radial])
+        return self.radial['El'] / 8. * 180. / 4096.
 
     def get_latitude_longitude_altitude_frequency(self):
         """
@@ -169,6 +226,21 @@ class SABBaseData(object):
     def get_sitename(self):
         return get_radar_sitename(self.filename)
 
+    def get_scan_info(self):
+        """
+        只用径向头的信息生成ScanInfo
+        :return: ScanInfo
+        """
+        lat, lon, alt, frequency = self.get_latitude_longitude_altitude_frequency()
+        scan_time = julian2date(self.radial['JulianDate'][[0, -1]], self.radial['mSends'][[0, -1]])
+        first_ray = self.radial[self.sweep_start_ray_index]
+        return ScanInfo(sitename=self.get_sitename(), task_name="VCP%d" % self.radial['VcpNumber'][0],
+                        scan_type=self.get_scan_type(), latitude=lat, longitude=lon, altitude=alt,
+                        frequency=frequency, start_time=scan_time[0], end_time=scan_time[-1],
+                        fixed_angle=first_ray['El'] / 8. * 180. / 4096., rays_per_sweep=self.get_rays_per_sweep(),
+                        bins_per_sweep=[igates['V'] for igates in self.sweep_gates], nyquist_velocity=first_ray['Nyquist'] / 100.,
+                        unambiguous_range=first_ray['URange'] / 10.)
+
 
 class SAB2NRadar(object):
     """到NusitRadar object 的桥梁"""
@@ -177,16 +249,22 @@ class SAB2NRadar(object):
         self.SAB = SAB
         self.v_index_alone = self.get_v_idx()
         self.dBZ_index_alone = self.get_dbz_idx()
-        self.dBZ_Res = self.SAB.radial[0]["GateSizeOfReflectivity"] ##反射率因子的分辨率
+        self.dBZ_Res = int(self.SAB.radial[0]["GateSizeOfReflectivity"]) ##反射率因子的分辨率
         for index_with_dbz, index_with_v in zip(self.dBZ_index_alone, self.v_index_alone):
             assert abs(self.SAB.get_elevation()[index_with_v] - \
                        self.SAB.get_elevation()[index_with_dbz]) < 0.5, "warning! maybe it is a problem."
             self.interp_dBZ(index_with_dbz, index_with_v)
         ind_remove = self.get_reomve_radial_num()
-        self.radial = [iray for ind, iray in enumerate(self.SAB.radial) if ind not in ind_remove]
+        self.radial = np.delete(self.SAB.radial, np.asarray(ind_remove, dtype=int))
+        self.sweep_fields = [ifields for isweep, ifields in enumerate(self.SAB.sweep_fields) \
+                             if isweep not in self.dBZ_index_alone]
+        self.sweep_gates = [igates for isweep, igates in enumerate(self.SAB.sweep_gates) \
+                            if isweep not in self.dBZ_index_alone]
         self.nrays = len(self.radial)
         self.nsweeps = self.SAB.nsweeps - self.dBZ_index_alone.size
-        status = np.array([istatus['RadialStatus'] for istatus in self.radial[:]])
+        self.field_encoding = [{'dBZ': ('u1', 2., 66., 0), 'V': ('u1', 2., 129., 0), 'W': ('u1', 2., 129., 0)} \
+                               for _ in range(self.nsweeps)]  ##与SABBaseData中的查找表一致
+        status = self.radial['RadialStatus']
         self.sweep_start_ray_index = np.where((status == 0) | (status == 3))[0]
         self.sweep_end_ray_index = np.where((status == 2) | (status == 4))[0]
         self.scan_type = self.SAB.get_scan_type()
@@ -212,16 +290,12 @@ class SAB2NRadar(object):
 
     def get_v_idx(self):
         """获取需要插值的sweep, 插值到有径向速度仰角"""
-        flag = np.array([((self.SAB.radial[idx]['fields']["V"].size != 0) and
-                          (self.SAB.radial[idx]['fields']["dBZ"].size == 0)) \
-                         for idx in self.SAB.sweep_start_ray_index])
+        flag = np.array([((igates["V"] != 0) and (igates["dBZ"] == 0)) for igates in self.SAB.sweep_gates])
         return np.where(flag == 1)[0]
 
     def get_dbz_idx(self):
         """获取含有dbz的sweep"""
-        flag = np.array([((self.SAB.radial[idx]['fields']["V"].size == 0) and
-                          (self.SAB.radial[idx]['fields']["dBZ"].size != 0)) \
-                         for idx in self.SAB.sweep_start_ray_index])
+        flag = np.array([((igates["V"] == 0) and (igates["dBZ"] != 0)) for igates in self.SAB.sweep_gates])
         return np.where(flag == 1)[0]
 
     def interp_dBZ(self, field_with_dBZ_num, field_without_dBZ_num):
@@ -237,26 +311,24 @@ class SAB2NRadar(object):
                          self.SAB.sweep_end_ray_index[field_with_dBZ_num] + 1]
         v_az = azimuth[self.SAB.sweep_start_ray_index[field_without_dBZ_num]: \
                        self.SAB.sweep_end_ray_index[field_without_dBZ_num] + 1]
-        dbz_idx = np.argmin(np.abs(dbz_az.reshape(-1, 1) - v_az.reshape(1, -1)), axis=0) + \
-                  self.SAB.sweep_start_ray_index[field_with_dBZ_num]
-        v_idx = np.arange(self.SAB.sweep_start_ray_index[field_without_dBZ_num], \
-                          self.SAB.sweep_end_ray_index[field_without_dBZ_num] + 1)
-        for ind_dbz, ind_v in zip(dbz_idx, v_idx):
-            self.SAB.radial[ind_v]["fields"]['dBZ'] = self.SAB.radial[ind_dbz]["fields"]['dBZ']
+        dbz_idx = np.argmin(np.abs(dbz_az.reshape(-1, 1) - v_az.reshape(1, -1)), axis=0) ##sweep内的序号
+        if 'dBZ' in self.SAB.sweep_fields[field_with_dBZ_num]:
+            self.SAB.sweep_fields[field_without_dBZ_num]['dBZ'] = \
+                self.SAB.sweep_fields[field_with_dBZ_num]['dBZ'][dbz_idx]
 
     def get_azimuth(self):
         """
         获取每根径向的方位角
         :return:(nRays)
         """
-        return np.array([iradial['AZ'] / 8. * 180. / 4096. for iradial in self.radial])
+        return self.radial['AZ'] / 8. * 180. / 4096.
 
     def get_elevation(self):
         """
         获取每根径向的仰角
         :return: (nRays)
         """
-        return np.array([iradial['El'] / 8. * 180. / 4096. for iradial in self.radial])
+        return self.radial['El'] / 8. * 180. / 4096.
 
     def get_rays_per_sweep(self):
         """
@@ -270,21 +342,21 @@ class SAB2NRadar(object):
         获取每根径向的扫描时间
         :return:(nRays)
         """
-        return np.array([julian2date(iradial['JulianDate'], iradial['mSends']) for iradial in self.radial])
+        return julian2date(self.radial['JulianDate'], self.radial['mSends'])
 
     def get_nyquist_velocity(self):
         """get nyquist vel per ray
         获取每根径向的不模糊速度
         :return:(nRays)
         """
-        return np.array([iradial['Nyquist'] / 100. for iradial in self.radial])
+        return self.radial['Nyquist'] / 100.
 
     def get_unambiguous_range(self):
         """
         获取每根径向的不模糊距离
         :return:(nRays)
         """
-        return np.array([iradial['URange'] / 10. for iradial in self.radial])
+        return self.radial['URange'] / 10.
 
     def get_sweep_end_ray_index(self):
         """
@@ -305,7 +377,7 @@ class SAB2NRadar(object):
         确定每个sweep V探测的库数
         :return:
         """
-        return np.array([self.radial[idx]['fields']['V'].size for idx in self.sweep_start_ray_index])
+        return np.array([igates['V'] for igates in self.sweep_gates])
 
     def get_range_per_radial(self, length):
         """
@@ -313,7 +385,7 @@ class SAB2NRadar(object):
         :param length:
         :return:
         """
-        Resolution = self.radial[0]["GateSizeOfDoppler"]
+        Resolution = int(self.radial[0]["GateSizeOfDoppler"])
         return np.linspace(Resolution, Resolution * length, length)
 
     def get_dbz_range_per_radial(self, length):
@@ -323,53 +395,52 @@ class SAB2NRadar(object):
         :return:
         """
         Resolution = self.dBZ_Res
-        start_range = self.radial[0]["GateSizeOfDoppler"]
+        start_range = int(self.radial[0]["GateSizeOfDoppler"])
         return np.linspace(start_range, start_range + Resolution * (length - 1), length)
 
     def _get_fields(self):
         """将所有的field的数据提取出来"""
         fields = {}
-        field_keys = self.radial[0]['fields'].keys()
+        field_keys = self.sweep_fields[0].keys()
         for ikey in field_keys:
-            fields[ikey] = np.array([self._add_or_del_field(iray['fields'], ikey) for iray in self.radial])
+            fields[ikey] = np.concatenate([self._add_or_del_field(ifields, ikey) for ifields in self.sweep_fields], axis=0)
         return fields
 
     def _add_or_del_field(self, dat_fields, key):
         """
-        根据fields的key提取数据, 将dbz的数据和dop的数据分辨率统一
-        :param dat_fields: fields的数据
+        根据fields的key提取一个sweep的数据, 将dbz的数据和dop的数据分辨率统一
+        :param dat_fields: sweep的fields的数据
         :param key: key words
-        :return:
+        :return: (nrays, max_bins)
         """
         length = self.max_bins
         if key == "dBZ":
-            dbz_range = self.get_dbz_range_per_radial(dat_fields[key].size)
+            dbz_range = self.get_dbz_range_per_radial(dat_fields[key].shape[1])
             dop_range = self.range
-            match_data = interpolate.interp1d(dbz_range, dat_fields[key], kind="nearest",
+            match_data = interpolate.interp1d(dbz_range, dat_fields[key], kind="nearest", axis=1,
                                               bounds_error=False, fill_value=np.nan)
-            dat_ray = match_data(dop_range)
-            #print(dop_range, dbz_range)
-            #print(dat_ray)
-            return dat_ray.ravel()
+            return match_data(dop_range).astype(np.float32)
         else:
-            dat_ray = dat_fields[key]
-        if dat_ray.size >= length:
-            return (dat_ray[:length]).ravel()
+            dat_sweep = dat_fields[key]
+        if dat_sweep.shape[1] >= length:
+            return dat_sweep[:, :length]
         else:
-            out = np.full((length,), np.nan)
-            out[:dat_ray.size] = dat_ray
-            return out.ravel()
+            out = np.full((dat_sweep.shape[0], length), np.nan, dtype=np.float32)
+            out[:, :dat_sweep.shape[1]] = dat_sweep
+            return out
 
     def get_NRadar_nyquist_speed(self):
         """array shape (nsweeps)"""
-        return np.array([self.radial[idx]['Nyquist'] / 100. for idx in self.sweep_start_ray_index])
+        return self.radial['Nyquist'][self.sweep_start_ray_index] / 100.
 
     def get_NRadar_unambiguous_range(self):
         """array shape (nsweeps)"""
-        return np.array([self.radial[idx]['URange'] / 10. for idx in self.sweep_start_ray_index])
+        return self.radial['URange'][self.sweep_start_ray_index] / 10.
 
     def get_fixed_angle(self):
-        if self.nsweeps == 9:
+        if self.SAB.sweeps is not None:  ##只读取了部分sweep, 不能按VCP的仰角表确定
+            fixed_angle = self.radial['El'][self.sweep_start_ray_index] / 8. * 180. / 4096.
+        elif self.nsweeps == 9:
             fixed_angle = np.array([0.50, 1.45, 2.40, 3.35, 4.30, 6.00, 9.00, 14.6, 19.5])
         elif self.nsweeps == 14:
             fixed_angle = np.array([0.50, 1.45, 2.40, 3.35, 4.30, 5.25, 6.2, 7.5, 8.7, 10, 12, 14, 16.7, 19.5])
@@ -378,19 +449,34 @@ class SAB2NRadar(object):
         elif self.nsweeps == 4:
             fixed_angle = np.array([0.50, 2.50, 3.50, 4.50])
         else:
-            fixed_angle = np.array([self.radial[idx]['El'] / 8. * 180. / 4096. for idx in self.sweep_start_ray_index])
+            fixed_angle = self.radial['El'][self.sweep_start_ray_index] / 8. * 180. / 4096.
         return fixed_angle
 
-    def ToPRD(self):
-        """将WSR98D数据转为PRD的数据格式"""
-        return PRD(fields=self.fields, scan_type=self.scan_type, time=self.get_scan_time(), \
+    def ToPRD(self, packed=False):
+        """
+        将WSR98D数据转为PRD的数据格式
+        :param packed: True时PRD中的要素保存为原始的整型编码, 取值时才解码为float32
+        """
+        ##PRD保留本对象用于延迟生成Py-ART Radar, 逐sweep的数据已经合并到fields中, 释放掉
+        self.sweep_fields = self.SAB.sweep_fields = None
+        prd = PRD(fields=self.fields, scan_type=self.scan_type, time=self.get_scan_time(), \
                           range=self.range, azimuth=self.azimuth, elevation=self.elevation, latitude=self.latitude, \
                           longitude=self.longitude, altitude=self.altitude,
                           sweep_start_ray_index=self.sweep_start_ray_index, \
                           sweep_end_ray_index=self.sweep_end_ray_index, fixed_angle=self.get_fixed_angle(), \
                           bins_per_sweep=self.bins_per_sweep, nyquist_velocity=self.get_NRadar_nyquist_speed(), \
                           frequency=self.frequency, unambiguous_range=self.get_NRadar_unambiguous_range(), \
-                          nrays=self.nrays, nsweeps=self.nsweeps, sitename = self.sitename, pyart_radar=self.ToPyartRadar())
+                          nrays=self.nrays, nsweeps=self.nsweeps, sitename = self.sitename, pyart_radar=self.ToPyartRadar,
+                          field_encoding=self.field_encoding if packed else None, pyart_meta=self._pyart_meta())
+        if packed:  ##不再保留浮点的体扫数据, 生成Py-ART Radar时由PRD解码
+            self.fields = prd.get_volume_fields(len(self.range))
+        return prd
+
+    def _pyart_meta(self):
+        """PRD中没有的Py-ART Radar信息, 由PRD生成Radar(多进程读取, 缓存, load_prd)时使用"""
+        return {"original_container": "CINRAD/SAB", "radar_name": "CINRAD/SA/SB/CB/SC", "meters_between_gates": int(self.radial[0]["GateSizeOfDoppler"]),
+                "instrument_parameters": {key: value["data"] for key, value in \
+                                          self._get_instrument_parameters().items()}}
 
     def ToPyartRadar(self):
         """转化为Pyart Radar的对象"""
@@ -405,8 +491,8 @@ class SAB2NRadar(object):
         # assume that the number of gates and spacing from the first ray is
         # representative of the entire volume
         _range['data'] = self.range
-        _range['meters_to_center_of_first_gate'] = self.radial[0]["GateSizeOfDoppler"]
-        _range['meters_between_gates'] = self.radial[0]["GateSizeOfDoppler"]
+        _range['meters_to_center_of_first_gate'] = int(self.radial[0]["GateSizeOfDoppler"])
+        _range['meters_between_gates'] = int(self.radial[0]["GateSizeOfDoppler"])
 
         latitude = get_metadata('latitude')
         longitude = get_metadata('longitude')
@@ -1,10 +1,10 @@
 # -*- coding: utf-8 -*-
 import numpy as np
 from .BaseDataProtocol.SCProtocol import dtype_sc
-from .util import _prepare_for_read, _unpack_from_buf, make_time_unit_str, get_radar_sitename
-import pandas as pd
+from .util import _prepare_for_read, _unpack_from_buf, _structure_dtype, make_time_unit_str, get_radar_sitename, \
+    _radial_headers, _select_sweeps
 import datetime
-from ..core.NRadar import PRD
+from ..core.NRadar import PRD, ScanInfo
 from ..configure.pyart_config import get_metadata, get_fillvalue
 from ..configure.default_config import CINRAD_field_mapping, _LIGHT_SPEED
 from ..core.PyartRadar import Radar
@@ -14,25 +14,37 @@ class SCBaseData(object):
     """
     解码SC/CD 1.0的数据格式
     """
-    def __init__(self, filename, station_lon=None, station_lat=None, station_alt=None):
+    def __init__(self, filename, station_lon=None, station_lat=None, station_alt=None, header_only=False,
+                 fields=None, sweeps=None, elevation_range=None):
         """
         :param filename:  radar basedata filename
         :param station_lon:  radar station longitude //units: degree east
         :param station_lat:  radar station latitude //units:degree north
         :param station_alt:  radar station altitude //units: meters
+        :param header_only:  只解析头和径向头, 不解码要素数据
+        :param fields:  需要解码的要素名, 如["dBZ"], None为全部(dBZ, V, dBT, W)
+        :param sweeps:  需要解码的sweep序号(文件中的顺序, 从0开始), None为全部
+        :param elevation_range:  (最小仰角, 最大仰角), 只解码仰角在该范围内的sweep
         """
         super(SCBaseData, self).__init__()
         self.filename = filename
+        self.field_names = fields
+        self.sweeps = None
         self.station_lon = station_lon
         self.station_lat = station_lat
         self.station_alt = station_alt
         self.fid = _prepare_for_read(self.filename) ##判断是否是压缩文件
-        buf_header = self.fid.read(dtype_sc.BaseDataHeaderSize) ##取出header的buf
-        self.header = self._parse_BaseDataHeader(buf_header)
+        self.header = self._parse_BaseDataHeader(self.fid.read(dtype_sc.BaseDataHeaderSize)) ##header的buf
         self.MaxV = self.header['LayerParam']['MaxV'][0]/100. ##??可能会存在问题，如果不同仰角采用不用的PRF
         self._check_sc_basedata()
         self.fid.seek(dtype_sc.BaseDataHeaderSize, 0) ##移动到径向数据的位置
-        self.radial = self._parse_radial()
+        if sweeps is not None or elevation_range is not None:
+            self._subset_sweeps(sweeps, elevation_range)
+        if not header_only:
+            self.radial = self._parse_radial()
+            self.sweep_fields = self._parse_sweep_fields()
+            self.nbins = self.radial['data'].shape[1]
+            self.radial = _radial_headers(self.radial)  ##库数据已经解码, 只保留径向头的副本
         self.fid.close()
 
     def _check_sc_basedata(self):
@@ -61,7 +73,7 @@ class SCBaseData(object):
         self.nsweeps = BaseDataHeader_dict['RadarObserationParam_1']['stype'] - 100
         ##解码不同仰角的观测参数
         BaseDataHeader_dict['LayerParam'] = np.frombuffer(buf_header, \
-        dtype_sc.BaseDataHeader['LayerParamX30'],count=self.nsweeps, offset=dtype_sc.LayerParamPos)
+        dtype_sc.BaseDataHeader['LayerParamX30'],count=self.nsweeps, offset=dtype_sc.LayerParamPos).copy()
         ####################sc basedata has wrong bandwidth############
         BaseDataHeader_dict["binWidth"] = np.full_like(BaseDataHeader_dict['LayerParam']["binWidth"], 5000, dtype=np.int32)
         ####################sc basedata has wrong bandwidth############
@@ -69,45 +81,63 @@ class SCBaseData(object):
         BaseDataHeader_dict['RadarObserationParam_2'], _ = _unpack_from_buf(buf_header,\
             dtype_sc.RadarObserationParamPos_2, dtype_sc.BaseDataHeader['RadarObserationParam_2'])
         self.nrays = np.sum((BaseDataHeader_dict['LayerParam']['recordnumber']).astype(np.int64))
+        self.volume_nrays = self.nrays  ##文件中的径向数, 只读取部分sweep时不变
         self.sweep_end_ray_index_add1 = np.cumsum((BaseDataHeader_dict['LayerParam']['recordnumber']).astype(np.int64)) ##python格式的结束
         self.sweep_start_ray_index = self.sweep_end_ray_index_add1 - \
                                      (BaseDataHeader_dict['LayerParam']['recordnumber']).astype(np.int64)
         return BaseDataHeader_dict
 
-    def _parse_radial(self):
-        radial = []
-        for isweep in range(self.nsweeps):
-            MaxV = self.header['LayerParam']['MaxV'][isweep] / 100.
-            for _ in range(self.header['LayerParam']['recordnumber'][isweep]):
-                buf_radial = self.fid.read(dtype_sc.PerRadialSize)
-                radial.append(self._parse_radial_single(buf_radial, 0, MaxV, -1))
-        return radial
+    def _subset_sweeps(self, sweeps, elevation_range):
+        """
+        只保留需要的sweep的头信息, 记录其在文件中的起始记录, 读取时直接跳到这些记录
+        """
+        LayerParam = self.header['LayerParam']
+        self.sweeps = _select_sweeps(self.nsweeps, sweeps, elevation_range, LayerParam['Swangles'] / 100.)
+        self.sweep_record_offset = self.sweep_start_ray_index[self.sweeps]
+        self.header['LayerParam'] = LayerParam[self.sweeps]
+        self.nsweeps = len(self.sweeps)
+        rays_per_sweep = (self.header['LayerParam']['recordnumber']).astype(np.int64)
+        self.nrays = np.sum(rays_per_sweep)
+        self.sweep_end_ray_index_add1 = np.cumsum(rays_per_sweep)
+        self.sweep_start_ray_index = self.sweep_end_ray_index_add1 - rays_per_sweep
 
-    def _parse_radial_single(self, buf_radial, start_pos, MaxV, num_bins=-1):
+    def _parse_radial(self):
         """
-        :param buf_radial:
-        :param start_pos: 开始的pos
-        :param num_bins: 库数
-        :return:
+        每个sweep的径向为等长记录的连续块, 将全部径向读为结构化数组(径向头 + 库数据)
+        :return:(nRays)
         """
-        radial_dict = {}
-        radial_dict_tmp, size_tmp = _unpack_from_buf(buf_radial, start_pos, dtype_sc.RadialHeader())
-        radial_dict.update(radial_dict_tmp)
-        radial_dict['fields'] = {}
-        ##basedata save some error data
-        #RadialData = np.frombuffer(buf_radial, dtype_sc.RadialData(),\
-        #                                 count=num_bins, offset=start_pos+size_tmp)
-        RadialData = np.frombuffer(buf_radial, dtype_sc.RadialData(),\
-                                         count=500, offset=start_pos+size_tmp)
-        radial_dict['fields']['dBZ'] = np.where(RadialData['dBZ'] != 0,\
-                            (RadialData['dBZ'].astype(int) - 64)/2., np.nan).astype(np.float32)
-        radial_dict['fields']['dBT'] = np.where(RadialData['dBT'] != 0, \
-                        (RadialData['dBT'].astype(int) - 64) / 2., np.nan).astype(np.float32)
-        radial_dict['fields']['V'] = np.where(RadialData['V'] != 0, \
-                       MaxV * (RadialData['V'].astype(int) - 128) / 128., np.nan).astype(np.float32)
-        radial_dict['fields']['W'] = np.where(RadialData['W'] != 0, \
-                        MaxV * RadialData['W'].astype(int) /256., np.nan).astype(np.float32)
-        return radial_dict
+        RadialHeader = _structure_dtype(dtype_sc.RadialHeader())
+        RadialRecord = np.dtype({'names': list(RadialHeader.names) + ['data'],
+                                 'formats': [RadialHeader[iname] for iname in RadialHeader.names] + \
+                                            [(dtype_sc.RadialData(), (500,))],
+                                 'offsets': [RadialHeader.fields[iname][1] for iname in RadialHeader.names] + \
+                                            [RadialHeader.itemsize],
+                                 'itemsize': dtype_sc.PerRadialSize})
+        if self.sweeps is None:
+            return np.frombuffer(self.fid.read(dtype_sc.PerRadialSize * self.nrays), dtype=RadialRecord)
+        buf = []
+        for offset, nrays in zip(self.sweep_record_offset, self.get_rays_per_sweep()):
+            self.fid.seek(dtype_sc.BaseDataHeaderSize + dtype_sc.PerRadialSize * int(offset), 0)
+            buf.append(self.fid.read(dtype_sc.PerRadialSize * int(nrays)))
+        return np.frombuffer(b"".join(buf), dtype=RadialRecord)
+
+    def _parse_sweep_fields(self):
+        """
+        逐个sweep整块解码, 每个要素只做一次查表转换
+        :return: list(nsweeps), 每个sweep为{要素名: (nrays, nbins)}
+        """
+        code = np.arange(256)
+        dBZ_table = np.where(code != 0, (code - 64) / 2., np.nan).astype(np.float32)
+        sweep_fields = []
+        for isweep in range(self.nsweeps):
+            MaxV = self.header['LayerParam']['MaxV'][isweep] / 100.
+            V_table = np.where(code != 0, MaxV * (code - 128) / 128., np.nan).astype(np.float32)
+            W_table = np.where(code != 0, MaxV * code / 256., np.nan).astype(np.float32)
+            RadialData = self.radial['data'][self.sweep_start_ray_index[isweep]:self.sweep_end_ray_index_add1[isweep]]
+            tables = {'dBZ': dBZ_table, 'dBT': dBZ_table, 'V': V_table, 'W': W_table}
+            sweep_fields.append({ikey: table[RadialData[ikey]] for ikey, table in tables.items() \
+                                 if self.field_names is None or ikey in self.field_names})
+        return sweep_fields
 
     def get_nyquist_velocity(self):
         """get nyquist vel per ray
@@ -140,7 +170,13 @@ class SCBaseData(object):
         end_time = datetime.datetime(year=End_params['Eyear'], month=End_params['Emonth'],
                                        day=End_params['Eday'], hour=End_params['Ehour'],
                                        minute=End_params['Eminute'], second=End_params['Esecond'])
-        return pd.date_range(start_time, end_time, periods=self.nrays).to_pydatetime() - datetime.timedelta(hours=8)
+        import pandas as pd  ##只有这里用到pandas, 用到时才导入
+        scan_time = pd.date_range(start_time, end_time, periods=self.volume_nrays).to_pydatetime() - datetime.timedelta(hours=8)
+        if self.sweeps is None:
+            return scan_time
+        ##只读取了部分sweep时, 取这些sweep的径向在整个体扫中的时间
+        return np.concatenate([scan_time[int(offset):int(offset) + int(nrays)] for offset, nrays in
+                               zip(self.sweep_record_offset, self.header['LayerParam']['recordnumber'])])
 
     def get_sweep_end_ray_index(self):
         """
@@ -174,7 +210,7 @@ class SCBaseData(object):
         获取每根径向的仰角
         :return: (nRays)
         """
-        return np.array([(iray['sStrEl'] + iray['sEndEl'])*180./65536 for iray in self.radial])
+        return (self.radial['sStrEl'].astype(np.int64) + self.radial['sEndEl']) * 180. / 65536
 
     def get_latitude_longitude_altitude_frequency(self):
         """
@@ -204,12 +240,26 @@ class SCBaseData(object):
     def get_sitename(self):
         return get_radar_sitename(self.filename)
 
+    def get_scan_info(self):
+        """
+        只用头的信息生成ScanInfo
+        :return: ScanInfo
+        """
+        lat, lon, alt, frequency = self.get_latitude_longitude_altitude_frequency()
+        scan_time = self.get_scan_time()
+        LayerParam = self.header['LayerParam']
+        return ScanInfo(sitename=self.get_sitename(), task_name=None, scan_type=self.get_scan_type(),
+                        latitude=lat, longitude=lon, altitude=alt, frequency=frequency,
+                        start_time=scan_time[0], end_time=scan_time[-1], fixed_angle=LayerParam['Swangles'] / 100.,
+                        rays_per_sweep=self.get_rays_per_sweep(), bins_per_sweep=np.full(self.nsweeps, 500),
+                        nyquist_velocity=LayerParam['MaxV'] / 100., unambiguous_range=LayerParam['MaxL'] * 10.)
+
 class SC2NRadar(object):
     """到NusitRadar object 的桥梁"""
 
     def __init__(self, SC):
         self.SC = SC
-        self.radial = self.SC.radial
+        self.sweep_fields = self.SC.sweep_fields
         self.azimuth = self.get_azimuth()
         self.elevation = self.get_elevation()
         self.sweep_start_ray_index = self.get_sweep_start_ray_index()
@@ -224,6 +274,20 @@ class SC2NRadar(object):
         self.range = self.get_range_per_radial(self.max_bins)
         self.fields = self._get_fields()
         self.sitename = self.SC.get_sitename()
+        self.field_encoding = self.get_field_encoding()
+
+    def get_field_encoding(self):
+        """
+        每个sweep各要素的整型编码方式, 与SCBaseData中的查找表一致
+        :return: list(nsweeps), 每个sweep为{要素名: (dtype, scale, offset, 缺测的编码)}
+        """
+        field_encoding = []
+        for MaxV in self.SC.header['LayerParam']['MaxV'] / 100.:
+            encoding = {'dBZ': ('u1', 2., 64., 0), 'dBT': ('u1', 2., 64., 0)}
+            if MaxV > 0:
+                encoding.update({'V': ('u1', 128. / MaxV, 128., 0), 'W': ('u1', 256. / MaxV, 0., 0)})
+            field_encoding.append(encoding)
+        return field_encoding
 
     def get_azimuth(self):
         """
@@ -286,7 +350,7 @@ class SC2NRadar(object):
         确定每个sweep V探测的库数
         :return:
         """
-        return np.array([self.radial[idx]['fields']['dBZ'].size for idx in self.sweep_start_ray_index])
+        return np.full(self.nsweeps, self.SC.nbins)
 
     def get_range_per_radial(self, length):
         """
@@ -300,9 +364,9 @@ class SC2NRadar(object):
     def _get_fields(self):
         """将所有的field的数据提取出来"""
         fields = {}
-        field_keys = self.radial[0]['fields'].keys()
+        field_keys = self.sweep_fields[0].keys()
         for ikey in field_keys:
-            fields[ikey] = np.array([(iray['fields'][ikey]).ravel() for iray in self.radial])
+            fields[ikey] = np.concatenate([ifields[ikey] for ifields in self.sweep_fields], axis=0)
         return fields
 
     def get_NRadar_nyquist_speed(self):
@@ -316,17 +380,32 @@ class SC2NRadar(object):
     def get_fixed_angle(self):
         return self.SC.header['LayerParam']['Swangles'] / 100.
 
-    def ToPRD(self):
-        """将WSR98D数据转为PRD的数据格式"""
+    def ToPRD(self, packed=False):
+        """
+        将WSR98D数据转为PRD的数据格式
+        :param packed: True时PRD中的要素保存为原始的整型编码, 取值时才解码为float32
+        """
 
-        return PRD(fields=self.fields, scan_type=self.scan_type, time=self.get_scan_time(), \
+        ##PRD保留本对象用于延迟生成Py-ART Radar, 逐sweep的数据已经合并到fields中, 释放掉
+        self.sweep_fields = self.SC.sweep_fields = None
+        prd = PRD(fields=self.fields, scan_type=self.scan_type, time=self.get_scan_time(), \
                           range=self.range, azimuth=self.azimuth, elevation=self.elevation, latitude=self.latitude, \
                           longitude=self.longitude, altitude=self.altitude,
                           sweep_start_ray_index=self.sweep_start_ray_index, \
                           sweep_end_ray_index=self.sweep_end_ray_index, fixed_angle=self.get_fixed_angle(), \
                           bins_per_sweep=self.bins_per_sweep, nyquist_velocity=self.get_NRadar_nyquist_speed(), \
                           frequency=self.frequency, unambiguous_range=self.get_NRadar_unambiguous_range(), \
-                          nrays=self.nrays, nsweeps=self.nsweeps, sitename = self.sitename, pyart_radar=self.ToPyartRadar())
+                          nrays=self.nrays, nsweeps=self.nsweeps, sitename = self.sitename, pyart_radar=self.ToPyartRadar,
+                          field_encoding=self.field_encoding if packed else None, pyart_meta=self._pyart_meta())
+        if packed:  ##不再保留浮点的体扫数据, 生成Py-ART Radar时由PRD解码
+            self.fields = prd.get_volume_fields(len(self.range))
+        return prd
+
+    def _pyart_meta(self):
+        """PRD中没有的Py-ART Radar信息, 由PRD生成Radar(多进程读取, 缓存, load_prd)时使用"""
+        return {"original_container": "CINRAD/SC", "radar_name": "CINRAD/SC", "meters_between_gates": self.range[0],
+                "instrument_parameters": {key: value["data"] for key, value in \
+                                          self._get_instrument_parameters().items()}}
 
     def ToPyartRadar(self):
 
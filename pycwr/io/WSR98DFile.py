@@ -1,8 +1,12 @@
 # -*- coding: utf-8 -*-
+import bz2
+import zlib
 import numpy as np
 from .BaseDataProtocol.WSR98DProtocol import dtype_98D
-from .util import _prepare_for_read, _unpack_from_buf, julian2date_SEC, make_time_unit_str
-from ..core.NRadar import PRD
+from .util import _prepare_for_read, _unpack_from_buf, julian2date_SEC, make_time_unit_str, \
+    _index_radial_blocks, _gather_structure, _structure_dtype, _decode_sweep_moments, _sweep_moment_gates, \
+    _select_moments, _select_sweeps, _sweep_ray_index, _sweep_moment_encoding
+from ..core.NRadar import PRD, ScanInfo, _SweepGeolocation, _sweep_dataset, _set_sweep_field
 from ..configure.pyart_config import get_metadata, get_fillvalue
 from ..configure.default_config import CINRAD_field_mapping
 from ..core.PyartRadar import Radar
@@ -14,27 +18,45 @@ class WSR98DBaseData(object):
     解码新一代双偏振的数据格式
     """
 
-    def __init__(self, filename, station_lon=None, station_lat=None, station_alt=None):
+    def __init__(self, filename, station_lon=None, station_lat=None, station_alt=None, header_only=False,
+                 fields=None, sweeps=None, elevation_range=None):
         """
         :param filename:  radar basedata filename
         :param station_lon:  radar station longitude //units: degree east
         :param station_lat:  radar station latitude //units:degree north
         :param station_alt:  radar station altitude //units: meters
+        :param header_only:  只解析头和径向头, 不解码要素数据
+        :param fields:  需要解码的要素名, 如["dBZ", "V"], None为全部, 其余要素的数据块直接跳过
+        :param sweeps:  需要解码的sweep序号(文件中的顺序, 从0开始), None为全部
+        :param elevation_range:  (最小仰角, 最大仰角), 只解码仰角在该范围内的sweep
         """
         super(WSR98DBaseData, self).__init__()
         self.filename = filename
+        self.field_names = fields
+        self.sweeps = None
         self.station_lon = station_lon
         self.station_lat = station_lat
         self.station_alt = station_alt
         self.fid = _prepare_for_read(self.filename)  ##对压缩的文件进行解码
         self._check_standard_basedata()  ##确定文件是standard文件
         self.header = self._parse_BaseDataHeader()
-        self.radial = self._parse_radial()
+        raw = np.frombuffer(self.fid.read(), dtype="u1")  ##径向数据的buf
+        self.radial, moment, moment_ray, data_pos = self._parse_radial(raw)
         self.nrays = len(self.radial)
-        status = np.array([istatus['RadialState'] for istatus in self.radial[:]])
+        status = self.radial['RadialState']
         self.sweep_start_ray_index = np.where((status == 0) | (status == 3))[0]
         self.sweep_end_ray_index = np.where((status == 2) | (status == 4))[0]
         self.nsweeps = len(self.sweep_start_ray_index)
+        self.sweep_gates = _sweep_moment_gates(moment, moment_ray, self.sweep_start_ray_index,
+                                               self.sweep_end_ray_index, dtype_98D.flag2Product)
+        if sweeps is not None or elevation_range is not None:
+            moment, moment_ray, data_pos = self._subset_sweeps(sweeps, elevation_range, moment, moment_ray, data_pos)
+        self.bins_per_sweep = np.array([igates.get("V", 0) for igates in self.sweep_gates])  ##每个sweep V的库数
+        self.sweep_encoding = _sweep_moment_encoding(moment, moment_ray, self.sweep_start_ray_index,
+                                                     self.sweep_end_ray_index, dtype_98D.flag2Product)
+        if not header_only:
+            self.sweep_fields = self._parse_sweep_fields(raw, moment, moment_ray, data_pos)
+        del raw  ##close会释放文件的buf, 之前不能再有引用
         self.fid.close()
 
     def _check_standard_basedata(self):
@@ -61,37 +83,54 @@ class WSR98DBaseData(object):
                                                            dtype_98D.BaseDataHeader['TaskConfigurationBlock'])
         cut_buf = self.fid.read(dtype_98D.CutConfigurationBlockSize * \
                                 BaseDataHeader['TaskConfig']['CutNumber'])
-        BaseDataHeader['CutConfig'] = np.frombuffer(cut_buf, dtype_98D.BaseDataHeader['CutConfigurationBlock'])
+        BaseDataHeader['CutConfig'] = np.frombuffer(cut_buf, dtype_98D.BaseDataHeader['CutConfigurationBlock']).copy()
         return BaseDataHeader
 
-    def _parse_radial(self):
-        radial = []
-        buf = self.fid.read(dtype_98D.RadialHeaderBlockSize)
-        while len(buf) == dtype_98D.RadialHeaderBlockSize:  ##read until EOF
-            RadialDict, _ = _unpack_from_buf(buf, 0, dtype_98D.RadialHeader())
-            self.MomentNum = RadialDict['MomentNumber']
-            self.LengthOfData = RadialDict['LengthOfData']
-            RadialDict['fields'] = self._parse_radial_single()
-            radial.append(RadialDict)
-            buf = self.fid.read(dtype_98D.RadialHeaderBlockSize)
-        return radial
-
-    def _parse_radial_single(self):
-        radial_var = {}
-        for _ in range(self.MomentNum):
-            Mom_buf = self.fid.read(dtype_98D.MomentHeaderBlockSize)
-            Momheader, _ = _unpack_from_buf(Mom_buf, 0, dtype_98D.RadialData())
-            Data_buf = self.fid.read(Momheader['Length'])
-            assert (Momheader['BinLength'] == 1) | (Momheader['BinLength'] == 2), "Bin Length has problem!"
-            if Momheader['BinLength'] == 1:
-                dat_tmp = (np.frombuffer(Data_buf, dtype="u1", offset=0)).astype(int)
-            else:
-                dat_tmp = (np.frombuffer(Data_buf, dtype="u2", offset=0)).astype(int)
-            radial_var[dtype_98D.flag2Product[Momheader['DataType']]] = np.where(dat_tmp >= 5, \
-                                                                                 (dat_tmp - Momheader['Offset']) /
-                                                                                 Momheader['Scale'],
-                                                                                 np.nan).astype(np.float32)
-        return radial_var
+    def _parse_radial(self, raw):
+        """
+        扫描一遍径向数据, 建立径向头和要素数据块的索引
+        :param raw: 径向数据, uint8
+        :return: 径向头(nrays), 要素头(nmoments), 要素所属的径向(nmoments), 要素数据的位置(nmoments)
+        """
+        radial_pos, moment_pos, moment_ray, _ = _index_radial_blocks(raw, 0, dtype_98D.RadialHeader(),
+                                                                      dtype_98D.RadialData())
+        radial = _gather_structure(raw, radial_pos, _structure_dtype(dtype_98D.RadialHeader()))
+        moment = _gather_structure(raw, moment_pos, _structure_dtype(dtype_98D.RadialData()))
+        return radial, moment, moment_ray, moment_pos + dtype_98D.MomentHeaderBlockSize
+
+    def _subset_sweeps(self, sweeps, elevation_range, moment, moment_ray, data_pos):
+        """
+        只保留需要的sweep的径向, 其余径向的要素数据块不做解码
+        :return: 保留的要素头, 要素所属的新径向序号, 要素数据的位置
+        """
+        CutConfig = self.header['CutConfig']
+        self.sweeps = _select_sweeps(self.nsweeps, sweeps, elevation_range, CutConfig['Elevation'], self.sweep_gates)
+        ray_index, self.sweep_start_ray_index, self.sweep_end_ray_index = \
+            _sweep_ray_index(self.sweeps, self.sweep_start_ray_index, self.sweep_end_ray_index)
+        rank = np.full(self.nrays, -1, dtype=np.int64)
+        rank[ray_index] = np.arange(ray_index.size)
+        moment_ray = rank[moment_ray]
+        keep = moment_ray >= 0
+        self.radial = self.radial[ray_index]
+        self.nrays = len(self.radial)
+        self.nsweeps = len(self.sweeps)
+        self.sweep_gates = [self.sweep_gates[isweep] for isweep in self.sweeps]
+        self.header['CutConfig'] = CutConfig[self.sweeps]
+        return moment[keep], moment_ray[keep], data_pos[keep]
+
+    def _parse_sweep_fields(self, raw, moment, moment_ray, data_pos):
+        """
+        按sweep批量解码需要的要素
+        :return: list(nsweeps), 每个sweep为{要素名: (nrays, nbins)}
+        """
+        select = _select_moments(moment['DataType'], dtype_98D.flag2Product, self.field_names)
+        moment, moment_ray, data_pos = moment[select], moment_ray[select], data_pos[select]
+        sweep_fields = []
+        for istart, iend in zip(self.sweep_start_ray_index, self.sweep_end_ray_index):
+            lo, hi = np.searchsorted(moment_ray, [istart, iend + 1])
+            sweep_fields.append(_decode_sweep_moments(raw, moment[lo:hi], data_pos[lo:hi], moment_ray[lo:hi] - istart,
+                                                      iend - istart + 1, dtype_98D.flag2Product))
+        return sweep_fields
 
     def get_nyquist_velocity(self):
         """get nyquist vel per ray
@@ -114,7 +153,7 @@ class WSR98DBaseData(object):
         获取每根径向的扫描时间
         :return:(nRays)
         """
-        return np.array([julian2date_SEC(iray['Seconds'], iray['MicroSeconds']) for iray in self.radial])
+        return julian2date_SEC(self.radial['Seconds'], self.radial['MicroSeconds'])
 
     def get_sweep_end_ray_index(self):
         """
@@ -142,14 +181,14 @@ class WSR98DBaseData(object):
         获取每根径向的方位角
         :return:(nRays)
         """
-        return np.array([self.radial[iray]['Azimuth'] for iray in range(self.nrays)])
+        return self.radial['Azimuth'].astype(np.float64)
 
     def get_elevation(self):
         """
         获取每根径向的仰角
         :return: (nRays)
         """
-        return np.array([self.radial[iray]['Elevation'] for iray in range(self.nrays)])
+        return self.radial['Elevation'].astype(np.float64)
 
     def get_latitude_longitude_altitude_frequency(self):
         """
@@ -178,6 +217,23 @@ class WSR98DBaseData(object):
     def get_sitename(self):
         return (self.header['SiteConfig']['SiteName']).decode('UTF-8', 'ignore').strip().strip(b'\x00'.decode())
 
+    def get_scan_info(self):
+        """
+        只用头和径向头的信息生成ScanInfo
+        :return: ScanInfo
+        """
+        lat, lon, alt, frequency = self.get_latitude_longitude_altitude_frequency()
+        scan_time = julian2date_SEC(self.radial['Seconds'][[0, -1]], self.radial['MicroSeconds'][[0, -1]])
+        scan_type = self.get_scan_type()
+        CutConfig = self.header['CutConfig'][:self.nsweeps]
+        return ScanInfo(sitename=self.get_sitename(),
+                        task_name=self.header['TaskConfig']['TaskName'].decode('UTF-8', 'ignore').strip('\x00 '),
+                        scan_type=scan_type, latitude=lat, longitude=lon, altitude=alt, frequency=frequency,
+                        start_time=scan_time[0], end_time=scan_time[-1],
+                        fixed_angle=CutConfig['Azimuth'] if scan_type == "rhi" else CutConfig['Elevation'],
+                        rays_per_sweep=self.get_rays_per_sweep(), bins_per_sweep=self.bins_per_sweep,
+                        nyquist_velocity=CutConfig['NyquistSpeed'], unambiguous_range=CutConfig['MaximumRange'])
+
 
 class WSR98D2NRadar(object):
     """到NusitRadar object 的桥梁"""
@@ -201,9 +257,15 @@ class WSR98D2NRadar(object):
                 self.interp_dBZ(index_with_dbz, index_with_v)
 
         ind_remove = self.get_reomve_radial_num()
-        self.radial = [iray for ind, iray in enumerate(self.WSR98D.radial) if ind not in ind_remove]
-
-        status = np.array([istatus['RadialState'] for istatus in self.radial[:]])
+        self.radial = np.delete(self.WSR98D.radial, np.asarray(ind_remove, dtype=int))
+        self.sweep_fields = [ifields for isweep, ifields in enumerate(self.WSR98D.sweep_fields) \
+                             if isweep not in self.dBZ_index_alone]
+        self.sweep_gates = [igates for isweep, igates in enumerate(self.WSR98D.sweep_gates) \
+                            if isweep not in self.dBZ_index_alone]
+        self.field_encoding = [iencoding for isweep, iencoding in enumerate(self.WSR98D.sweep_encoding) \
+                               if isweep not in self.dBZ_index_alone]  ##每个sweep各要素的整型编码方式
+
+        status = self.radial['RadialState']
         self.sweep_start_ray_index = np.where((status == 0) | (status == 3))[0]
         self.sweep_end_ray_index = np.where((status == 2) | (status == 4))[0]
         self.nsweeps = len(self.sweep_start_ray_index)
@@ -232,16 +294,14 @@ class WSR98D2NRadar(object):
 
     def get_v_idx(self):
         """获取需要插值的sweep, 插值到有径向速度仰角"""
-        flag = np.array([(("V" in self.WSR98D.radial[idx]['fields'].keys()) and (
-                    "dBZ" not in self.WSR98D.radial[idx]['fields'].keys())) \
-                         for idx in self.WSR98D.sweep_start_ray_index])
+        flag = np.array([(("V" in igates.keys()) and ("dBZ" not in igates.keys())) \
+                         for igates in self.WSR98D.sweep_gates])
         return np.where(flag == 1)[0]
 
     def get_dbz_idx(self):
         """获取含有dbz的sweep"""
-        flag = np.array([(("dBZ" in self.WSR98D.radial[idx]['fields'].keys()) and (
-                    "V" not in self.WSR98D.radial[idx]['fields'].keys())) \
-                         for idx in self.WSR98D.sweep_start_ray_index])
+        flag = np.array([(("dBZ" in igates.keys()) and ("V" not in igates.keys())) \
+                         for igates in self.WSR98D.sweep_gates])
         return np.where(flag == 1)[0]
 
     def interp_VCP26(self, dBZ_sweep_index, V_sweep_index):
@@ -251,15 +311,17 @@ class WSR98D2NRadar(object):
         :param V_sweep_index: array, dBZ单独扫描的仰角
         :return:
         """
-        add_keys = ["V", "W"]
+        add_keys = [ikey for ikey in ["V", "W"] if self.WSR98D.field_names is None or ikey in self.WSR98D.field_names]
         same_sweeps = min(len(dBZ_sweep_index), len(V_sweep_index))
         for isweep in range(same_sweeps):
             self.interp_dBZ(dBZ_sweep_index[isweep], V_sweep_index[isweep])
         for dbz_dense in dBZ_sweep_index[same_sweeps:]:
-            for index in range(self.WSR98D.sweep_start_ray_index[dbz_dense], self.WSR98D.sweep_end_ray_index[dbz_dense]+1):
-                for ikey in add_keys:
-                    self.WSR98D.radial[index]["fields"][ikey] = np.full_like(self.WSR98D.radial[index]["fields"]["dBZ"],\
-                                                                             np.nan, dtype=np.float32)
+            dense_fields = self.WSR98D.sweep_fields[dbz_dense]
+            dense_gates = self.WSR98D.sweep_gates[dbz_dense]
+            nrays = self.WSR98D.sweep_end_ray_index[dbz_dense] - self.WSR98D.sweep_start_ray_index[dbz_dense] + 1
+            for ikey in add_keys:
+                dense_fields[ikey] = np.full((nrays, dense_gates["dBZ"]), np.nan, dtype=np.float32)
+            dense_gates.update({ikey: dense_gates["dBZ"] for ikey in ["V", "W"]})
 
     def interp_dBZ(self, field_with_dBZ_num, field_without_dBZ_num):
         """
@@ -274,29 +336,28 @@ class WSR98D2NRadar(object):
                          self.WSR98D.sweep_end_ray_index[field_with_dBZ_num] + 1]
         v_az = azimuth[self.WSR98D.sweep_start_ray_index[field_without_dBZ_num]: \
                        self.WSR98D.sweep_end_ray_index[field_without_dBZ_num] + 1]
-        dbz_idx = np.argmin(np.abs(dbz_az.reshape(-1, 1) - v_az.reshape(1, -1)), axis=0) + \
-                  self.WSR98D.sweep_start_ray_index[field_with_dBZ_num] ##最邻近插值
-
-        v_idx = np.arange(self.WSR98D.sweep_start_ray_index[field_without_dBZ_num], \
-                          self.WSR98D.sweep_end_ray_index[field_without_dBZ_num] + 1)
-        keys = self.WSR98D.radial[self.WSR98D.sweep_start_ray_index[field_with_dBZ_num]]['fields'].keys()
-        for ind_dbz, ind_v in zip(dbz_idx, v_idx):
-            for ikey in keys:
-                self.WSR98D.radial[ind_v]["fields"][ikey] = self.WSR98D.radial[ind_dbz]["fields"][ikey]
+        dbz_idx = np.argmin(np.abs(dbz_az.reshape(-1, 1) - v_az.reshape(1, -1)), axis=0) ##最邻近插值, sweep内的序号
+        dbz_fields = self.WSR98D.sweep_fields[field_with_dBZ_num]
+        v_fields = self.WSR98D.sweep_fields[field_without_dBZ_num]
+        for ikey in dbz_fields.keys():
+            v_fields[ikey] = dbz_fields[ikey][dbz_idx]
+        self.WSR98D.sweep_encoding[field_without_dBZ_num].update(
+            {ikey: iencoding for ikey, iencoding in self.WSR98D.sweep_encoding[field_with_dBZ_num].items() \
+             if ikey in dbz_fields})
 
     def get_azimuth(self):
         """
         获取每根径向的方位角
         :return:(nRays)
         """
-        return np.array([self.radial[iray]['Azimuth'] for iray in range(self.nrays)])
+        return self.radial['Azimuth'].astype(np.float64)
 
     def get_elevation(self):
         """
         获取每根径向的仰角
         :return: (nRays)
         """
-        elevation = np.array([self.radial[iray]['Elevation'] for iray in range(self.nrays)])
+        elevation = self.radial['Elevation'].astype(np.float64)
         return np.where(elevation>180, elevation-360, elevation)
 
     def get_rays_per_sweep(self):
@@ -311,7 +372,7 @@ class WSR98D2NRadar(object):
         获取每根径向的扫描时间
         :return:(nRays)
         """
-        return np.array([julian2date_SEC(iray['Seconds'], iray['MicroSeconds']) for iray in self.radial])
+        return julian2date_SEC(self.radial['Seconds'], self.radial['MicroSeconds'])
 
     def get_nyquist_velocity(self):
         """get nyquist vel per ray
@@ -348,7 +409,7 @@ class WSR98D2NRadar(object):
         确定每个sweep V探测的库数
         :return:
         """
-        return np.array([self.radial[idx]['fields']['V'].size for idx in self.sweep_start_ray_index])
+        return np.array([igates['V'] for igates in self.sweep_gates])
 
     def get_range_per_radial(self, length):
         """
@@ -371,39 +432,41 @@ class WSR98D2NRadar(object):
     def _get_fields(self):
         """将所有的field的数据提取出来"""
         fields = {}
-        field_keys = self.radial[0]['fields'].keys()
+        field_keys = self.sweep_fields[0].keys()
+        rays_per_sweep = self.get_rays_per_sweep()
         for ikey in field_keys:
-            fields[ikey] = np.array([self._add_or_del_field(iray['fields'], ikey, self.flag_match) for iray in self.radial])
+            fields[ikey] = np.concatenate([self._add_or_del_field(ifields, ikey, nrays, self.flag_match) for \
+                                           ifields, nrays in zip(self.sweep_fields, rays_per_sweep)], axis=0)
         return fields
 
-    def _add_or_del_field(self, dat_fields, key, flag_match=True):
+    def _add_or_del_field(self, dat_fields, key, nrays, flag_match=True):
         """
-        根据fields的key提取数据
-        :param dat_fields: fields的数据
+        根据fields的key提取一个sweep的数据
+        :param dat_fields: sweep的fields的数据
         :param key: key words
+        :param nrays: sweep的径向数
         :param flag_match: dop和dbz分辨率是否匹配, 匹配则为True，不匹配为False
-        :return:
+        :return: (nrays, max_bins)
         """
         length = self.max_bins
         if key not in dat_fields.keys():
-            return np.full((length,), np.nan)
+            return np.full((nrays, length), np.nan, dtype=np.float32)
 
         if flag_match == False:
             if key == "dBZ":
-                dbz_range = self.get_dbz_range_per_radial(dat_fields[key].size)
+                dbz_range = self.get_dbz_range_per_radial(dat_fields[key].shape[1])
                 dop_range = self.get_range_per_radial(length)
-                match_data = interpolate.interp1d(dbz_range, dat_fields[key], kind="nearest",
+                match_data = interpolate.interp1d(dbz_range, dat_fields[key], kind="nearest", axis=1,
                                                   bounds_error=False, fill_value=np.nan)
-                dat_ray = match_data(dop_range)
-                return dat_ray.ravel()
+                return match_data(dop_range).astype(np.float32)
 
-        dat_ray = dat_fields[key]
-        assert dat_ray.ndim == 1, "check dat_ray"
-        if dat_ray.size >= length:
-            return dat_ray[:length]
+        dat_sweep = dat_fields[key]
+        assert dat_sweep.ndim == 2, "check dat_sweep"
+        if dat_sweep.shape[1] >= length:
+            return dat_sweep[:, :length]
         else:
-            out = np.full((length,), np.nan)
-            out[:dat_ray.size] = dat_ray
+            out = np.full((nrays, length), np.nan, dtype=np.float32)
+            out[:, :dat_sweep.shape[1]] = dat_sweep
             return out
 
     def get_NRadar_nyquist_speed(self):
@@ -420,16 +483,31 @@ class WSR98D2NRadar(object):
         else:
             return self.header['CutConfig']['Elevation']
 
-    def ToPRD(self):
-        """将WSR98D数据转为PRD的数据格式"""
-        return PRD(fields=self.fields, scan_type=self.scan_type, time=self.get_scan_time(), \
+    def ToPRD(self, packed=False):
+        """
+        将WSR98D数据转为PRD的数据格式
+        :param packed: True时PRD中的要素保存为原始的整型编码, 取值时才解码为float32
+        """
+        ##PRD保留本对象用于延迟生成Py-ART Radar, 逐sweep的数据已经合并到fields中, 释放掉
+        self.sweep_fields = self.WSR98D.sweep_fields = None
+        prd = PRD(fields=self.fields, scan_type=self.scan_type, time=self.get_scan_time(), \
                           range=self.range, azimuth=self.azimuth, elevation=self.elevation, latitude=self.latitude, \
                           longitude=self.longitude, altitude=self.altitude,
                           sweep_start_ray_index=self.sweep_start_ray_index, \
                           sweep_end_ray_index=self.sweep_end_ray_index, fixed_angle=self.get_fixed_angle(), \
                           bins_per_sweep=self.bins_per_sweep, nyquist_velocity=self.get_NRadar_nyquist_speed(), \
                           frequency=self.frequency, unambiguous_range=self.get_NRadar_unambiguous_range(), \
-                          nrays=self.nrays, nsweeps=self.nsweeps, sitename = self.sitename, pyart_radar=self.ToPyartRadar())
+                          nrays=self.nrays, nsweeps=self.nsweeps, sitename = self.sitename, pyart_radar=self.ToPyartRadar,
+                          field_encoding=self.field_encoding if packed else None, pyart_meta=self._pyart_meta())
+        if packed:  ##不再保留浮点的体扫数据, 生成Py-ART Radar时由PRD解码
+            self.fields = prd.get_volume_fields(len(self.range))
+        return prd
+
+    def _pyart_meta(self):
+        """PRD中没有的Py-ART Radar信息, 由PRD生成Radar(多进程读取, 缓存, load_prd)时使用"""
+        return {"original_container": "WSR98D", "radar_name": "WSR98D", "meters_between_gates": self.header['CutConfig']['DopplerResolution'][0],
+                "instrument_parameters": {key: value["data"] for key, value in \
+                                          self._get_instrument_parameters().items()}}
 
     def ToPyartRadar(self):
         """转化为Pyart Radar的对象"""
@@ -539,3 +617,210 @@ class WSR98D2NRadar(object):
         nyquist_velocity['data'] = self.get_nyquist_velocity()
         instrument_parameters['nyquist_velocity'] = nyquist_velocity
         return instrument_parameters
+
+
+class WSR98DStream(object):
+    """
+    增量解码正在写入的WSR98D数据, 每完成一个sweep(RadialState为2或4)就生成该sweep的xr.Dataset,
+    已经解析过的径向不再重复解析, 缓存中只保留当前未完成sweep的数据
+    库的距离和要素的插值与read_auto相同, 各sweep与read_auto结果中对应的sweep一致, 除了:
+    dBZ和V分开扫描的仰角按文件中的顺序各自输出, 不做合并, 只有dBZ的sweep库数为dBZ的库数, 没有补V/W
+    usage:
+        stream = WSR98DStream()
+        while not stream.finished:
+            for ppi in stream.poll(filename):
+                ...
+    """
+
+    def __init__(self, station_lon=None, station_lat=None, station_alt=None, fields=None):
+        """
+        :param station_lon:  radar station longitude //units: degree east
+        :param station_lat:  radar station latitude //units:degree north
+        :param station_alt:  radar station altitude //units: meters
+        :param fields:  需要解码的要素名, 如["dBZ"], None为全部
+        """
+        self.station_lon = station_lon
+        self.station_lat = station_lat
+        self.station_alt = station_alt
+        self.field_names = fields
+        self.header = None
+        self.nsweeps = 0  ##已经输出的sweep数
+        self.finished = False  ##已经输出了最后一个仰角
+        self._buf = bytearray()
+        self._pos = 0  ##下一根未解析径向在缓存中的位置
+        self._radial, self._moment, self._moment_ray, self._data_pos = [], [], [], []  ##当前sweep已解析的部分
+        self._nrays = 0  ##当前sweep已解析的径向数
+        self._file_pos = 0  ##poll已经读取的文件长度
+        self._compression = None  ##poll由文件头判断: "bz2", "gz"或""(未压缩)
+        self._decompressor = None
+        self._radial_dtype = _structure_dtype(dtype_98D.RadialHeader())
+        self._moment_dtype = _structure_dtype(dtype_98D.RadialData())
+
+    def feed(self, data):
+        """
+        追加数据并解析新增的完整径向
+        :param data: 新写入的bytes(未压缩)
+        :return: list, 本次完成的sweep, 每个为xr.Dataset
+        """
+        self._buf += data
+        if self.header is None and not self._parse_header():
+            return []
+        radial_pos, moment_pos, moment_ray, self._pos = _index_radial_blocks(self._buf, self._pos,
+                                                                             dtype_98D.RadialHeader(),
+                                                                             dtype_98D.RadialData())
+        if not radial_pos.size:
+            return []
+        raw = np.frombuffer(self._buf, dtype="u1")
+        radial = _gather_structure(raw, radial_pos, self._radial_dtype)
+        moment = _gather_structure(raw, moment_pos, self._moment_dtype)
+        del raw  ##释放对缓存的引用, 之后才能截断缓存
+        status = radial['RadialState']
+        sweeps = []
+        start = 0
+        for iend in np.where((status == 2) | (status == 4))[0]:
+            self._append(radial, moment, moment_ray, moment_pos, start, iend + 1)
+            ##该sweep在缓存中的结束位置, 即下一根径向的开始
+            sweep_end = int(radial_pos[iend + 1]) if iend + 1 < radial_pos.size else self._pos
+            sweeps.append(self._finish_sweep(sweep_end))
+            radial_pos, moment_pos = radial_pos - sweep_end, moment_pos - sweep_end
+            start = iend + 1
+        self._append(radial, moment, moment_ray, moment_pos, start, radial.size)
+        return sweeps
+
+    def poll(self, filename):
+        """
+        读取文件新写入的部分, 由文件头判断是否为bz2或gzip压缩, 压缩时边读边解压
+        :param filename: 正在写入的基数据文件
+        :return: list, 本次完成的sweep
+        """
+        with open(filename, "rb") as fid:
+            fid.seek(self._file_pos)
+            data = fid.read()
+        if self._compression is None:
+            if len(data) < 3:  ##还不能判断是否压缩, 下次重新读取
+                return []
+            self._compression = "bz2" if data.startswith(b"BZh") else "gz" if data.startswith(b"\x1f\x8b") else ""
+        self._file_pos += len(data)
+        if self._compression:
+            data = self._decompress(data)
+        return self.feed(data)
+
+    def _decompress(self, data):
+        """
+        解压新读取的数据, 一个流/成员结束后还有数据时继续解压下一个(pbzip2, pigz等的输出由多个流/成员拼接)
+        :return: bytes
+        """
+        out = []
+        while data:
+            if self._decompressor is None:
+                self._decompressor = bz2.BZ2Decompressor() if self._compression == "bz2" else \
+                    zlib.decompressobj(16 + zlib.MAX_WBITS)
+            out.append(self._decompressor.decompress(data))
+            if not self._decompressor.eof:
+                break
+            data = self._decompressor.unused_data
+            self._decompressor = None
+        return b"".join(out)
+
+    def _parse_header(self):
+        """
+        缓存中已有完整的头时解析头
+        :return: 是否解析成功
+        """
+        if len(self._buf) < dtype_98D.CutConfigurationBlockPos:
+            return False
+        assert self._buf[:4] == b'RSTM', 'file in not a stardand WSR-98D file!'
+        fixed_buf = bytes(self._buf[:dtype_98D.CutConfigurationBlockPos])
+        header = {}
+        header['GenericHeader'], _ = _unpack_from_buf(fixed_buf, dtype_98D.GenericHeaderBlockPos,
+                                                      dtype_98D.BaseDataHeader['GenericHeaderBlock'])
+        header['SiteConfig'], _ = _unpack_from_buf(fixed_buf, dtype_98D.SiteConfigurationBlockPos,
+                                                   dtype_98D.BaseDataHeader['SiteConfigurationBlock'])
+        header['TaskConfig'], _ = _unpack_from_buf(fixed_buf, dtype_98D.TaskConfigurationBlockPos,
+                                                   dtype_98D.BaseDataHeader['TaskConfigurationBlock'])
+        end = dtype_98D.CutConfigurationBlockPos + \
+              dtype_98D.CutConfigurationBlockSize * header['TaskConfig']['CutNumber']
+        if len(self._buf) < end:
+            return False
+        header['CutConfig'] = np.frombuffer(bytes(self._buf[dtype_98D.CutConfigurationBlockPos:end]),
+                                            dtype_98D.BaseDataHeader['CutConfigurationBlock'])
+        self.header = header
+        self._pos = end
+        return True
+
+    def _append(self, radial, moment, moment_ray, moment_pos, start, end):
+        """将第start~end根新径向加入当前sweep"""
+        if start == end:
+            return
+        lo, hi = np.searchsorted(moment_ray, [start, end])
+        self._radial.append(radial[start:end])
+        self._moment.append(moment[lo:hi])
+        self._moment_ray.append(moment_ray[lo:hi] - start + self._nrays)
+        self._data_pos.append(moment_pos[lo:hi] + dtype_98D.MomentHeaderBlockSize)
+        self._nrays += end - start
+
+    def _finish_sweep(self, sweep_end):
+        """
+        解码当前sweep, 并从缓存中删除该sweep的数据
+        :param sweep_end: 该sweep在缓存中的结束位置
+        """
+        radial = np.concatenate(self._radial)
+        moment = np.concatenate(self._moment)
+        moment_ray = np.concatenate(self._moment_ray)
+        data_pos = np.concatenate(self._data_pos)
+        select = _select_moments(moment['DataType'], dtype_98D.flag2Product, self.field_names)
+        raw = np.frombuffer(self._buf, dtype="u1")
+        fields = _decode_sweep_moments(raw, moment[select], data_pos[select], moment_ray[select], self._nrays,
+                                       dtype_98D.flag2Product)
+        del raw
+        gates = _sweep_moment_gates(moment, moment_ray, [0], [self._nrays - 1], dtype_98D.flag2Product)[0]
+        del self._buf[:sweep_end]
+        self._pos -= sweep_end
+        self._radial, self._moment, self._moment_ray, self._data_pos = [], [], [], []
+        self._nrays = 0
+        ppi = self._sweep_dataset(radial, fields, gates, self.nsweeps)
+        self.nsweeps += 1
+        self.finished = radial['RadialState'][-1] == 4
+        return ppi
+
+    def _sweep_dataset(self, radial, fields, gates, isweep):
+        """
+        生成一个sweep的xr.Dataset, 库的距离和各要素的处理与WSR98D2NRadar相同
+        :param radial: 该sweep的径向头
+        :param fields: {要素名: (nrays, nbins)}
+        :param gates: {要素名: 库数}, 包括没有解码的要素
+        :param isweep: 文件中的sweep序号
+        """
+        CutConfig = self.header['CutConfig']
+        cut = CutConfig[min(isweep, len(CutConfig) - 1)]
+        SiteConfig = self.header['SiteConfig']
+        ##库长为第一个仰角的DopplerResolution, 库数为V的库数, 没有V时为dBZ的库数(read_auto中同样补V/W)
+        resolution = CutConfig['DopplerResolution'][0]
+        nbins = gates.get("V", gates.get("dBZ", max(gates.values(), default=0)))
+        _range = np.linspace(resolution, resolution * nbins, nbins)
+        ##各仰角的LogResolution与DopplerResolution不全相同时, dBZ由第一个仰角的LogResolution最邻近插值到上面的库
+        flag_match = np.all(CutConfig['LogResolution'] == CutConfig['DopplerResolution'])
+        elevation = radial['Elevation'].astype(np.float64)
+        geo = _SweepGeolocation(_range, radial['Azimuth'].astype(np.float64),
+                                np.where(elevation > 180, elevation - 360, elevation),
+                                SiteConfig['Height'] if self.station_alt is None else self.station_alt,
+                                SiteConfig['Longitude'] if self.station_lon is None else self.station_lon,
+                                SiteConfig['Latitude'] if self.station_lat is None else self.station_lat)
+        ppi = _sweep_dataset(julian2date_SEC(radial['Seconds'], radial['MicroSeconds']), geo)
+        for ikey, ifield in fields.items():
+            if ikey == "dBZ" and not flag_match:
+                dbz_range = np.linspace(CutConfig['LogResolution'][0], CutConfig['LogResolution'][0] * ifield.shape[1],
+                                        ifield.shape[1])
+                ifield = interpolate.interp1d(dbz_range, ifield, kind="nearest", axis=1, bounds_error=False,
+                                              fill_value=np.nan)(_range).astype(np.float32)
+            elif ifield.shape[1] >= nbins:
+                ifield = ifield[:, :nbins]
+            else:
+                out = np.full((ifield.shape[0], nbins), np.nan, dtype=np.float32)
+                out[:, :ifield.shape[1]] = ifield
+                ifield = out
+            _set_sweep_field(ppi, ikey, ifield)
+        ppi.attrs = {"sweep_number": isweep, "fixed_angle": float(cut['Elevation']),
+                     "nyquist_velocity": float(cut['NyquistSpeed']),
+                     "unambiguous_range": float(cut['MaximumRange'])}
+        return ppi
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+将PRD写为新一代双偏振的标准格式基数据, 每个sweep的径向整体编码, 一次写入文件
+"""
+import bz2
+import gzip
+import numpy as np
+from .BaseDataProtocol.WSR98DProtocol import dtype_98D
+from .util import _structure_dtype
+
+##要素名: (DataType, Scale, Offset, BinLength), 物理量 = (code - Offset) / Scale
+WSR98D_encoding = {'dBT': (1, 2, 66, 1),
+                   'dBZ': (2, 2, 66, 1),
+                   'V': (3, 2, 129, 1),
+                   'W': (4, 2, 129, 1),
+                   'SQI': (5, 2, 129, 1),
+                   'CPA': (6, 2, 129, 1),
+                   'ZDR': (7, 16, 130, 1),
+                   'LDR': (8, 16, 130, 1),
+                   'CC': (9, 200, 5, 1),
+                   'PhiDP': (10, 100, 50, 2),
+                   'KDP': (11, 10, 50, 1),
+                   'CP': (12, 2, 129, 1),
+                   'HCL': (14, 1, 0, 1),
+                   'CF': (15, 2, 129, 1),
+                   'SNRH': (16, 2, 20, 1),
+                   'SNRV': (17, 2, 20, 1),
+                   'Zc': (32, 2, 66, 1),
+                   'Vc': (33, 2, 129, 1),
+                   'Wc': (34, 2, 129, 1),
+                   'ZDRc': (35, 16, 130, 1)}
+
+_scan_type = {"ppi": 0, "rhi": 2, "sector": 3}
+
+def _field_encoding(ppi, key):
+    """
+    要素的编码方式, packed的要素沿用原来的整型编码(Scale和Offset为整数时), 否则(包括该sweep没有的要素)用WSR98D_encoding
+    :return: (DataType, Scale, Offset, BinLength)
+    """
+    DataType, Scale, Offset, BinLength = WSR98D_encoding[key]
+    encoding = ppi[key].encoding if key in ppi.data_vars else {}
+    if "scale_factor" in encoding and np.dtype(encoding["dtype"]).str in ("<u1", "|u1", "<u2"):
+        scale = 1. / encoding["scale_factor"]
+        offset = -encoding["add_offset"] * scale
+        if np.isclose(scale, round(scale)) and np.isclose(offset, round(offset)):
+            return DataType, int(round(scale)), int(round(offset)), np.dtype(encoding["dtype"]).itemsize
+    return DataType, Scale, Offset, BinLength
+
+def _encode(dat, Scale, Offset, BinLength):
+    """
+    物理量编码为整型, 缺测为0, 有效值限制在[5, 最大值]内(解码时小于5的编码为缺测)
+    :param dat: (nrays, nbins)
+    :return: (nrays, nbins) uint8/uint16
+    """
+    code = dat * np.float32(Scale)
+    code += np.float32(Offset)
+    np.rint(code, out=code)
+    np.clip(code, 5, 2 ** (8 * BinLength) - 1, out=code)
+    code[np.isnan(code)] = 0
+    return code.astype("<u%d" % BinLength)
+
+def _encode_sweep(ppi, keys, isweep, sequence, first, last):
+    """
+    将一个sweep的所有径向编码为一个结构化数组
+    :param ppi: PRD的一个sweep
+    :param keys: 需要写入的要素名, 该sweep没有的要素写为缺测
+    :param isweep: sweep序号, 从0开始
+    :param sequence: 该sweep之前的径向数
+    :param first: 是否为体扫的第一个sweep
+    :param last: 是否为体扫的最后一个sweep
+    :return: 结构化数组(nrays), 每个元素为一根径向的径向头, 要素头和要素数据
+    """
+    nrays, nbins = ppi.sizes["time"], ppi.sizes["range"]
+    encodings = [_field_encoding(ppi, ikey) for ikey in keys]
+    moment_dtype = _structure_dtype(dtype_98D.RadialData())
+    record = [("radial", _structure_dtype(dtype_98D.RadialHeader()))]
+    for idx, (_, _, _, BinLength) in enumerate(encodings):
+        record.extend([("moment%d" % idx, moment_dtype), ("data%d" % idx, "<u%d" % BinLength, (nbins,))])
+    out = np.zeros(nrays, dtype=np.dtype(record))
+    radial = out["radial"]
+    state = np.ones(nrays, dtype=np.int32)
+    state[0], state[-1] = (3 if first else 0), (4 if last else 2)
+    radial["RadialState"] = state
+    radial["SequenceNumber"] = np.arange(sequence + 1, sequence + nrays + 1)
+    radial["RadialNumber"] = np.arange(1, nrays + 1)
+    radial["ElevationNumber"] = isweep + 1
+    radial["Azimuth"] = ppi.azimuth.values
+    radial["Elevation"] = ppi.elevation.values
+    usec = ppi.time.values.astype("datetime64[us]").astype(np.int64)
+    radial["Seconds"], radial["MicroSeconds"] = usec // 10 ** 6, usec % 10 ** 6
+    radial["LengthOfData"] = out.dtype.itemsize - radial.dtype.itemsize
+    radial["MomentNumber"] = len(keys)
+    for idx, (ikey, (DataType, Scale, Offset, BinLength)) in enumerate(zip(keys, encodings)):
+        moment = out["moment%d" % idx]
+        moment["DataType"], moment["Scale"], moment["Offset"] = DataType, Scale, Offset
+        moment["BinLength"], moment["Length"] = BinLength, BinLength * nbins
+        if ikey in ppi.data_vars:  ##没有的要素保持为0(缺测)
+            out["data%d" % idx] = _encode(ppi[ikey].values, Scale, Offset, BinLength)
+    return out
+
+def _encode_header(prd, keys, site_code, task_name, beam_width):
+    """
+    生成通用头, 站点配置, 任务配置和各仰角的配置
+    :return: bytes
+    """
+    scan_info = prd.scan_info
+    scan_type = str(scan_info.scan_type.values)
+    header = np.zeros(1, dtype=_structure_dtype(dtype_98D.BaseDataHeader['GenericHeaderBlock']))
+    header["MagicWord"] = np.frombuffer(b"RSTM", dtype="<i4")[0]
+    header["MajorVersion"], header["GenericType"] = 1, 1
+    site = np.zeros(1, dtype=_structure_dtype(dtype_98D.BaseDataHeader['SiteConfigurationBlock']))
+    site["SiteCode"] = site_code.encode("UTF-8")
+    site["SiteName"] = str(prd.sitename).encode("UTF-8")
+    site["Latitude"], site["Longitude"] = scan_info.latitude.values, scan_info.longitude.values
+    site["Height"] = site["Ground"] = int(scan_info.altitude.values)
+    site["Frequency"] = scan_info.frequency.values * 1000.  ##GHz -> MHz
+    site["BeamWidthHori"] = site["BeamWidthVert"] = beam_width
+    task = np.zeros(1, dtype=_structure_dtype(dtype_98D.BaseDataHeader['TaskConfigurationBlock']))
+    task["TaskName"] = task_name.encode("UTF-8")
+    task["ScanType"] = 1 if (scan_type == "ppi" and prd.nsweeps == 1) else _scan_type.get(scan_type, 6)
+    task["VolumeStartTime"] = prd.fields[0].time.values[0].astype("datetime64[s]").astype(np.int64)
+    task["CutNumber"] = prd.nsweeps
+    cut = np.zeros(prd.nsweeps, dtype=dtype_98D.BaseDataHeader['CutConfigurationBlock'])
+    resolution = [int(round(ppi.range.values[1] - ppi.range.values[0])) if ppi.sizes["range"] > 1 else \
+                  int(round(ppi.range.values[0])) for ppi in prd.fields]
+    cut["LogResolution"] = cut["DopplerResolution"] = resolution
+    cut["StartRange"] = 0
+    cut["Azimuth" if scan_type == "rhi" else "Elevation"] = scan_info.fixed_angle.values
+    cut["AngleResolution"] = scan_info.beam_width.values
+    cut["NyquistSpeed"] = scan_info.nyquist_velocity.values
+    cut["MaximumRange"] = scan_info.unambiguous_range.values
+    cut["MomentsMask"] = sum(1 << WSR98D_encoding[ikey][0] for ikey in keys)
+    return header.tobytes() + site.tobytes() + task.tobytes() + cut.tobytes()
+
+def write_WSR98D(prd, filename, compress=None, site_code="", task_name="", beam_width=0.93):
+    """
+    将PRD写为WSR98D标准格式的基数据
+    :param prd: PRD object
+    :param filename: 输出的文件名
+    :param compress: None不压缩, "bz2"或"gz"时压缩后写入
+    :param site_code: 站号, 如"Z9250"
+    :param task_name: 任务名称, 如"VCP21"
+    :param beam_width: 波束宽度 units:degree
+    :return:
+    """
+    assert compress in (None, "bz2", "gz"), "compress must be None, 'bz2' or 'gz'!"
+    keys = []  ##各sweep要素的并集, 按第一次出现的顺序
+    for ppi in prd.fields:
+        keys.extend(ikey for ikey in ppi.data_vars if ikey in WSR98D_encoding and ikey not in keys)
+    assert keys, "no field can be written to WSR98D!"
+    buf = [_encode_header(prd, keys, site_code, task_name, beam_width)]
+    sequence = 0
+    for isweep, ppi in enumerate(prd.fields):
+        buf.append(_encode_sweep(ppi, keys, isweep, sequence, isweep == 0, isweep == prd.nsweeps - 1).tobytes())
+        sequence += ppi.sizes["time"]
+    buf = b"".join(buf)
+    if compress == "bz2":
+        buf = bz2.compress(buf)
+    elif compress == "gz":
+        buf = gzip.compress(buf)
+    with open(filename, "wb") as f:
+        f.write(buf)
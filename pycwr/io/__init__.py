@@ -1,70 +1,136 @@
 from . import SCFile, WSR98DFile, SABFile, CCFile, PAFile
-from .util import radar_format
+from .util import radar_format, register_format, _prepare_for_read, get_radar_info_many
+from .batch import read_many
+from .watcher import DirectoryWatcher
+from .WSR98DFile import WSR98DStream
+from .WSR98DWriter import write_WSR98D
+from .CfRadialWriter import write_cfradial
+from .cache import ReadCache
+from .PRDFile import save_prd, load_prd
 
-__all__ = ["read_auto", "CCFile", "SCFile", "WSR98DFile", "SABFile"]
+__all__ = ["read_auto", "read_many", "get_radar_info_many", "DirectoryWatcher", "WSR98DStream", "write_WSR98D", "write_cfradial", "ReadCache",
+           "save_prd", "load_prd", "CCFile", "SCFile", "WSR98DFile", "SABFile"]
 
-def read_auto(filename, station_lon=None, station_lat=None, station_alt=None):
+_BaseData = {"WSR98D": (WSR98DFile.WSR98DBaseData, WSR98DFile.WSR98D2NRadar),
+             "SAB": (SABFile.SABBaseData, SABFile.SAB2NRadar),
+             "CC": (CCFile.CCBaseData, CCFile.CC2NRadar),
+             "SC": (SCFile.SCBaseData, SCFile.SC2NRadar),
+             "PA": (PAFile.PABaseData, PAFile.PA2NRadar)}
+
+def read_auto(filename, station_lon=None, station_lat=None, station_alt=None, header_only=False, fields=None,
+              sweeps=None, elevation_range=None, packed=False, cache=None):
     """
     :param filename:  radar basedata filename
     :param station_lon:  radar station longitude //units: degree east
     :param station_lat:  radar station latitude //units:degree north
     :param station_alt:  radar station altitude //units: meters
+    :param header_only:  True时只解析头信息, 返回轻量级的ScanInfo, 不解码要素数据
+    :param fields:  需要解码的要素名, 如["dBZ"], None为全部
+    :param sweeps:  需要解码的sweep序号(文件中的顺序, 从0开始), 如[0, 1], None为全部,
+                    dBZ和V分开扫描的两个仰角会一起读取并合并
+    :param elevation_range:  (最小仰角, 最大仰角), 只解码仰角在该范围内的sweep
+    :param packed:  True时PRD中的要素保存为原始的整型编码(约为float32的1/4~1/2), 取值时才解码
+    :param cache:  ReadCache或缓存目录, 相同内容和参数的文件直接从缓存读取, None不使用缓存
     """
-    radar_type = radar_format(filename)
-    if radar_type == "WSR98D":
-        return WSR98DFile.WSR98D2NRadar(WSR98DFile.WSR98DBaseData(filename, station_lon, station_lat, station_alt)).ToPRD()
-    elif radar_type == "SAB":
-        return SABFile.SAB2NRadar(SABFile.SABBaseData(filename, station_lon, station_lat, station_alt)).ToPRD()
-    elif radar_type == "CC":
-        return CCFile.CC2NRadar(CCFile.CCBaseData(filename, station_lon, station_lat, station_alt)).ToPRD()
-    elif radar_type == "SC":
-        return SCFile.SC2NRadar(SCFile.SCBaseData(filename, station_lon, station_lat, station_alt)).ToPRD()
-    elif radar_type == "PA":
-        return PAFile.PA2NRadar(PAFile.PABaseData(filename, station_lon, station_lat, station_alt)).ToPRD()
-    else:
-        raise TypeError("unsupported radar type!")
+    if cache is not None and not header_only:
+        if not isinstance(cache, ReadCache):
+            cache = ReadCache(cache)
+        return cache.read(filename, station_lon=station_lon, station_lat=station_lat, station_alt=station_alt,
+                          fields=fields, sweeps=sweeps, elevation_range=elevation_range, packed=packed)
+    fid = _prepare_for_read(filename)  ##只解压一次, 判断格式和解码共用同一个buf
+    try:
+        radar_type = radar_format(fid)
+        if radar_type not in _BaseData:
+            raise TypeError("unsupported radar type!")
+        BaseData, ToNRadar = _BaseData[radar_type]
+        if header_only:
+            return BaseData(fid, station_lon, station_lat, station_alt, header_only=True, sweeps=sweeps,
+                            elevation_range=elevation_range).get_scan_info()
+        return ToNRadar(BaseData(fid, station_lon, station_lat, station_alt, fields=fields, sweeps=sweeps,
+                                 elevation_range=elevation_range)).ToPRD(packed=packed)
+    except BaseException:  ##损坏或不完整的文件, 立即释放mmap/解压后的buf, 成功时读取类已经关闭
+        try:
+            fid.close()
+        except BufferError:  ##异常的traceback中还有对buf的引用, 随异常一起释放
+            pass
+        raise
 
-def read_SAB(filename, station_lon=None, station_lat=None, station_alt=None):
+def read_SAB(filename, station_lon=None, station_lat=None, station_alt=None, fields=None, sweeps=None,
+             elevation_range=None, packed=False):
     """
     :param filename:  radar basedata filename
     :param station_lon:  radar station longitude //units: degree east
     :param station_lat:  radar station latitude //units:degree north
     :param station_alt:  radar station altitude //units: meters
+    :param fields:  需要解码的要素名, 如["dBZ"], None为全部
+    :param sweeps:  需要解码的sweep序号(文件中的顺序, 从0开始), 如[0, 1], None为全部,
+                    dBZ和V分开扫描的两个仰角会一起读取并合并
+    :param elevation_range:  (最小仰角, 最大仰角), 只解码仰角在该范围内的sweep
+    :param packed:  True时PRD中的要素保存为原始的整型编码(约为float32的1/4~1/2), 取值时才解码
     """
-    return SABFile.SAB2NRadar(SABFile.SABBaseData(filename, station_lon, station_lat, station_alt)).ToPRD()
+    return SABFile.SAB2NRadar(SABFile.SABBaseData(filename, station_lon, station_lat, station_alt, fields=fields,
+        sweeps=sweeps, elevation_range=elevation_range)).ToPRD(packed=packed)
 
-def read_CC(filename, station_lon=None, station_lat=None, station_alt=None):
+def read_CC(filename, station_lon=None, station_lat=None, station_alt=None, fields=None, sweeps=None,
+            elevation_range=None, packed=False):
     """
     :param filename:  radar basedata filename
     :param station_lon:  radar station longitude //units: degree east
     :param station_lat:  radar station latitude //units:degree north
     :param station_alt:  radar station altitude //units: meters
+    :param fields:  需要解码的要素名, 如["dBZ"], None为全部
+    :param sweeps:  需要解码的sweep序号(文件中的顺序, 从0开始), 如[0, 1], None为全部,
+                    dBZ和V分开扫描的两个仰角会一起读取并合并
+    :param elevation_range:  (最小仰角, 最大仰角), 只解码仰角在该范围内的sweep
+    :param packed:  True时PRD中的要素保存为原始的整型编码(约为float32的1/4~1/2), 取值时才解码
     """
-    return CCFile.CC2NRadar(CCFile.CCBaseData(filename, station_lon, station_lat, station_alt)).ToPRD()
+    return CCFile.CC2NRadar(CCFile.CCBaseData(filename, station_lon, station_lat, station_alt, fields=fields,
+        sweeps=sweeps, elevation_range=elevation_range)).ToPRD(packed=packed)
 
-def read_SC(filename, station_lon=None, station_lat=None, station_alt=None):
+def read_SC(filename, station_lon=None, station_lat=None, station_alt=None, fields=None, sweeps=None,
+            elevation_range=None, packed=False):
     """
     :param filename:  radar basedata filename
     :param station_lon:  radar station longitude //units: degree east
     :param station_lat:  radar station latitude //units:degree north
     :param station_alt:  radar station altitude //units: meters
+    :param fields:  需要解码的要素名, 如["dBZ"], None为全部
+    :param sweeps:  需要解码的sweep序号(文件中的顺序, 从0开始), 如[0, 1], None为全部,
+                    dBZ和V分开扫描的两个仰角会一起读取并合并
+    :param elevation_range:  (最小仰角, 最大仰角), 只解码仰角在该范围内的sweep
+    :param packed:  True时PRD中的要素保存为原始的整型编码(约为float32的1/4~1/2), 取值时才解码
     """
-    return SCFile.SC2NRadar(SCFile.SCBaseData(filename, station_lon, station_lat, station_alt)).ToPRD()
+    return SCFile.SC2NRadar(SCFile.SCBaseData(filename, station_lon, station_lat, station_alt, fields=fields,
+        sweeps=sweeps, elevation_range=elevation_range)).ToPRD(packed=packed)
 
-def read_WSR98D(filename, station_lon=None, station_lat=None, station_alt=None):
+def read_WSR98D(filename, station_lon=None, station_lat=None, station_alt=None, fields=None, sweeps=None,
+                elevation_range=None, packed=False):
     """
     :param filename:  radar basedata filename
     :param station_lon:  radar station longitude //units: degree east
     :param station_lat:  radar station latitude //units:degree north
     :param station_alt:  radar station altitude //units: meters
+    :param fields:  需要解码的要素名, 如["dBZ"], None为全部
+    :param sweeps:  需要解码的sweep序号(文件中的顺序, 从0开始), 如[0, 1], None为全部,
+                    dBZ和V分开扫描的两个仰角会一起读取并合并
+    :param elevation_range:  (最小仰角, 最大仰角), 只解码仰角在该范围内的sweep
+    :param packed:  True时PRD中的要素保存为原始的整型编码(约为float32的1/4~1/2), 取值时才解码
     """
-    return WSR98DFile.WSR98D2NRadar(WSR98DFile.WSR98DBaseData(filename, station_lon, station_lat, station_alt)).ToPRD()
+    return WSR98DFile.WSR98D2NRadar(WSR98DFile.WSR98DBaseData(filename, station_lon, station_lat, station_alt, fields=fields,
+        sweeps=sweeps, elevation_range=elevation_range)).ToPRD(packed=packed)
 
-def read_PA(filename, station_lon=None, station_lat=None, station_alt=None):
+def read_PA(filename, station_lon=None, station_lat=None, station_alt=None, fields=None, sweeps=None,
+            elevation_range=None, packed=False):
     """
     :param filename:  radar basedata filename
     :param station_lon:  radar station longitude //units: degree east
     :param station_lat:  radar station latitude //units:degree north
     :param station_alt:  radar station altitude //units: meters
+    :param fields:  需要解码的要素名, 如["dBZ"], None为全部
+    :param sweeps:  需要解码的sweep序号(文件中的顺序, 从0开始), 如[0, 1], None为全部,
+                    dBZ和V分开扫描的两个仰角会一起读取并合并
+    :param elevation_range:  (最小仰角, 最大仰角), 只解码仰角在该范围内的sweep
+    :param packed:  True时PRD中的要素保存为原始的整型编码(约为float32的1/4~1/2), 取值时才解码
     """
-    return PAFile.PA2NRadar(PAFile.PABaseData(filename, station_lon, station_lat, station_alt)).ToPRD()
+    return PAFile.PA2NRadar(PAFile.PABaseData(filename, station_lon, station_lat, station_alt, fields=fields,
+        sweeps=sweeps, elevation_range=elevation_range)).ToPRD(packed=packed)
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+多进程批量读取雷达基数据, 结果通过共享内存传回主进程
+"""
+import itertools
+import os
+import weakref
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+from ..core.NRadar import PRD
+from .PRDFile import _aligned
+
+class _SharedBlock(shared_memory.SharedMemory):
+    """
+    主进程中映射的共享内存, 其中的数组全部释放后才能关闭映射
+    """
+    def __del__(self):
+        try:
+            self.close()
+        except (OSError, BufferError):  ##解释器退出时数组可能还在使用, 映射随数组一起释放
+            pass
+
+def _create_shared(arrays):
+    """
+    将所有数组复制到新建的一块共享内存中(按64字节对齐), 由主进程负责释放
+    :param arrays: {名称: np.ndarray}
+    :return: 共享内存名, {名称: (偏移, shape, dtype)}
+    """
+    table, size = {}, 0
+    for key, arr in arrays.items():
+        table[key] = (size, arr.shape, arr.dtype.str)
+        size = _aligned(size + arr.nbytes)
+    try:
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1), track=False)
+    except TypeError:  ##python < 3.13
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        resource_tracker.unregister(shm._name, "shared_memory")
+    try:
+        for key, arr in arrays.items():
+            offset, shape, dtype = table[key]
+            np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)[...] = arr
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+    shm.close()
+    return shm.name, table
+
+def _attach_shared(name, table):
+    """
+    映射子进程写好的共享内存, 返回的数组直接指向共享内存, 不复制
+    共享内存的名字立即删除, 映射在所有数组(即PRD)释放后解除
+    :return: {名称: np.ndarray}
+    """
+    shm = _SharedBlock(name=name)
+    shm.unlink()  ##只删除名字, 已经映射的内存仍然有效
+    block = np.ndarray((shm.size,), dtype="u1", buffer=shm.buf)
+    weakref.finalize(block, shm.close).atexit = False
+    arrays = {}
+    for key, (offset, shape, dtype) in table.items():
+        nbytes = int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize
+        arrays[key] = block[offset:offset + nbytes].view(dtype).reshape(shape)
+    return arrays
+
+def _free_shared(name):
+    """只释放共享内存"""
+    shm = shared_memory.SharedMemory(name=name)
+    shm.close()
+    shm.unlink()
+
+def _read_worker(filename, kwargs):
+    """
+    子进程中解码一个文件
+    :return: PRD的元数据, (共享内存名, {名称: (偏移, shape, dtype)})
+    """
+    from . import read_auto
+    meta, arrays = read_auto(filename, **kwargs)._to_arrays()
+    return meta, _create_shared(arrays)
+
+def _scan_worker(filename, kwargs):
+    """子进程中只解析头信息, ScanInfo很小, 直接pickle传回"""
+    from . import read_auto
+    return read_auto(filename, header_only=True, **kwargs)
+
+def read_many(files, workers=None, header_only=False, **kwargs):
+    """
+    用多进程批量读取雷达基数据, 按完成的先后顺序返回
+    同时最多2*workers个文件在解码或等待取走, 取走结果后才提交新的文件, 共享内存中未取走的结果不会无限增长
+    :param files: 雷达基数据文件名的序列或迭代器
+    :param workers: 进程数, None为cpu个数
+    :param header_only: True时只解析头信息, 返回ScanInfo
+    :param kwargs: 传给read_auto的参数, 如fields=["dBZ"], packed=True, sweeps=[0, 1]
+    :return: generator, 每次返回(filename, PRD或ScanInfo, None), 读取失败时为(filename, None, exception)
+             PRD的数组直接指向共享内存, PRD释放后共享内存才释放; Py-ART Radar在第一次使用时由PRD生成
+    """
+    worker = _scan_worker if header_only else _read_worker
+    workers = workers or os.cpu_count() or 1
+    files = iter(files)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        running = {}  ##{future: filename}, 已提交但还没有取走结果的文件
+        try:
+            while True:
+                for filename in itertools.islice(files, 2 * workers - len(running)):
+                    running[executor.submit(worker, filename, kwargs)] = filename
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    filename = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as error:  ##单个文件的错误不影响其他文件
+                        yield filename, None, error
+                        continue
+                    if header_only:
+                        yield filename, result, None
+                        continue
+                    meta, shared = result
+                    yield filename, PRD._from_arrays(meta, _attach_shared(*shared)), None
+        finally:  ##提前退出时取消未开始的任务, 释放已完成任务的共享内存
+            for future in running:
+                future.cancel()
+            for future in running:
+                if not header_only and not future.cancelled() and future.exception() is None:
+                    _free_shared(future.result()[1][0])
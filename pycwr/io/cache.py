@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+按文件内容寻址的解码结果磁盘缓存, 超出容量时删除最久未使用的条目, 可以在多个进程间共享
+"""
+import functools
+import hashlib
+import json
+import os
+import numpy as np
+from ..core.NRadar import PRD
+from .PRDFile import _write_arrays, _read_arrays
+
+_CACHE_VERSION = 2  ##解码结果的格式变化时增加, 旧的条目不再命中
+_SUFFIX = ".prd"
+_file_digest = {}  ##{(文件名, 大小, 修改时间): 内容的hash}, 同一个进程中不重复计算hash
+
+def _canonical(value):
+    """
+    读取参数转为可以写入json的统一形式, np.ndarray/tuple/list都转为list, numpy标量转为python的类型
+    """
+    if isinstance(value, np.ndarray):
+        value = value.tolist()
+    if isinstance(value, (list, tuple)):
+        return [_canonical(ivalue) for ivalue in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+class ReadCache(object):
+    """
+    read_auto的磁盘缓存, 键为文件内容的hash加上读取参数, 值为PRD的数组(可以直接memmap)
+    条目原子地写入, 多个进程可以同时读写同一个目录
+    usage:
+        cache = ReadCache("/data/cache", max_bytes=10 * 1024 ** 3)
+        prd = read_auto(filename, cache=cache)
+    """
+
+    def __init__(self, directory, max_bytes=2 * 1024 ** 3):
+        """
+        :param directory: 缓存目录
+        :param max_bytes: 缓存的容量上限, units:bytes
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def file_digest(self, filename):
+        """
+        :return: 文件内容的hash, hex
+        """
+        stat = os.stat(filename)
+        key = (os.path.abspath(filename), stat.st_size, stat.st_mtime_ns)
+        if key not in _file_digest:
+            digest = hashlib.blake2b(digest_size=20)
+            with open(filename, "rb") as f:
+                for chunk in iter(functools.partial(f.read, 1 << 20), b""):
+                    digest.update(chunk)
+            _file_digest[key] = digest.hexdigest()
+        return _file_digest[key]
+
+    def key(self, filename, options):
+        """
+        :param options: 传给read_auto的参数
+        :return: 缓存的键, hex
+        """
+        options = json.dumps([_CACHE_VERSION, sorted((key, _canonical(value)) for key, value in options.items())])
+        return hashlib.blake2b((self.file_digest(filename) + options).encode("UTF-8"), digest_size=20).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + _SUFFIX)
+
+    def get(self, key):
+        """
+        :return: PRD, 没有命中时为None, Py-ART Radar在需要时由PRD生成
+        """
+        path = self.path(key)
+        try:
+            meta, arrays = _read_arrays(path, mmap=True)
+            os.utime(path, None)  ##用修改时间记录最近一次使用
+        except (OSError, ValueError, AssertionError):  ##不存在, 或者已被其他进程删除/损坏
+            return None
+        return PRD._from_arrays(meta, arrays)
+
+    def put(self, key, prd):
+        """写入缓存, 之后按容量上限删除最久未使用的条目"""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        meta, arrays = prd._to_arrays()
+        _write_arrays(path, meta, arrays)  ##原子地写入, 其他进程不会读到不完整的条目
+        self.evict()
+
+    def read(self, filename, **options):
+        """
+        读取基数据, 命中时直接从缓存生成PRD
+        :param options: 传给read_auto的参数
+        :return: PRD
+        """
+        from . import read_auto
+        key = self.key(filename, options)
+        prd = self.get(key)
+        if prd is None:
+            prd = read_auto(filename, **options)
+            self.put(key, prd)
+        return prd
+
+    def entries(self):
+        """
+        :return: [(最近使用的时间, 大小, 路径)]
+        """
+        entries = []
+        for root, dirs, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(_SUFFIX):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, os.path.join(root, name)))
+        return entries
+
+    def evict(self):
+        """删除最久未使用的条目, 直到总大小不超过max_bytes"""
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)  ##其他进程已经memmap的条目在关闭前仍然可用
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        """删除所有条目"""
+        for _, _, path in self.entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -5,7 +5,13 @@ import bz2
 import gzip
 import datetime
 import os
-from ..configure.location_config import radar_info
+import re
+import mmap
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from numpy.lib.recfunctions import repack_fields
+from ..configure import location_config
 
 def _structure_size(structure):
     """计算structure的字节大小"""
@@ -23,11 +29,360 @@ def _unpack_structure(string, structure):
     lst = struct.unpack(fmt, string)
     return dict(zip([i[0] for i in structure], lst))
 
+def _structure_dtype(structure):
+    '''convert a struct structure to numpy structured dtype'''
+    return np.dtype([(i[0], 'S' + i[1][:-1] if i[1].endswith('s') else '<' + i[1]) for i in structure])
+
+def _structure_offset(structure, name):
+    '''byte offset of the item name in structure'''
+    names = [i[0] for i in structure]
+    return _structure_size(structure[:names.index(name)])
+
+def _gather_structure(raw, pos, dtype):
+    '''gather fixed size records at byte offsets pos from a uint8 array'''
+    idx = np.asarray(pos, dtype=np.int64).reshape(-1, 1) + np.arange(dtype.itemsize)
+    return raw[idx].view(dtype).ravel()
+
+def _radial_headers(radial):
+    """
+    :param radial: 径向记录的结构化数组(径向头 + 库数据'data')
+    :return: 只含径向头的副本, 库数据解码后不再引用文件的内容
+    """
+    return repack_fields(radial[[name for name in radial.dtype.names if name != 'data']])
+
+def _index_radial_blocks(buf, pos, radial_structure, moment_structure):
+    """
+    扫描一遍buf, 建立径向头和要素数据块的偏移索引(WSR98D/PA标准格式)
+    :param buf: 径向数据的buf
+    :param pos: 第一根径向的位置
+    :param radial_structure: 径向头的structure
+    :param moment_structure: 要素头的structure
+    :return: 径向头的位置(nrays), 要素头的位置(nmoments), 要素所属的径向(nmoments), 扫描结束的位置
+    """
+    radial_size = _structure_size(radial_structure)
+    moment_size = _structure_size(moment_structure)
+    number_pos = _structure_offset(radial_structure, 'MomentNumber')
+    length_pos = _structure_offset(moment_structure, 'Length')
+    unpack_int = struct.Struct('<i').unpack_from
+    total = len(buf)
+    radial_pos, moment_pos, moment_ray = [], [], []
+    while pos + radial_size <= total:  ##read until EOF
+        MomentNumber, = unpack_int(buf, pos + number_pos)
+        mpos = pos + radial_size
+        ipos = []
+        for _ in range(MomentNumber):
+            if mpos + moment_size > total:
+                break
+            ipos.append(mpos)
+            mpos += moment_size + unpack_int(buf, mpos + length_pos)[0]
+        if (len(ipos) < MomentNumber) or (mpos > total):  ##径向不完整
+            break
+        moment_ray.extend([len(radial_pos)] * MomentNumber)
+        moment_pos.extend(ipos)
+        radial_pos.append(pos)
+        pos = mpos
+    return np.array(radial_pos, dtype=np.int64), np.array(moment_pos, dtype=np.int64), \
+           np.array(moment_ray, dtype=np.int64), pos
+
+def _decode_moment(raw, moment, data_pos, ray_index, nrays):
+    """
+    将一个sweep内同一要素的数据块批量解码为物理量
+    :param raw: uint8的数据
+    :param moment: 要素头(n)
+    :param data_pos: 要素数据的位置(n)
+    :param ray_index: 要素在sweep内的径向序号(n)
+    :param nrays: sweep的径向数
+    :return: (nrays, nbins), 没有数据的径向为nan
+    """
+    BinLength = moment['BinLength']
+    assert np.all((BinLength == 1) | (BinLength == 2)) and np.all(BinLength == BinLength[0]), "Bin Length has problem!"
+    Length = moment['Length'].astype(np.int64)
+    nbytes = int(Length.max()) // int(BinLength[0]) * int(BinLength[0])
+    step = np.diff(data_pos)
+    stride = int(step[0]) if step.size else nbytes
+    if np.all(Length == Length[0]) and np.all(step == stride):  ##等间隔的数据块, 直接构造视图
+        block = np.lib.stride_tricks.as_strided(raw[data_pos[0]:], shape=(data_pos.size, nbytes),
+                                                strides=(stride, 1), writeable=False)
+    else:
+        cols = np.arange(nbytes)
+        idx = np.minimum(data_pos.reshape(-1, 1) + cols, raw.size - 1)
+        block = np.where(cols < Length.reshape(-1, 1), raw[idx], 0).astype("u1")
+    block = block.view("<u%d" % BinLength[0])
+    if np.array_equal(ray_index, np.arange(nrays)):
+        code = block
+    else:
+        code = np.zeros((nrays, block.shape[1]), dtype=block.dtype)
+        code[ray_index] = block
+    scale = moment['Scale']
+    offset = moment['Offset']
+    if np.all(scale == scale[0]) and np.all(offset == offset[0]):
+        scale, offset = np.float32(scale[0]), np.float32(offset[0])
+    else:
+        scale, offset = np.ones((nrays, 1), dtype=np.float32), np.zeros((nrays, 1), dtype=np.float32)
+        scale[ray_index, 0] = moment['Scale']
+        offset[ray_index, 0] = moment['Offset']
+    dat = code.astype(np.float32)
+    dat -= offset
+    dat /= scale
+    dat[code < 5] = np.nan
+    return dat
+
+def _decode_sweep_moments(raw, moment, data_pos, ray_index, nrays, flag2Product):
+    """
+    解码一个sweep的所有要素
+    :return: dict, {要素名: (nrays, nbins)}
+    """
+    fields = {}
+    DataType = moment['DataType']
+    types, first = np.unique(DataType, return_index=True)
+    for itype in types[np.argsort(first)]:
+        flag = DataType == itype
+        fields[flag2Product[itype]] = _decode_moment(raw, moment[flag], data_pos[flag], ray_index[flag], nrays)
+    return fields
+
+def _sweep_moment_gates(moment, moment_ray, sweep_start_ray_index, sweep_end_ray_index, flag2Product):
+    """
+    只用要素头统计每个sweep中各要素的最大库数, 不解码数据
+    :return: list(nsweeps), 每个sweep为{要素名: 库数}
+    """
+    gates = moment['Length'].astype(np.int64) // np.maximum(moment['BinLength'], 1)
+    sweep_gates = []
+    for istart, iend in zip(sweep_start_ray_index, sweep_end_ray_index):
+        lo, hi = np.searchsorted(moment_ray, [istart, iend + 1])
+        DataType = moment['DataType'][lo:hi]
+        types, first = np.unique(DataType, return_index=True)
+        sweep_gates.append({flag2Product[itype]: int(gates[lo:hi][DataType == itype].max()) \
+                            for itype in types[np.argsort(first)]})
+    return sweep_gates
+
+def _sweep_moment_encoding(moment, moment_ray, sweep_start_ray_index, sweep_end_ray_index, flag2Product):
+    """
+    只用要素头得到每个sweep中各要素的编码方式, 物理量 = (code - offset) / scale, 缺测编码为0
+    sweep内Scale/Offset不一致的要素不给出编码
+    :return: list(nsweeps), 每个sweep为{要素名: (dtype, scale, offset, 缺测的编码)}
+    """
+    sweep_encoding = []
+    for istart, iend in zip(sweep_start_ray_index, sweep_end_ray_index):
+        lo, hi = np.searchsorted(moment_ray, [istart, iend + 1])
+        imoment = moment[lo:hi]
+        encoding = {}
+        for itype in np.unique(imoment['DataType']):
+            flag = imoment[imoment['DataType'] == itype]
+            if all(np.all(flag[ikey] == flag[ikey][0]) for ikey in ('BinLength', 'Scale', 'Offset')):
+                encoding[flag2Product[itype]] = ("<u%d" % flag['BinLength'][0], float(flag['Scale'][0]),
+                                                 float(flag['Offset'][0]), 0)
+        sweep_encoding.append(encoding)
+    return sweep_encoding
+
+def _select_moments(DataType, flag2Product, fields):
+    """
+    :param DataType: 要素头中的数据类型(n)
+    :param fields: 需要解码的要素名, None为全部
+    :return: bool(n), 需要解码的要素
+    """
+    if fields is None:
+        return np.ones(DataType.shape, dtype=bool)
+    return np.isin(DataType, [itype for itype, name in flag2Product.items() if name in fields])
+
+def _select_sweeps(nsweeps, sweeps=None, elevation_range=None, fixed_angle=None, sweep_gates=None):
+    """
+    确定需要解码的sweep, dBZ和V分开扫描的两个仰角总是一起选取, 保证之后可以合并
+    :param nsweeps: 文件中的sweep数
+    :param sweeps: 需要的sweep序号(按文件中的顺序, 从0开始), None为全部
+    :param elevation_range: (最小仰角, 最大仰角), 闭区间, None为不限制
+    :param fixed_angle: 每个sweep的仰角(nsweeps), 给定elevation_range时使用
+    :param sweep_gates: 每个sweep为{要素名: 库数}, 用来找出分开扫描的dBZ/V仰角, None为不存在分开扫描
+    :return: 升序的sweep序号
+    """
+    selected = np.arange(nsweeps)
+    if sweeps is not None:
+        selected = np.unique(selected[np.asarray(sweeps, dtype=np.int64)])
+    if elevation_range is not None:
+        angle = np.asarray(fixed_angle)[selected]
+        selected = selected[(angle >= elevation_range[0]) & (angle <= elevation_range[1])]
+    assert selected.size > 0, "no sweep selected!"
+    if sweep_gates is not None:
+        dBZ_alone = [bool(igates.get("dBZ")) and not igates.get("V") for igates in sweep_gates]
+        V_alone = [bool(igates.get("V")) and not igates.get("dBZ") for igates in sweep_gates]
+        pair = [dBZ_alone[isweep] and V_alone[isweep + 1] for isweep in range(nsweeps - 1)]  ##isweep只有dBZ, isweep+1只有V
+        partner = [isweep + 1 for isweep in selected if isweep < nsweeps - 1 and pair[isweep]] + \
+                  [isweep - 1 for isweep in selected if isweep > 0 and pair[isweep - 1]]
+        selected = np.union1d(selected, np.asarray(partner, dtype=np.int64))
+    return selected
+
+def _sweep_ray_index(selected, sweep_start_ray_index, sweep_end_ray_index):
+    """
+    :param selected: 需要的sweep序号, 升序
+    :return: 保留的径向序号(nrays), 新的sweep开始径向序号, 新的sweep结束径向序号(包含在内)
+    """
+    ray_index = np.concatenate([np.arange(sweep_start_ray_index[isweep], sweep_end_ray_index[isweep] + 1) \
+                                for isweep in selected])
+    rays_per_sweep = sweep_end_ray_index[selected] - sweep_start_ray_index[selected] + 1
+    sweep_end_ray_index = np.cumsum(rays_per_sweep) - 1
+    return ray_index, sweep_end_ray_index - rays_per_sweep + 1, sweep_end_ray_index
+
+_BZ2_BLOCK_MAGIC = 0x314159265359  ##bz2压缩块的起始标志(48 bit, 不按字节对齐)
+_BZ2_EOS_MAGIC = 0x177245385090  ##bz2数据流的结束标志(48 bit)
+_PARALLEL_MIN_SIZE = 1 << 20  ##小于该大小的压缩文件直接单线程解压
+_MAGIC_WINDOW = 1 << 20  ##按bit查找标志时每个窗口的字节数
+
+def _decompress_workers(workers=None):
+    """并行解压的线程数, 默认为cpu个数"""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    return workers
+
+def _find_bit_magic(data, magic):
+    """
+    在data中按bit查找48 bit的标志, 错位的7种情况按_MAGIC_WINDOW大小的窗口依次处理, 临时数组不超过窗口大小
+    :param data: bytes
+    :param magic: 48 bit的整数
+    :return: 标志所在的bit位置(升序)
+    """
+    pattern = magic.to_bytes(6, 'big')
+    found = set()
+    pos = data.find(pattern)  ##按字节对齐的标志直接查找
+    while pos >= 0:
+        found.add(pos * 8)
+        pos = data.find(pattern, pos + 1)
+    raw = np.frombuffer(data, dtype="u1")
+    for wstart in range(0, len(raw), _MAGIC_WINDOW):
+        window = raw[wstart:wstart + _MAGIC_WINDOW + len(pattern)]  ##与下一个窗口重叠, 跨窗口的标志也能找到
+        for shift in range(1, 8):
+            buf = ((window[:-1] << shift) | (window[1:] >> (8 - shift))).tobytes()
+            pos = buf.find(pattern)
+            while pos >= 0:
+                found.add((wstart + pos) * 8 + shift)
+                pos = buf.find(pattern, pos + 1)
+    return sorted(found)
+
+def _bz2_block_stream(data, start, end):
+    """
+    将[start, end) bit范围内的一个bz2压缩块重新封装为独立的bz2数据流
+    :return: bytes, 可以直接被bz2.decompress解压
+    """
+    byte_start, byte_end = start // 8, (end + 7) // 8
+    nbits = end - start
+    block = int.from_bytes(data[byte_start:byte_end], 'big')
+    block = (block >> (byte_end * 8 - end)) & ((1 << nbits) - 1)
+    block_crc = (block >> (nbits - 80)) & 0xffffffff  ##单个块的数据流, 合并的CRC等于块的CRC
+    stream = (block << 80) | (_BZ2_EOS_MAGIC << 32) | block_crc
+    nbits += 80
+    pad = -nbits % 8
+    return b'BZh9' + (stream << pad).to_bytes((nbits + pad) // 8, 'big')
+
+def _parallel_bz2_decompress(data, workers=None):
+    """
+    多线程解压bz2, bz2的压缩块相互独立, 按块的边界拆分后由线程池分别解压(bz2模块解压时释放GIL),
+    块边界无法确定或解压出错时退回单线程的bz2.decompress
+    :param data: bz2压缩的bytes, 可以包含多个数据流
+    :param workers: 线程数
+    :return: 解压后的bytes
+    """
+    workers = _decompress_workers(workers)
+    if workers < 2 or len(data) < _PARALLEL_MIN_SIZE:
+        return bz2.decompress(data)
+    try:
+        marks = [(pos, True) for pos in _find_bit_magic(data, _BZ2_BLOCK_MAGIC)] + \
+                [(pos, False) for pos in _find_bit_magic(data, _BZ2_EOS_MAGIC)]
+        marks.sort()
+        if len(marks) < 3 or marks[-1][1]:  ##只有一个块, 或文件不完整
+            return bz2.decompress(data)
+        blocks = [(start, end) for (start, is_block), (end, _) in zip(marks[:-1], marks[1:]) if is_block]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return b''.join(pool.map(lambda block: bz2.decompress(_bz2_block_stream(data, *block)), blocks))
+    except (OSError, ValueError, EOFError):
+        return bz2.decompress(data)
+
+def _gzip_member(data):
+    """解压一个完整的gzip member, 数据不完整或有多余数据时报错"""
+    decompressor = zlib.decompressobj(31)
+    out = decompressor.decompress(data)
+    if not decompressor.eof or decompressor.unused_data:
+        raise zlib.error("not a single gzip member")
+    return out
+
+def _parallel_gzip_decompress(data, workers=None):
+    """
+    多线程解压多个member的gzip(如pigz/bgzip的输出), 按member的头拆分后由线程池分别解压,
+    只有一个member或拆分有误时退回单线程的gzip.decompress
+    :param data: gzip压缩的bytes
+    :param workers: 线程数
+    :return: 解压后的bytes
+    """
+    workers = _decompress_workers(workers)
+    if workers < 2 or len(data) < _PARALLEL_MIN_SIZE:
+        return gzip.decompress(data)
+    starts = []
+    pos = data.find(b'\x1f\x8b\x08')
+    while pos >= 0:
+        starts.append(pos)
+        pos = data.find(b'\x1f\x8b\x08', pos + 1)
+    if len(starts) < 2 or starts[0] != 0:
+        return gzip.decompress(data)
+    members = [data[start:end] for start, end in zip(starts, starts[1:] + [len(data)])]
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return b''.join(pool.map(_gzip_member, members))
+    except (zlib.error, OSError, EOFError):
+        return gzip.decompress(data)
+
+class _BufferReader(object):
+    """
+    在内存buf(bytes/mmap)上模拟只读的文件对象, read返回memoryview, 不拷贝数据
+    read返回的数据只在close之前有效, 需要保留的部分由调用者复制
+    """
+
+    def __init__(self, buf, name=None):
+        """
+        :param buf: 文件的全部内容(已解压)
+        :param name: 文件名
+        """
+        self.buf = memoryview(buf).cast("B")
+        self.pos = 0
+        self.name = name
+
+    def __len__(self):
+        return len(self.buf)
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            end = len(self.buf)
+        else:
+            end = min(self.pos + size, len(self.buf))
+        start, self.pos = self.pos, max(end, self.pos)
+        return self.buf[start:self.pos]
+
+    def seek(self, offset, whence=0):
+        if whence == 0:
+            self.pos = offset
+        elif whence == 1:
+            self.pos += offset
+        else:
+            self.pos = len(self.buf) + offset
+        self.pos = max(self.pos, 0)
+        return self.pos
+
+    def tell(self):
+        return self.pos
+
+    def close(self):
+        """释放memoryview, 文件的mmap同时关闭"""
+        if self.buf is None:
+            return
+        obj = self.buf.obj
+        self.buf.release()
+        self.buf = None
+        if isinstance(obj, mmap.mmap):
+            obj.close()  ##仍有numpy视图引用时为BufferError
+
 def _prepare_for_read(filename):
     """
     Return a file like object read for reading.
     Open a file for reading in binary mode with transparent decompression of
-    Gzip and BZip2 files.  The resulting file-like object should be closed.
+    Gzip and BZip2 files.  Compressed files are decompressed once into memory,
+    uncompressed files are memory-mapped, reading from either returns zero-copy
+    memoryviews. The resulting file-like object should be closed.
     Parameters
     ----------
     filename : str or file-like object
@@ -44,13 +399,21 @@ def _prepare_for_read(filename):
     # look for compressed data by examining the first few bytes
     fh = open(filename, 'rb')
     magic = fh.read(3)
-    fh.close()
     if magic.startswith(b'\x1f\x8b'):
-        f = gzip.GzipFile(filename, 'rb')
+        fh.seek(0, 0)
+        f = _BufferReader(_parallel_gzip_decompress(fh.read()), filename)
+        fh.close()
     elif magic.startswith(b'BZh'):
-        f = bz2.BZ2File(filename, 'rb')
+        fh.seek(0, 0)
+        f = _BufferReader(_parallel_bz2_decompress(fh.read()), filename)
+        fh.close()
     else:
-        f = open(filename, 'rb')
+        try:
+            f = _BufferReader(mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ), filename)
+            fh.close()
+        except (ValueError, OSError):  ##空文件或不支持mmap的文件系统
+            fh.seek(0, 0)
+            f = fh
     return f
 
 def julian2date(JulianDate, Msec):
@@ -60,6 +423,10 @@ def julian2date(JulianDate, Msec):
     :param Msec: msec from 00:00
     :return:
     """
+    if np.ndim(JulianDate):  ##每根径向的时间, 一次性转换
+        scantime = np.datetime64("1969-12-31", "ms") + (np.asarray(JulianDate, dtype=np.int64) * 86400000 + \
+                                                        np.asarray(Msec, dtype=np.int64)).astype("timedelta64[ms]")
+        return scantime.astype(datetime.datetime)
     deltday = datetime.timedelta(days=JulianDate)
     deltsec = datetime.timedelta(milliseconds=Msec)
     scantime = datetime.datetime(1969, 12, 31) + deltday + deltsec
@@ -72,33 +439,52 @@ def julian2date_SEC(Sec, Msec):
     :param Msec: microseconds
     :return:
     """
+    if np.ndim(Sec):  ##每根径向的时间, 一次性转换
+        scantime = np.datetime64("1970-01-01", "us") + (np.asarray(Sec, dtype=np.int64) * 10 ** 6 + \
+                                                        np.asarray(Msec, dtype=np.int64)).astype("timedelta64[us]")
+        return scantime.astype(datetime.datetime)
     deltSec = datetime.timedelta(seconds=Sec)
     deltMSec = datetime.timedelta(microseconds=Msec)
     scantime = datetime.datetime(1970, 1, 1) + deltSec + deltMSec
     return scantime
 
+_STATION_ID = re.compile(r"[0-9]{4}")  ##文件名中第一个连续4位数字为站号
+_DEFAULT_STATION = 9250  ##南京雷达
+_SAB_TYPES = ("SA", "SB", "CB", "SC", "CD")
+_CC_TYPES = ("CC", "CCJ")
+
+def _station_id(filename):
+    """
+    :param filename: 文件名或文件对象
+    :return: 文件名中的站号, 没有时为None
+    """
+    name = os.path.basename(getattr(filename, "name", filename))
+    match = _STATION_ID.search(name)
+    return int(match.group()) if match is not None else None
+
+def _station_row(filename, default=_DEFAULT_STATION):
+    """
+    :return: 站点在location_config.station_index中的行号, 找不到站点信息时为default站点的行号(default为None时返回None)
+    """
+    rows, _ = location_config.station_index  ##第一次用到时才读取站点表
+    row = rows.get(_station_id(filename))
+    if row is None and default is not None:
+        row = rows[default]
+    return row
+
 def get_radar_info(filename):
     """
     根据雷达名称找雷达的经纬度信息
     :param filename:
     :return:(lat(deg), lon(deg), elev(m), frequency(GHZ))
     """
-    name = os.path.basename(filename)
-    try:
-        station_id = [int(name[idx:idx+4]) for idx in range(len(name)-4) if name[idx:idx+4].isdigit()][0]
-    except Exception:
-        station_id = 9250
-    if station_id not in radar_info.index:
-        station_id = 9250 ###找不到站点信息返回南京雷达
-    return radar_info.loc[station_id, "Latitude"], radar_info.loc[station_id, "Longitude"],\
-           radar_info.loc[station_id, "Elevation"], radar_info.loc[station_id, "Frequency"]
+    row = _station_row(filename)  ###找不到站点信息返回南京雷达
+    _, columns = location_config.station_index
+    return columns["Latitude"][row], columns["Longitude"][row], columns["Elevation"][row], columns["Frequency"][row]
 
 def get_radar_sitename(filename):
-    name = os.path.basename(filename)
-    station_id = [int(name[idx:idx + 4]) for idx in range(len(name) - 4) if name[idx:idx + 4].isdigit()][0]
-    if station_id not in radar_info.index:
-        station_id = 9250  ###找不到站点信息返回南京雷达
-    return radar_info.loc[station_id, "Name"]
+    _, columns = location_config.station_index
+    return columns["Name"][_station_row(filename)]  ###找不到站点信息返回南京雷达
 
 def _get_radar_type(filename):
     """
@@ -106,41 +492,115 @@ def _get_radar_type(filename):
     :param filename:
     :return:
     """
-    name = os.path.basename(filename)
-    station_id = [int(name[idx:idx + 4]) for idx in range(len(name) - 4) if name[idx:idx + 4].isdigit()][0]
-    if station_id not in radar_info.index:
+    row = _station_row(filename, default=None)
+    if row is None:
         return None
-    Datatype = radar_info.loc[station_id, "Datatype"]
-    if Datatype in ["SA", "SB", "CB", "SC", "CD"]:
+    _, columns = location_config.station_index
+    Datatype = columns["Datatype"][row]
+    if Datatype in _SAB_TYPES:
         return "SAB"
-    elif Datatype in ["CC", "CCJ"]:
+    elif Datatype in _CC_TYPES:
         return "CC"
     else:
         return None
 
-def radar_format(filename):
+def get_radar_info_many(filenames, default=_DEFAULT_STATION):
+    """
+    一次查找多个文件的站点信息, 用于大量文件的编目
+    :param filenames: 文件名的序列
+    :param default: 找不到站点信息时使用的站号, 默认为南京雷达
+    :return: dict, 每个键为一个np.ndarray, 与filenames一一对应:
+             station_id(文件名中的站号, 没有时为-1), found(是否找到站点信息),
+             以及站点表的各列: Abbr., Name, Longitude, Latitude, Elevation(m), Datatype, Frequency(GHZ)
+    """
+    rows, columns = location_config.station_index
+    station_id = np.full(len(filenames), -1, dtype=np.int64)
+    index = np.full(len(filenames), rows[default], dtype=np.intp)
+    found = np.zeros(len(filenames), dtype=bool)
+    for i, filename in enumerate(filenames):
+        sid = _station_id(filename)
+        if sid is None:
+            continue
+        station_id[i] = sid
+        row = rows.get(sid)
+        if row is not None:
+            index[i] = row
+            found[i] = True
+    info = {"station_id": station_id, "found": found}
+    info.update((name, values[index]) for name, values in columns.items())
+    return info
+
+_SNIFF_SIZE = 128  ##判断格式时读取的文件头字节数
+_FORMAT_PROBES = []  ##已注册的格式判断函数, 按注册顺序依次尝试
+
+def register_format(name):
+    """
+    注册雷达数据格式的判断函数, 判断函数只能使用文件头信息
+    :param name: 格式名称, 即radar_format的返回值
+    :return: decorator, 被修饰的函数为probe(header, size) -> bool,
+             header为文件开头的_SNIFF_SIZE个字节(已解压), size为解压后文件的大小, 未知时为None
+    """
+    def decorator(probe):
+        _FORMAT_PROBES.append((name, probe))
+        return probe
+    return decorator
+
+@register_format("WSR98D")
+def _probe_WSR98D(header, size):
+    return header[:4] == b'RSTM'
+
+@register_format("SAB")
+def _probe_SAB(header, size):
+    return header[14:16] == b'\x01\x00'
+
+@register_format("CC")
+def _probe_CC(header, size):
+    return header[116:125] == b"CINRAD/CC" and (size is None or (size - 1024) % 3000 == 0)
+
+@register_format("SC")
+def _probe_SC(header, size):
+    return header[100:109] in (b"CINRAD/SC", b"CINRAD/CD") and (size is None or (size - 1024) % 4000 == 0)
+
+@register_format("PA")
+def _probe_PA(header, size):
+    return header[8:12] == b'\x10\x00\x00\x00'
+
+def _read_header_and_size(filename):
+    """
+    只读取文件头, 不解压整个文件
+    :param filename: 文件名或文件对象
+    :return: 文件头(_SNIFF_SIZE), 解压后文件的大小(gzip, bz2或未知时为None)
+    """
+    if isinstance(filename, _BufferReader):
+        return bytes(filename.buf[:_SNIFF_SIZE]), len(filename)
     if hasattr(filename, 'read'):
-        return filename
-    fh = _prepare_for_read(filename)
-    flag = fh.read(28)
-    size = len(fh.read()) + 28
-    fh.seek(100, 0)
-    sc_flag = fh.read(9)
-    fh.seek(116, 0)
-    cc_flag = fh.read(9)
-    fh.close()
-    if flag[:4] == b'RSTM':
-        return "WSR98D"
-    elif flag[14:16] == b'\x01\x00':
-        return "SAB"
-    elif (size-1024)%3000 == 0 and cc_flag == b"CINRAD/CC":
-        return "CC"
-    elif (size-1024)%4000 == 0 and (sc_flag == b"CINRAD/SC" or sc_flag == b"CINRAD/CD"):
-        return "SC"
-    elif flag[8:12] == b'\x10\x00\x00\x00':
-        return "PA"
-    else:
-        return _get_radar_type(filename)
+        pos = filename.tell()
+        filename.seek(0, 0)
+        header = bytes(filename.read(_SNIFF_SIZE))
+        filename.seek(pos, 0)
+        return header, None
+    with open(filename, 'rb') as fh:
+        magic = fh.read(3)
+        if magic.startswith(b'\x1f\x8b'):  ##尾部的ISIZE只是最后一个member的大小, 不能作为解压后的大小
+            with gzip.GzipFile(filename, 'rb') as gz:
+                return gz.read(_SNIFF_SIZE), None
+        elif magic.startswith(b'BZh'):
+            with bz2.BZ2File(filename, 'rb') as bz:
+                return bz.read(_SNIFF_SIZE), None
+        fh.seek(0, 0)
+        return fh.read(_SNIFF_SIZE), os.fstat(fh.fileno()).st_size
+
+def radar_format(filename):
+    """
+    根据文件头判断雷达数据的格式, 不读取整个文件
+    :param filename: 文件名或文件对象(不改变文件对象的位置)
+    :return: "WSR98D", "SAB", "CC", "SC", "PA" or None
+    """
+    header, size = _read_header_and_size(filename)
+    for name, probe in _FORMAT_PROBES:
+        if probe(header, size):
+            return name
+    return _get_radar_type(filename)
 
 def make_time_unit_str(dtobj):
     """ Return a time unit string from a datetime object. """
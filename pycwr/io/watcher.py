@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+实时监视目录, 基数据文件写完后立即解码, 结果送入有界队列或回调函数
+"""
+import fnmatch
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from ..core.NRadar import PRD
+from .batch import _read_worker, _scan_worker, _attach_shared, _free_shared
+
+class DirectoryWatcher(object):
+    """
+    轮询监视目录中新增或仍在写入的文件, 文件大小和修改时间在settle秒内不再变化时认为写完,
+    用进程池解码, 结果为(filename, PRD或ScanInfo, None), 失败时为(filename, None, exception)
+    结果送入callback, 没有callback时放入有界队列, 队列满时暂停提交新的文件(背压)
+    usage:
+        with DirectoryWatcher("/data/spool", pattern="*.bz2", fields=["dBZ"]) as watcher:
+            for filename, prd, error in watcher:
+                ...
+    """
+
+    def __init__(self, path, pattern="*", callback=None, maxsize=16, workers=None, interval=1., settle=2.,
+                 recursive=False, header_only=False, **kwargs):
+        """
+        :param path: 监视的目录
+        :param pattern: 文件名的通配符
+        :param callback: callback(filename, result, error), 在监视线程中调用, None时结果放入队列
+        :param maxsize: 队列长度, 同时也是正在解码的文件数的上限
+        :param workers: 进程数, None为cpu个数
+        :param interval: 轮询的间隔, units:seconds
+        :param settle: 文件大小和修改时间保持不变多久后认为写完, units:seconds
+        :param recursive: 是否监视子目录
+        :param header_only: True时只解析头信息, 结果为ScanInfo
+        :param kwargs: 传给read_auto的参数, 如fields=["dBZ"], packed=True
+        """
+        self.path = path
+        self.pattern = pattern
+        self.callback = callback
+        self.maxsize = maxsize
+        self.workers = workers
+        self.interval = interval
+        self.settle = settle
+        self.recursive = recursive
+        self.header_only = header_only
+        self.kwargs = kwargs
+        self.results = queue.Queue(maxsize)
+        self._stat = {}  ##{filename: ((size, mtime), 开始保持不变的时间)}
+        self._done = set()  ##已经解码过的(filename, size, mtime)
+        self._running = {}  ##{future: (filename, size, mtime)}
+        self._executor = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _list_files(self):
+        """
+        :return: {filename: (size, mtime)}
+        """
+        files = {}
+        for root, dirs, names in os.walk(self.path):
+            for name in fnmatch.filter(names, self.pattern):
+                filename = os.path.join(root, name)
+                try:
+                    stat = os.stat(filename)
+                except OSError:  ##扫描时文件被移走
+                    continue
+                files[filename] = (stat.st_size, stat.st_mtime_ns)
+            if not self.recursive:
+                break
+        return files
+
+    def _complete_files(self, now):
+        """
+        更新文件状态
+        :return: 已经写完且没有解码过的文件[(filename, size, mtime)]
+        """
+        files = self._list_files()
+        complete = []
+        for filename, stat in files.items():
+            last = self._stat.get(filename, None)
+            if last is None or last[0] != stat:  ##新文件或仍在写入
+                self._stat[filename] = (stat, now)
+            elif stat[0] > 0 and now - last[1] >= self.settle and (filename,) + stat not in self._done:
+                complete.append((filename,) + stat)
+        for filename in set(self._stat) - set(files):  ##文件已被删除
+            del self._stat[filename]
+        self._done = {key for key in self._done if key[0] in files}
+        return complete
+
+    def _deliver(self, filename, result, error):
+        if self.callback is not None:
+            self.callback(filename, result, error)
+        else:
+            self.results.put((filename, result, error))  ##队列满时阻塞, 监视线程暂停
+
+    def _collect(self):
+        """取出已完成的解码结果"""
+        for future in [ifuture for ifuture in self._running if ifuture.done()]:
+            filename = self._running.pop(future)[0]
+            try:
+                result = future.result()
+            except Exception as error:
+                self._deliver(filename, None, error)
+                continue
+            if not self.header_only:
+                meta, shared = result
+                result = PRD._from_arrays(meta, _attach_shared(*shared))
+            self._deliver(filename, result, None)
+
+    def poll(self):
+        """
+        扫描一次目录, 提交已经写完的文件, 送出已经完成的结果
+        :return: 本次提交的文件数
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._collect()
+        running = {key[0] for key in self._running.values()}
+        submitted = 0
+        for key in self._complete_files(time.monotonic()):
+            if key[0] in running:  ##同一个文件正在解码, 等下次扫描
+                continue
+            if len(self._running) + self.results.qsize() >= self.maxsize:  ##背压
+                break
+            worker = _scan_worker if self.header_only else _read_worker
+            self._running[self._executor.submit(worker, key[0], self.kwargs)] = key
+            self._done.add(key)
+            submitted += 1
+        return submitted
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.poll()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """在后台线程中开始监视"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="pycwr-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, wait=True):
+        """
+        停止监视并关闭进程池
+        :param wait: 是否等待正在解码的文件完成并送出结果
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            if wait:
+                while self._running:
+                    self._collect()
+                    time.sleep(0.05)
+            else:
+                for future in list(self._running):
+                    if future.cancel():
+                        del self._running[future]
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            for future, key in list(self._running.items()):  ##没有送出的结果, 释放共享内存
+                if not self.header_only and not future.cancelled() and future.exception() is None:
+                    _free_shared(future.result()[1][0])
+            self._running.clear()
+
+    def get(self, block=True, timeout=None):
+        """
+        :return: (filename, PRD或ScanInfo, None) 或 (filename, None, exception)
+        """
+        return self.results.get(block, timeout)
+
+    def __iter__(self):
+        while self._thread is not None or not self.results.empty():
+            try:
+                yield self.results.get(timeout=self.interval)
+            except queue.Empty:
+                continue
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop(wait=False)
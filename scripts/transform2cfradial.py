@@ -1,26 +1,78 @@
 from pycwr.io import read_auto
-import pyart
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
 import sys
 import os
 
-def save_cfradial(china_radar_file, save_file=None):
+def save_cfradial(china_radar_file, save_file=None, fields=None, packed=False, complevel=4):
     """
     :param china_radar_file: radar data filename
     :param save_file: savename of cfradial format data
+    :param fields: 需要写入的要素名, 如["dBZ", "V"], None为全部
+    :param packed: True时要素保存为int16
+    :param complevel: 压缩等级 1~9
     :return:
     """
-    radar = read_auto(china_radar_file).ToPyartRadar()
     if save_file is None:
         save_file = china_radar_file + ".nc"
-    pyart.io.write_cfradial(save_file, radar)
+    read_auto(china_radar_file, fields=fields).to_cfradial(save_file, fields=fields, packed=packed,
+                                                           complevel=complevel)
     return 0
 
+def is_up_to_date(china_radar_file, save_file):
+    """输出文件已存在且比输入文件新时不再转换"""
+    return os.path.exists(save_file) and os.path.getmtime(save_file) >= os.path.getmtime(china_radar_file)
+
+def transform_dir(indir, outdir=None, workers=None, force=False, **kwargs):
+    """
+    用多进程转换目录下的所有文件, 跳过已经是最新的输出
+    :param indir: 雷达基数据所在的目录
+    :param outdir: 输出目录, None时和输入文件放在一起
+    :param workers: 进程数, None为cpu个数
+    :param force: True时全部重新转换
+    :return: 转换失败的文件数
+    """
+    outdir = indir if outdir is None else outdir
+    os.makedirs(outdir, exist_ok=True)
+    jobs, skipped = [], 0
+    for name in sorted(os.listdir(indir)):
+        infile = os.path.join(indir, name)
+        if not os.path.isfile(infile) or name.endswith(".nc"):
+            continue
+        outfile = os.path.join(outdir, name + ".nc")
+        if force or not is_up_to_date(infile, outfile):
+            jobs.append((infile, outfile))
+        else:
+            skipped += 1
+    print("%d files to transform, %d up to date" % (len(jobs), skipped))
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(save_cfradial, infile, outfile, **kwargs): infile for infile, outfile in jobs}
+        for future in as_completed(futures):
+            try:
+                future.result()
+                print("done:", futures[future])
+            except Exception as error:  ##单个文件出错不影响其他文件
+                failed += 1
+                print("failed:", futures[future], error)
+    return failed
+
 if __name__ == "__main__":
-    if len(sys.argv) == 1:
-        print("warning using!!! example: transfrom2cfradial filename  savename")
-    elif not os.path.exists(sys.argv[1]):
+    parser = argparse.ArgumentParser(description="transform china radar basedata to cfradial, "
+                                                 "example: transfrom2cfradial filename savename")
+    parser.add_argument("input", help="radar basedata filename or directory")
+    parser.add_argument("output", nargs="?", default=None, help="savename or output directory")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="number of processes for a directory")
+    parser.add_argument("--fields", default=None, help="fields to write, e.g. dBZ,V")
+    parser.add_argument("--packed", action="store_true", help="store fields as int16")
+    parser.add_argument("--complevel", type=int, default=4, help="zlib compression level 1~9")
+    parser.add_argument("--force", action="store_true", help="transform files that are already up to date")
+    args = parser.parse_args()
+    fields = None if args.fields is None else args.fields.split(",")
+    if not os.path.exists(args.input):
         print("file is not exist!!!")
-    elif len(sys.argv) == 2:
-        save_cfradial(sys.argv[1])
+    elif os.path.isdir(args.input):
+        sys.exit(transform_dir(args.input, args.output, args.workers, args.force, fields=fields,
+                               packed=args.packed, complevel=args.complevel) > 0)
     else:
-        save_cfradial(sys.argv[1], sys.argv[2])
+        save_cfradial(args.input, args.output, fields=fields, packed=args.packed, complevel=args.complevel)
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+比较单线程与多线程解压basedata的耗时, 线程数固定为1, 2, 4(不随cpu个数变化), 需要在多核的机器上运行
+usage: python benchmark_decompress.py [basedata.bin]
+不给文件时生成约40MB的模拟体扫数据
+"""
+import bz2
+import gzip
+import os
+import sys
+import time
+import numpy as np
+from pycwr.io.util import _parallel_bz2_decompress, _parallel_gzip_decompress
+
+WORKERS = [1, 2, 4]  ##1为退回单线程的路径
+
+def synthetic_volume(size=40 * 1024 * 1024):
+    """类似雷达回波的可压缩数据"""
+    rng = np.random.default_rng(0)
+    return (np.cumsum(rng.integers(-2, 3, size=size)) % 256).astype("u1").tobytes()
+
+def timeit(func, *args, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "rb") as f:
+            raw = f.read()
+    else:
+        raw = synthetic_volume()
+    print("volume: %.1f MB, cpus: %d" % (len(raw) / 1024. / 1024., os.cpu_count() or 1))
+
+    bz2_data = bz2.compress(raw, 9)
+    t_seq, out_seq = timeit(bz2.decompress, bz2_data)
+    assert out_seq == raw
+    for workers in WORKERS:
+        t_par, out_par = timeit(_parallel_bz2_decompress, bz2_data, workers)
+        assert out_par == raw
+        print("bz2  : stdlib %.3fs, %d workers %.3fs, speedup %.2fx" % (t_seq, workers, t_par, t_seq / t_par))
+
+    member = 4 * 1024 * 1024  ##pigz/bgzip风格的多member gzip
+    gzip_data = b"".join(gzip.compress(raw[i:i + member]) for i in range(0, len(raw), member))
+    t_seq, out_seq = timeit(gzip.decompress, gzip_data)
+    assert out_seq == raw
+    for workers in WORKERS:
+        t_par, out_par = timeit(_parallel_gzip_decompress, gzip_data, workers)
+        assert out_par == raw
+        print("gzip : stdlib %.3fs, %d workers %.3fs, speedup %.2fx" % (t_seq, workers, t_par, t_seq / t_par))
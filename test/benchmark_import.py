@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+测量冷启动导入pycwr的耗时, 每次在新的python进程中导入, 取中位数
+usage: python benchmark_import.py [repeat]
+"""
+import statistics
+import subprocess
+import sys
+
+STATEMENTS = ["from pycwr.io import read_auto", "import pycwr", "import pycwr.draw"]
+HEAVY = ["pandas", "cartopy", "matplotlib", "scipy.interpolate"]
+
+CODE = """
+import sys, time
+start = time.perf_counter()
+%s
+print(time.perf_counter() - start)
+print(" ".join(name for name in %r if name in sys.modules))
+"""
+
+def cold_import(statement, repeat=7):
+    """
+    :return: 导入耗时的中位数(s), 导入后已加载的重量级依赖
+    """
+    times = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", CODE % (statement, HEAVY)], capture_output=True, text=True,
+                             check=True).stdout.splitlines()
+        times.append(float(out[0]))
+    return statistics.median(times), out[1] if len(out) > 1 else ""
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    for statement in STATEMENTS:
+        seconds, modules = cold_import(statement, repeat)
+        print("%-35s %.3f s   loaded: %s" % (statement, seconds, modules or "-"))
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+测试中比较PRD/Py-ART Radar的公共函数
+"""
+import os
+import numpy as np
+
+RADAR_KEYS = ["time", "range", "azimuth", "elevation", "fixed_angle", "sweep_start_ray_index",
+              "sweep_end_ray_index", "sweep_number", "sweep_mode", "latitude", "longitude", "altitude"]
+
+def assert_same_radar(radar, expected):
+    """
+    :param radar: pycwr.core.PyartRadar.Radar
+    :param expected: 期望的Radar, 如读取类ToPyartRadar的结果
+    """
+    for key in RADAR_KEYS:
+        value, evalue = getattr(radar, key), getattr(expected, key)
+        np.testing.assert_array_equal(np.asarray(value["data"]), np.asarray(evalue["data"]), err_msg=key)
+        assert {ikey: ivalue for ikey, ivalue in value.items() if ikey != "data"} == \
+               {ikey: ivalue for ikey, ivalue in evalue.items() if ikey != "data"}, key
+    assert radar.metadata == expected.metadata
+    assert radar.scan_type == expected.scan_type
+    assert radar.fields.keys() == expected.fields.keys()
+    for key in expected.fields:
+        dat, edat = radar.fields[key]["data"], expected.fields[key]["data"]
+        np.testing.assert_array_equal(np.ma.getmaskarray(dat), np.ma.getmaskarray(edat), err_msg=key)
+        np.testing.assert_array_equal(dat.filled(0), edat.filled(0), err_msg=key)
+    assert radar.instrument_parameters.keys() == expected.instrument_parameters.keys()
+    for key in expected.instrument_parameters:
+        np.testing.assert_array_equal(radar.instrument_parameters[key]["data"],
+                                      expected.instrument_parameters[key]["data"], err_msg=key)
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline")
+
+def load_baseline(name):
+    """
+    :param name: synthetic.VOLUMES中的文件名
+    :return: {名称: np.ndarray}, make_baseline.py用pycwr 0.4.0保存的解码结果
+    """
+    with np.load(os.path.join(BASELINE, name + ".npz")) as f:
+        return dict(f)
+
+def assert_same_snapshot(snapshot, expected, prefixes=("sitename", "sweep", "scan_info")):
+    """
+    :param snapshot: make_baseline.snapshot的结果
+    :param expected: load_baseline的结果
+    :param prefixes: 只比较以这些前缀开头的项
+    """
+    keys = sorted(key for key in snapshot if key.startswith(prefixes))
+    assert keys == sorted(key for key in expected if key.startswith(prefixes))
+    for key in keys:
+        value, evalue = np.asarray(snapshot[key]), np.asarray(expected[key])
+        assert value.shape == evalue.shape, key
+        if evalue.dtype.kind == "f":
+            np.testing.assert_allclose(value, evalue, rtol=1e-6, atol=1e-6, equal_nan=True, err_msg=key)
+        else:
+            np.testing.assert_array_equal(value, evalue, err_msg=key)
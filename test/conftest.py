@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""
+pytest的公共fixture, 在仓库根目录运行: python -m pytest test
+"""
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import synthetic
+
+##需要本地数据或图形界面的示例脚本, 不作为测试收集
+collect_ignore = ["GUI_test.py", "plot_test.py", "test_0627.py", "test_xband.py", "test.py", "WriteWSR98D.py",
+                  "plot_0707.py", "plot_product_0627.py"]
+
+@pytest.fixture(scope="session")
+def volume(tmp_path_factory):
+    """
+    :return: function(name), 生成synthetic.VOLUMES中的文件并返回路径, 同一次测试中只生成一次
+    """
+    directory = str(tmp_path_factory.mktemp("volumes"))
+    return lambda name: synthetic.make_volume(directory, name)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+生成baseline/*.npz: 用pycwr 0.4.0(性能优化前的版本)读取synthetic.VOLUMES中的文件, 保存解码结果,
+test_readers.py等用它检查新的解码器与原来的结果一致
+usage: PYTHONPATH=<pycwr 0.4.0的源码目录> python make_baseline.py [输出目录]
+"""
+import os
+import sys
+import tempfile
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import synthetic
+from pycwr.configure.default_config import CINRAD_field_mapping
+
+CR_GRID = np.arange(-20000., 20001., 2000.)  ##组合反射率的网格, units:meters
+
+def volume_field(prd, key, nbins):
+    """
+    :return: 各sweep的要素按径向拼接, 不足nbins的部分为nan, (nrays, nbins)
+    """
+    out = np.full((sum(ppi.sizes["time"] for ppi in prd.fields), nbins), np.nan, dtype=np.float32)
+    istart = 0
+    for ppi in prd.fields:
+        dat = ppi[key].values
+        out[istart:istart + dat.shape[0], :dat.shape[1]] = dat
+        istart += dat.shape[0]
+    return out
+
+def snapshot(prd, product=True):
+    """
+    :param prd: PRD object
+    :param product: 是否计算组合反射率
+    :return: {名称: np.ndarray}
+    """
+    out = {"sitename": np.array(str(prd.sitename))}
+    for isweep, ppi in enumerate(prd.fields):
+        for key in list(ppi.data_vars) + ["azimuth", "elevation", "range"]:
+            out["sweep%d/%s" % (isweep, key)] = ppi[key].values
+        out["sweep%d/time" % isweep] = ppi.time.values.astype("datetime64[us]").astype(np.int64)
+    for key in prd.scan_info.data_vars:
+        value = prd.scan_info[key].values
+        out["scan_info/" + key] = value.astype("datetime64[us]").astype(np.int64) if value.dtype.kind == "M" else value
+    radar = prd.ToPyartRadar()
+    for key, field in radar.fields.items():
+        data = np.ma.filled(field["data"].astype(np.float32), np.nan)
+        abbr = [ikey for ikey in prd.fields[0].data_vars if CINRAD_field_mapping[ikey] == key][0]
+        if not np.array_equal(data, volume_field(prd, abbr, data.shape[1]), equal_nan=True):  ##一般与各sweep拼接的结果相同, 不重复保存
+            out["pyart/fields/" + key] = data
+    for key in ["time", "range", "azimuth", "elevation", "fixed_angle", "sweep_start_ray_index",
+                "sweep_end_ray_index"]:
+        out["pyart/" + key] = np.asarray(getattr(radar, key)["data"])
+    out["pyart/nyquist_velocity"] = np.asarray(radar.instrument_parameters["nyquist_velocity"]["data"])
+    if product and "dBZ" in prd.fields[0].data_vars:
+        prd.add_product_CR_xy(CR_GRID, CR_GRID)
+        out["product/CR"] = prd.product["CR"].values
+    return out
+
+if __name__ == "__main__":
+    from pycwr.io import read_auto
+    outdir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                  "baseline")
+    os.makedirs(outdir, exist_ok=True)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name in synthetic.VOLUMES:
+            prd = read_auto(synthetic.make_volume(tmpdir, name))
+            ##VCP26中仰角不是递增的, 0.4.0的插值体扫中仰角与sweep没有一起排序, 不保存组合反射率
+            np.savez_compressed(os.path.join(outdir, name + ".npz"), **snapshot(prd, product="VCP26" not in name))
+            print(name)
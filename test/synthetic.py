@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+生成测试用的小型合成基数据(WSR98D, SA/SB/CB, CC, SC, PA), 内容由参数完全确定, 每次生成的文件相同
+baseline/*.npz为pycwr 0.4.0(未做性能优化前)读取这些文件的结果, 见make_baseline.py
+"""
+import bz2
+import gzip
+import os
+import struct
+import numpy as np
+from pycwr.io.BaseDataProtocol.WSR98DProtocol import dtype_98D
+from pycwr.io.BaseDataProtocol.PAProtocol import dtype_PA
+from pycwr.io.BaseDataProtocol.SABProtocol import dtype_sab
+from pycwr.io.BaseDataProtocol.CCProtocol import dtype_cc
+from pycwr.io.BaseDataProtocol.SCProtocol import dtype_sc
+
+##要素名: (DataType, Scale, Offset, BinLength)
+MOMENTS = {'dBT': (1, 2, 66, 1), 'dBZ': (2, 2, 66, 1), 'V': (3, 2, 129, 1), 'W': (4, 2, 129, 1),
+           'ZDR': (7, 16, 130, 1), 'CC': (9, 200, 5, 1), 'PhiDP': (10, 100, 50, 2), 'KDP': (11, 10, 50, 1)}
+
+def _fmt(structure):
+    return "<" + "".join(fmt for _, fmt in structure)
+
+def _codes(nrays, nbins, salt, maximum=256):
+    """
+    确定的整型编码, 每根径向是同一序列错开的结果, 约2%的编码小于5(缺测)
+    :return: (nrays, nbins) int64
+    """
+    ray = np.arange(nrays)[:, np.newaxis]
+    gate = np.arange(nbins)[np.newaxis, :]
+    return (salt * 31 + ray * 17 + gate * 7) % maximum
+
+def _radial_state(isweep, iray, nsweeps, nrays):
+    if isweep == 0 and iray == 0:
+        return 3
+    if iray == nrays - 1:
+        return 4 if isweep == nsweeps - 1 else 2
+    return 0 if iray == 0 else 1
+
+def write_wsr98d(path, sweeps, task_name=b"VCP21D", log_resolution=250, doppler_resolution=250):
+    """
+    :param sweeps: [(仰角, 径向数, {要素名: 库数})]
+    """
+    buf = bytearray()
+    header = dtype_98D.BaseDataHeader
+    buf += struct.pack(_fmt(header['GenericHeaderBlock']), 1297371986, 1, 0, 1, 0, b"")
+    buf += struct.pack(_fmt(header['SiteConfigurationBlock']), b"Z9250", b"NANJING", 32.19, 118.69, 100, 90,
+                       2800., 0.93, 0.93, 1, 1, b"")
+    buf += struct.pack(_fmt(header['TaskConfigurationBlock']), task_name, b"", 3, 0, 1570, 1600000000,
+                       len(sweeps), -1, -1, -1, -1, -1, -1, -1, -1, -1, b"")
+    cuts = np.zeros(len(sweeps), header['CutConfigurationBlock'])
+    for isweep, (elevation, _, _) in enumerate(sweeps):
+        cuts[isweep]['Elevation'] = elevation
+        cuts[isweep]['LogResolution'] = log_resolution
+        cuts[isweep]['DopplerResolution'] = doppler_resolution
+        cuts[isweep]['MaximumRange'] = 460000 - isweep * 1000
+        cuts[isweep]['NyquistSpeed'] = 8.5 + isweep
+        cuts[isweep]['Azimuth'] = 10.
+    buf += cuts.tobytes()
+    count = 0
+    for isweep, (elevation, nrays, moments) in enumerate(sweeps):
+        for iray in range(nrays):
+            body = bytearray()
+            for imoment, (key, nbins) in enumerate(moments.items()):
+                DataType, Scale, Offset, BinLength = MOMENTS[key]
+                code = _codes(1, nbins, isweep * 10 + imoment, 256 if BinLength == 1 else 40000)[0] + iray
+                body += struct.pack(_fmt(dtype_98D.RadialData()), DataType, Scale, Offset, BinLength, 0,
+                                    nbins * BinLength, b"")
+                body += code.astype("u1" if BinLength == 1 else "<u2").tobytes()
+            azimuth = (isweep * 37. + iray * 360. / nrays) % 360
+            buf += struct.pack(_fmt(dtype_98D.RadialHeader()), _radial_state(isweep, iray, len(sweeps), nrays), 0,
+                               count + 1, iray + 1, isweep + 1, azimuth, elevation + 0.01 * (iray % 5),
+                               1600000000 + count // 10, (count % 10) * 100000, len(body), len(moments), b"")
+            buf += body
+            count += 1
+    with open(path, "wb") as f:
+        f.write(bytes(buf))
+
+def write_pa(path, nsweeps=2, nrays=12, nbins=40, interleave=False):
+    """相控阵雷达, interleave为True时各sweep的径向交替出现"""
+    buf = bytearray()
+    header = dtype_PA.BaseDataHeader
+    buf += struct.pack(_fmt(header['GenericHeaderBlock']), 0, 1, 0, 16, 0, b"")
+    buf += struct.pack(_fmt(header['SiteConfigurationBlock']), b"Z0001", b"PAR", 30.1, 120.2, 50, 40, 9400.,
+                       1.8, 1.8, 1, 1, b"")
+    buf += struct.pack(_fmt(header['TaskConfigurationBlock']), b"PA1", b"", 1, 0, nsweeps, nsweeps, 0, 1600000000,
+                       b"")
+    beams = np.zeros(nsweeps, header['BeamConfigurationBlock'])
+    beams['SubPulseBandWidth'] = 2.0
+    buf += beams.tobytes()
+    cuts = np.zeros(nsweeps, header['CutConfigurationBlock'])
+    cuts['Elevation'] = np.arange(nsweeps) * 1.8 + 0.9
+    cuts['LogResolution'] = cuts['DopplerResolution'] = 30
+    cuts['NyquistSpeed'] = 16.
+    cuts['MaximumRange'] = 42000
+    buf += cuts.tobytes()
+    if interleave:
+        order = [(isweep, iray) for iray in range(nrays) for isweep in range(nsweeps)]
+    else:
+        order = [(isweep, iray) for isweep in range(nsweeps) for iray in range(nrays)]
+    for count, (isweep, iray) in enumerate(order):
+        body = bytearray()
+        moments = ('dBZ', 'V', 'W', 'ZDR', 'PhiDP')
+        for imoment, key in enumerate(moments):
+            DataType, Scale, Offset, BinLength = MOMENTS[key]
+            code = _codes(1, nbins, isweep * 10 + imoment, 256 if BinLength == 1 else 40000)[0] + iray
+            body += struct.pack(_fmt(dtype_PA.RadialData()), DataType, Scale, Offset, BinLength, 0, nbins * BinLength,
+                                b"")
+            body += code.astype("u1" if BinLength == 1 else "<u2").tobytes()
+        state = 0 if iray == 0 else (2 if iray == nrays - 1 else 1)
+        buf += struct.pack(_fmt(dtype_PA.RadialHeader()), state, 0, count + 1, iray + 1, isweep + 1,
+                           iray * 360. / nrays, cuts['Elevation'][isweep], 1600000000, 0, len(body), len(moments),
+                           isweep, 0, 0, 0, b"")
+        buf += body
+    with open(path, "wb") as f:
+        f.write(bytes(buf))
+
+def write_sab(path, sweeps, record_size=2432):
+    """
+    :param sweeps: [(仰角, 径向数, "z"/"v"/"zv")], "z"只有反射率, "v"只有速度和谱宽
+    :param record_size: 2432(SA/SB), 4132或3132(CB)
+    """
+    nz, nv = {2432: (460, 920), 4132: (800, 1600), 3132: (600, 1200)}[record_size]
+    radial_header = _fmt(dtype_sab.RadialHeader())
+    out = bytearray()
+    count = 0
+    for isweep, (elevation, nrays, kind) in enumerate(sweeps):
+        for iray in range(nrays):
+            gz = nz if "z" in kind else 0
+            gv = nv if "v" in kind else 0
+            azimuth = (isweep * 37. + iray * 360. / nrays) % 360
+            record = bytearray(record_size)
+            head = struct.pack(radial_header, b"", 1, b"", (count * 50) % 86400000, 18000 + count // 2000, 1500,
+                               int(azimuth / 180. * 4096 * 8), iray + 1, _radial_state(isweep, iray, len(sweeps), nrays),
+                               int(elevation / 180. * 4096 * 8), isweep + 1, 0, 0, 1000, 250, gz, gv, 0, 0, 100,
+                               100 + nz, 100 + nz + nv, 2, 21, b"", 2000 + isweep * 100, b"")
+            record[:len(head)] = head
+            record[128:128 + nz] = _codes(1, nz, isweep, 256)[0].astype("u1").tobytes()
+            record[128 + nz:128 + nz + nv] = ((_codes(1, nv, isweep + 1, 256)[0] + iray) % 256).astype("u1").tobytes()
+            record[128 + nz + nv:128 + nz + 2 * nv] = ((_codes(1, nv, isweep + 2, 256)[0] + 2 * iray) % 256).astype(
+                "u1").tobytes()
+            out += record
+            count += 1
+    with open(path, "wb") as f:
+        f.write(bytes(out))
+
+def write_cc(path, nrays=(12, 13, 11), nbins=500):
+    """CINRAD/CC, 每根径向为dBZ, V, W各500个int16"""
+    nsweeps = len(nrays)
+    head = bytearray(1024)
+    values = [b"CINRADC", b"China", b"JS", b"Station", b"58238", b"CINRAD/CC", b"E", b"N", 118 * 3600000,
+              32 * 3600000, 50000, 0, 0, 20, 20, 5, 6, 1, 2, 3, 0, 20, 20, 5, 6, 1, 8, 3, 100 + nsweeps, 0, 0, 0, 0,
+              0, 0, 0, b""]
+    head1 = struct.pack(_fmt(dtype_cc.BaseDataHeader['RadarHeader1']), *values)
+    head[:len(head1)] = head1
+    cuts = np.zeros(30, dtype_cc.BaseDataHeader['CutConfigX30'])
+    cuts['usMaxV'][:nsweeps] = 1650
+    cuts['usMaxL'][:nsweeps] = 15000
+    cuts['usBindWidth'][:nsweeps] = 150
+    cuts['usBinNumber'][:nsweeps] = nbins
+    cuts['usRecordNumber'][:nsweeps] = nrays
+    cuts['usAngle'][:nsweeps] = np.arange(nsweeps) * 150 + 50
+    head[218:218 + 660] = cuts.tobytes()
+    head2 = struct.pack(_fmt(dtype_cc.BaseDataHeader['RadarHeader2']), b"", 0, 0, 53500, *([0] * 11),
+                        *([0] * 13), b"", 0, b"")
+    head[878:878 + len(head2)] = head2
+    out = bytearray(head)
+    for iray in range(sum(nrays)):
+        code = _codes(1, 1500, iray % 7, 1100)[0] - 400
+        code[(np.arange(1500) + iray) % 11 == 0] = -32768
+        out += code.astype("<i2").tobytes()
+    with open(path, "wb") as f:
+        f.write(bytes(out))
+
+def write_sc(path, nsweeps=2):
+    """CINRAD/SC, 每个sweep固定360根径向"""
+    head = bytearray(1024)
+    site = struct.pack(_fmt(dtype_sc.BaseDataHeader['RadarSite']), b"China", b"SC", b"st", b"56187", b"CINRAD/SC",
+                       b"E", b"N", 10400, 3060, 500000, 0, 0, 0)
+    head[:len(site)] = site
+    head[100:109] = b"CINRAD/SC"
+    param = struct.pack(_fmt(dtype_sc.BaseDataHeader['RadarObserationParam_1']), 100 + nsweeps, 2020, 5, 6, 7, 8, 9,
+                        0, 0, 0, 0, 0)
+    head[201:201 + len(param)] = param
+    layers = np.zeros(30, dtype_sc.BaseDataHeader['LayerParamX30'])
+    layers['MaxV'][:nsweeps] = 2500 + np.arange(nsweeps) * 100
+    layers['MaxL'][:nsweeps] = 15000
+    layers['binWidth'][:nsweeps] = 3000
+    layers['binnumber'][:nsweeps] = 500
+    layers['recordnumber'][:nsweeps] = 360
+    layers['Swangles'][:nsweeps] = np.arange(nsweeps) * 150 + 50
+    head[217:217 + 630] = layers.tobytes()
+    param = struct.pack(_fmt(dtype_sc.BaseDataHeader['RadarObserationParam_2']), 0, 0, 0, 2020, 5, 6, 7, 14, 9, 0)
+    head[847:847 + len(param)] = param
+    out = bytearray(head)
+    for isweep in range(nsweeps):
+        elevation = int((isweep * 1.5 + 0.5) / 180. * 65536 / 2)
+        codes = _codes(360, 2000, isweep, 256).astype("u1")
+        for iray in range(360):
+            record = bytearray(4000)
+            record[:8] = struct.pack("<4H", iray * 182, elevation, iray * 182 + 182, elevation)
+            record[8:2008] = codes[iray].tobytes()
+            out += record
+    with open(path, "wb") as f:
+        f.write(bytes(out))
+
+##测试用的体扫: 文件名 -> (生成函数, 参数)
+_DUAL_POL = {'dBT': 200, 'dBZ': 200, 'V': 400, 'W': 400, 'ZDR': 400, 'CC': 400, 'PhiDP': 400, 'KDP': 400}
+VOLUMES = {
+    "Z_RADR_I_Z9250_20200101000000_O_DOR_SAD_CAP_FMT.bin":
+        (write_wsr98d, dict(sweeps=[(0.5, 20, {'dBT': 200, 'dBZ': 200}), (0.5, 21, {'V': 400, 'W': 400}),
+                                    (1.5, 20, _DUAL_POL), (2.4, 19, _DUAL_POL)])),
+    "Z_RADR_I_Z9571_20200101000000_O_DOR_SAD_CAP_VCP26.bin":
+        (write_wsr98d, dict(sweeps=[(0.5, 18, {'dBZ': 300}), (0.5, 19, {'V': 300, 'W': 300}),
+                                    (1.5, 18, {'dBZ': 300, 'V': 300, 'W': 300}), (1.0, 17, {'dBZ': 300})],
+                            task_name=b"VCP26D", log_resolution=1000, doppler_resolution=250)),
+    "Z_RADR_I_Z0001_20200521191950_O_DOR_DXK_CAR.bin": (write_pa, dict()),
+    "Z_RADR_I_Z0002_20200521191950_O_DOR_DXK_CAR.bin": (write_pa, dict(nrays=13, interleave=True)),
+    "Z_RADR_I_Z9250_20160701000000_O_DOR_SA_CAP.bin":
+        (write_sab, dict(sweeps=[(0.5, 12, "z"), (0.5, 13, "v"), (1.45, 12, "zv"), (2.4, 11, "zv")])),
+    "Z_RADR_I_Z9200_20160701000000_O_DOR_CB_CAP.bin":
+        (write_sab, dict(sweeps=[(0.5, 10, "z"), (0.5, 11, "v"), (2.4, 10, "zv")], record_size=4132)),
+    "Z_RADR_I_Z9070_20160701000000_O_DOR_CC_CAP.bin": (write_cc, dict()),
+    "Z_RADR_I_Z9280_20160701000000_O_DOR_SC_CAP.bin": (write_sc, dict()),
+}
+
+def make_volume(directory, name):
+    """
+    生成VOLUMES中的一个文件
+    :return: 文件路径
+    """
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        writer, kwargs = VOLUMES[name]
+        writer(path, **kwargs)
+    return path
+
+def make_compressed(path, compress, members=1):
+    """
+    :param compress: "bz2"或"gz"
+    :param members: 分成几个独立压缩的流/成员后拼接(bgzip, pigz, pbzip2的输出)
+    :return: 压缩后的文件路径
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+    step = -(-len(raw) // members)
+    compressor = bz2.compress if compress == "bz2" else gzip.compress
+    out = path + "." + compress
+    with open(out, "wb") as f:
+        for start in range(0, len(raw), step):
+            f.write(compressor(raw[start:start + step]))
+    return out
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import gc
+import mmap
+import os
+import numpy as np
+import pytest
+import synthetic
+from compare import assert_same_radar
+from pycwr.core.NRadar import ScanInfo
+from pycwr.io import batch, read_auto, read_many
+
+WSR98D = "Z_RADR_I_Z9250_20200101000000_O_DOR_SAD_CAP_FMT.bin"
+SAB = "Z_RADR_I_Z9250_20160701000000_O_DOR_SA_CAP.bin"
+
+def test_read_many_header_only(volume):
+    files = [volume(WSR98D), volume(SAB)]
+    results = {filename: (info, error) for filename, info, error in read_many(files, workers=2, header_only=True)}
+    assert set(results) == set(files)
+    for filename in files:
+        info, error = results[filename]
+        assert error is None
+        assert isinstance(info, ScanInfo)
+        expected = read_auto(filename, header_only=True)
+        assert info.nsweeps == expected.nsweeps
+        np.testing.assert_array_equal(info.fixed_angle, expected.fixed_angle)
+        np.testing.assert_array_equal(info.rays_per_sweep, expected.rays_per_sweep)
+
+def test_read_many_reports_errors(volume, tmp_path):
+    bad = tmp_path / "Z_RADR_I_Z9250_20200101000000_O_DOR_SAD_CAP_FMT.bin"
+    bad.write_bytes(b"\x00" * 64)
+    results = {filename: (prd, error) for filename, prd, error in read_many([volume(WSR98D), str(bad)], workers=2)}
+    assert results[str(bad)][0] is None and results[str(bad)][1] is not None
+    prd, error = results[volume(WSR98D)]
+    assert error is None
+    expected = read_auto(volume(WSR98D))
+    for ppi, eppi in zip(prd.fields, expected.fields):
+        for key in eppi.data_vars:
+            np.testing.assert_array_equal(ppi[key].values, eppi[key].values)
+
+def test_read_many_shares_memory(volume):
+    [(filename, prd, error)] = list(read_many([volume(WSR98D)], workers=1))
+    assert error is None
+    base = prd.fields[0]["dBZ"].values.base
+    while isinstance(base, np.ndarray):
+        base = base.base
+    assert isinstance(base, mmap.mmap)  ##直接指向共享内存, 没有复制
+    assert not base.closed
+    del prd
+    gc.collect()
+    assert base.closed  ##PRD释放后解除映射
+
+def test_read_many_pyart(volume):
+    files = [volume(name) for name in synthetic.VOLUMES]
+    for filename, prd, error in read_many(files, workers=2, packed=True):
+        assert error is None
+        assert_same_radar(prd.ToPyartRadar(), read_auto(filename, packed=True).ToPyartRadar())
+
+def test_read_many_bounds_in_flight(volume, monkeypatch):
+    submitted = []
+
+    class Executor(batch.ProcessPoolExecutor):
+        def submit(self, fn, *args, **kwargs):
+            submitted.append(args[0])
+            return super(Executor, self).submit(fn, *args, **kwargs)
+
+    monkeypatch.setattr(batch, "ProcessPoolExecutor", Executor)
+    files = [volume(name) for name in synthetic.VOLUMES]
+    results = read_many(iter(files), workers=1)
+    filename, prd, error = next(results)
+    assert error is None and len(submitted) == 2  ##最多2*workers个文件在解码或等待取走
+    del prd
+    assert sorted(name for name, _, _ in results) == sorted(set(files) - {filename})
+    assert submitted == files
+
+@pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="需要/dev/shm")
+def test_read_many_close_frees_shared(volume):
+    before = set(os.listdir("/dev/shm"))
+    results = read_many([volume(name) for name in synthetic.VOLUMES], workers=2)
+    next(results)
+    results.close()  ##提前退出, 已完成但没有取走的结果也要释放
+    gc.collect()
+    assert set(os.listdir("/dev/shm")) - before == set()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import numpy as np
+import pytest
+import pycwr.io
+from compare import assert_same_snapshot
+from make_baseline import snapshot
+from pycwr.io import read_auto, ReadCache
+
+WSR98D = "Z_RADR_I_Z9250_20200101000000_O_DOR_SAD_CAP_FMT.bin"
+SAB = "Z_RADR_I_Z9250_20160701000000_O_DOR_SA_CAP.bin"
+PREFIXES = ("sitename", "sweep", "scan_info", "pyart")
+
+def test_cache_hit_and_miss(volume, tmp_path, monkeypatch):
+    filename = str(tmp_path / WSR98D)
+    shutil.copy(volume(WSR98D), filename)
+    cache = ReadCache(str(tmp_path / "cache"))
+    expected = snapshot(read_auto(filename), product=False)
+    assert_same_snapshot(snapshot(cache.read(filename), product=False), expected, PREFIXES)
+    assert len(cache.entries()) == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError("cache miss")
+
+    monkeypatch.setattr(pycwr.io, "read_auto", fail)  ##命中时不再解码
+    assert_same_snapshot(snapshot(cache.read(filename), product=False), expected, PREFIXES)
+    with pytest.raises(AssertionError):  ##读取参数不同
+        cache.read(filename, fields=["dBZ"])
+    shutil.copy(volume(SAB), filename)  ##文件内容变化
+    with pytest.raises(AssertionError):
+        cache.read(filename)
+
+def test_cache_packed_and_directory(volume, tmp_path):
+    directory = str(tmp_path / "cache")
+    for _ in range(2):
+        prd = read_auto(volume(WSR98D), packed=True, cache=directory)
+        assert prd._packed_field(0, "dBZ") is not None
+    assert len(ReadCache(directory).entries()) == 1
+    read_auto(volume(WSR98D), header_only=True, cache=directory)  ##只读头信息时不使用缓存
+    assert len(ReadCache(directory).entries()) == 1
+
+def test_cache_corrupted_entry(volume, tmp_path):
+    cache = ReadCache(str(tmp_path / "cache"))
+    key = cache.key(volume(WSR98D), {})
+    os.makedirs(os.path.dirname(cache.path(key)))
+    with open(cache.path(key), "wb") as f:
+        f.write(b"\x00" * 64)
+    assert cache.get(key) is None
+    expected = snapshot(read_auto(volume(WSR98D)), product=False)
+    assert_same_snapshot(snapshot(cache.read(volume(WSR98D)), product=False), expected)
+    assert cache.get(key) is not None
+
+def test_cache_eviction(volume, tmp_path):
+    cache = ReadCache(str(tmp_path / "cache"))
+    keys = []
+    for itime, options in enumerate([{}, {"fields": ["dBZ"]}, {"packed": True}]):
+        keys.append(cache.key(volume(WSR98D), options))
+        cache.put(keys[-1], read_auto(volume(WSR98D), **options))
+        os.utime(cache.path(keys[-1]), ns=(itime * 10 ** 9, itime * 10 ** 9))
+    sizes = [os.path.getsize(cache.path(key)) for key in keys]
+    assert cache.get(keys[0]) is not None  ##命中后为最近使用
+    cache.max_bytes = sizes[0] + sizes[2]
+    cache.evict()  ##删除最久未使用的条目
+    assert [os.path.exists(cache.path(key)) for key in keys] == [True, False, True]
+    cache.max_bytes = 0
+    cache.put(keys[1], read_auto(volume(WSR98D), fields=["dBZ"]))
+    assert cache.entries() == []
+
+def test_cache_array_options(volume, tmp_path):
+    ##np.ndarray/tuple的参数与list相同, 使用缓存时接受的参数与不使用时相同
+    cache = ReadCache(str(tmp_path / "cache"))
+    filename = volume(WSR98D)
+    for sweeps in ([0, 1], (0, 1), np.array([0, 1]), [np.int64(0), np.int64(1)]):
+        expected = snapshot(read_auto(filename, sweeps=sweeps), product=False)
+        assert_same_snapshot(snapshot(read_auto(filename, sweeps=sweeps, cache=cache), product=False), expected)
+    for elevation_range in ((0., 1.), np.array([0., 1.]), [np.float32(0.), 1.]):
+        read_auto(filename, elevation_range=elevation_range, cache=cache)
+    assert len(cache.entries()) == 2
+    assert cache.key(filename, {"fields": ("dBZ",)}) == cache.key(filename, {"fields": np.array(["dBZ"])})
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+import bz2
+import gzip
+import numpy as np
+import pytest
+from pycwr.io import util
+
+def brute_force_find(data, magic):
+    bits = np.unpackbits(np.frombuffer(data, dtype="u1"))
+    pattern = np.unpackbits(np.frombuffer(magic.to_bytes(6, "big"), dtype="u1"))
+    return [pos for pos in range(len(bits) - 47) if np.array_equal(bits[pos:pos + 48], pattern)]
+
+def plant(data, magic, pos):
+    """在data的第pos个bit处写入48 bit的标志"""
+    value = int.from_bytes(data, "big")
+    nbits = len(data) * 8
+    shift = nbits - pos - 48
+    value = value & ~(((1 << 48) - 1) << shift) | (magic << shift)
+    return value.to_bytes(len(data), "big")
+
+@pytest.mark.parametrize("window", [8, 16, 1 << 20])
+def test_find_bit_magic(monkeypatch, window):
+    monkeypatch.setattr(util, "_MAGIC_WINDOW", window)
+    data = np.random.default_rng(0).integers(0, 256, 100, dtype="u1").tobytes()
+    ##按字节对齐, 跨窗口, 在开头和结尾的标志
+    for pos in [0, 61, 120, 127, 128, 333, 800 - 48]:
+        data = plant(data, util._BZ2_BLOCK_MAGIC, pos)
+    expected = brute_force_find(data, util._BZ2_BLOCK_MAGIC)
+    assert {0, 61, 333, 800 - 48} <= set(expected)
+    assert util._find_bit_magic(data, util._BZ2_BLOCK_MAGIC) == expected
+
+def test_parallel_decompress(monkeypatch):
+    monkeypatch.setattr(util, "_PARALLEL_MIN_SIZE", 0)
+    rng = np.random.default_rng(0)
+    raw = (np.cumsum(rng.integers(-2, 3, size=3 * 100000)) % 256).astype("u1").tobytes()
+    ##多个压缩块(blocksize=1为100k)和多个数据流/member
+    bz2_data = bz2.compress(raw[:200000], 1) + bz2.compress(raw[200000:], 1)
+    gzip_data = b"".join(gzip.compress(raw[i:i + 70000]) for i in range(0, len(raw), 70000))
+    for workers in [1, 2, 4]:
+        assert util._parallel_bz2_decompress(bz2_data, workers) == raw
+        assert util._parallel_gzip_decompress(gzip_data, workers) == raw
+    ##不完整的数据与标准库一样报错
+    with pytest.raises((OSError, EOFError, ValueError)):
+        util._parallel_bz2_decompress(bz2_data[:-100], 2)
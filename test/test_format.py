@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+import shutil
+import pytest
+import synthetic
+from pycwr.io import radar_format
+
+CC = "Z_RADR_I_Z9070_20160701000000_O_DOR_CC_CAP.bin"
+SC = "Z_RADR_I_Z9280_20160701000000_O_DOR_SC_CAP.bin"
+
+@pytest.mark.parametrize("name, expected", [(CC, "CC"), (SC, "SC")])
+@pytest.mark.parametrize("compress", ["gz", "bz2"])
+@pytest.mark.parametrize("members", [1, 3])
+def test_radar_format_compressed(volume, tmp_path, name, expected, compress, members):
+    path = str(tmp_path / "volume.bin")  ##文件名中没有站号, 只能由文件头判断
+    shutil.copy(volume(name), path)
+    assert radar_format(synthetic.make_compressed(path, compress, members)) == expected
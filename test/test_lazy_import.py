@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+检查import pycwr.io不会导入绘图/界面的依赖(matplotlib, cartopy, PyQt5), 站点表和省界在第一次用到时才读取
+每项检查在新的python进程中导入, 不受当前进程已导入模块的影响
+usage: python test_lazy_import.py
+"""
+import subprocess
+import sys
+
+PLOTTING = ["matplotlib", "cartopy", "PyQt5"]
+
+CODE = """
+import sys
+%s
+print(" ".join(name for name in %r if name in sys.modules))
+"""
+
+def loaded_modules(statement, names=PLOTTING):
+    """
+    :return: 在新的进程中执行statement后, names中已被导入的模块
+    """
+    out = subprocess.run([sys.executable, "-c", CODE % (statement, names)], capture_output=True, text=True,
+                         check=True).stdout.split()
+    return out
+
+def test_io_does_not_import_plotting():
+    for statement in ["import pycwr", "import pycwr.io", "from pycwr.io import read_auto"]:
+        loaded = loaded_modules(statement)
+        assert not loaded, "%s imported %s" % (statement, ", ".join(loaded))
+
+def test_draw_is_loaded_on_access():
+    assert loaded_modules("import pycwr; pycwr.draw.SingleRadarPlot", ["matplotlib"]) == ["matplotlib"]
+    ##绘图模块单独导入时也要注册色标
+    assert loaded_modules("import pycwr.draw.VerticalSectionPlot, matplotlib.cm; matplotlib.cm.get_cmap('CN_ref')",
+                          ["matplotlib"]) == ["matplotlib"]
+
+def test_location_resources_are_loaded_on_access():
+    ##pandas由xarray导入, 只能单独检查location_config
+    assert loaded_modules("import pycwr.configure.location_config", ["pandas"]) == []
+    resources = "[name for name in ('radar_info', 'station_index', 'CN_shp_info') if name in vars(location_config)]"
+    statement = "import pycwr.io; from pycwr.configure import location_config; assert %s == []" % resources
+    assert loaded_modules(statement, ["cartopy.io.shapereader"]) == []
+    ##station_index不需要pandas
+    statement = "from pycwr.configure import location_config as lc; index = lc.station_index; " \
+                "assert lc.station_index is index and 'radar_info' not in vars(lc)"
+    assert loaded_modules(statement, ["pandas"]) == []
+    statement = "from pycwr.configure import location_config as lc; info = lc.radar_info; " \
+                "assert lc.radar_info is info and vars(lc)['radar_info'] is info"
+    assert loaded_modules(statement, ["pandas"]) == ["pandas"]
+    statement = "from pycwr.configure import location_config as lc; shp = lc.CN_shp_info; assert lc.CN_shp_info is shp"
+    assert loaded_modules(statement, ["cartopy.io.shapereader"]) == ["cartopy.io.shapereader"]
+
+if __name__ == "__main__":
+    test_io_does_not_import_plotting()
+    test_draw_is_loaded_on_access()
+    test_location_resources_are_loaded_on_access()
+    print("OK")
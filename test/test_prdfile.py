@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+import synthetic
+from compare import assert_same_radar
+from pycwr.io import read_auto, load_prd
+
+def assert_same_prd(prd, expected):
+    assert prd.sitename == expected.sitename
+    assert prd.nsweeps == expected.nsweeps and prd.nrays == expected.nrays
+    for key in expected.scan_info.data_vars:
+        np.testing.assert_array_equal(prd.scan_info[key].values, expected.scan_info[key].values, err_msg=key)
+    for ppi, eppi in zip(prd.fields, expected.fields):
+        assert list(ppi.data_vars) == list(eppi.data_vars)
+        for key in list(eppi.data_vars) + ["time", "range", "azimuth", "elevation", "x", "y", "z", "lat", "lon"]:
+            np.testing.assert_array_equal(ppi[key].values, eppi[key].values, err_msg=key)
+
+@pytest.mark.parametrize("name", list(synthetic.VOLUMES))
+@pytest.mark.parametrize("packed", [False, True])
+def test_save_load_prd(volume, tmp_path, name, packed):
+    prd = read_auto(volume(name), packed=packed)
+    prd.save(str(tmp_path / "volume.prd"))
+    loaded = load_prd(str(tmp_path / "volume.prd"))
+    assert_same_prd(loaded, prd)
+    assert_same_prd(load_prd(str(tmp_path / "volume.prd"), mmap=False), prd)
+    if packed:  ##整型编码原样保存
+        for isweep, eppi in enumerate(prd.fields):
+            for key in eppi.data_vars:
+                if prd._packed_field(isweep, key) is not None:
+                    np.testing.assert_array_equal(loaded._packed_field(isweep, key).codes,
+                                                  prd._packed_field(isweep, key).codes)
+    assert_same_radar(loaded.ToPyartRadar(), prd.ToPyartRadar())
+
+def test_save_without_geolocation(volume, tmp_path):
+    prd = read_auto(volume("Z_RADR_I_Z9250_20160701000000_O_DOR_SA_CAP.bin"))
+    prd.save(str(tmp_path / "volume.prd"), geolocation=False)
+    assert_same_prd(load_prd(str(tmp_path / "volume.prd")), prd)
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+import mmap
+import shutil
+import pytest
+import numpy as np
+import synthetic
+from compare import assert_same_snapshot, load_baseline
+from make_baseline import snapshot
+import pycwr.io
+from pycwr.io import read_auto
+from pycwr.io.util import _prepare_for_read
+
+def test_buffer_reader_close(volume):
+    fid = _prepare_for_read(volume("Z_RADR_I_Z9250_20200101000000_O_DOR_SAD_CAP_FMT.bin"))
+    buf = fid.buf.obj
+    assert isinstance(buf, mmap.mmap)
+    fid.close()
+    assert buf.closed and fid.buf is None
+    fid.close()
+
+@pytest.mark.parametrize("name", list(synthetic.VOLUMES))
+@pytest.mark.parametrize("options", [{}, {"header_only": True}, {"packed": True}, {"sweeps": [0]},
+                                     {"fields": ["dBZ"]}])
+def test_reader_releases_file(volume, name, options):
+    ##读取的数据都已复制, close关闭mmap时不能有对文件内容的引用, 否则为BufferError
+    read_auto(volume(name), **options)
+
+@pytest.mark.parametrize("name", list(synthetic.VOLUMES))
+def test_read_auto_baseline(volume, name):
+    ##通过mmap零拷贝读取的结果与pycwr 0.4.0的解码结果一致
+    assert_same_snapshot(snapshot(read_auto(volume(name)), product=False), load_baseline(name))
+
+@pytest.mark.parametrize("name", list(synthetic.VOLUMES))
+@pytest.mark.parametrize("compress", ["gz", "bz2"])
+@pytest.mark.parametrize("members", [1, 3])
+def test_read_compressed_baseline(volume, tmp_path, name, compress, members):
+    ##解压一次后共享给格式识别与解码, 多成员/多流的文件完整解压
+    path = str(tmp_path / name)
+    shutil.copy(volume(name), path)
+    filename = synthetic.make_compressed(path, compress, members)
+    assert_same_snapshot(snapshot(read_auto(filename), product=False), load_baseline(name))
+
+@pytest.mark.parametrize("name", list(synthetic.VOLUMES))
+def test_header_only_baseline(volume, name):
+    info = read_auto(volume(name), header_only=True)
+    expected = load_baseline(name)
+    assert info.sitename == expected["sitename"]
+    assert info.scan_type == expected["scan_info/scan_type"]
+    for key in ["latitude", "longitude", "altitude", "frequency"]:
+        np.testing.assert_allclose(getattr(info, key), expected["scan_info/" + key], err_msg=key)
+    assert np.datetime64(info.end_time, "us").astype(np.int64) == expected["scan_info/end_time"]
+    ##ScanInfo中分开扫描的dBZ/V层未合并, 合并后只保留后一层(V)
+    keep = np.append(info.fixed_angle[:-1] != info.fixed_angle[1:], True)
+    for key in ["fixed_angle", "rays_per_sweep", "nyquist_velocity", "unambiguous_range"]:
+        np.testing.assert_allclose(getattr(info, key)[keep], expected["scan_info/" + key], err_msg=key)
+    assert info.nsweeps == len(info.fixed_angle) and info.nrays == info.rays_per_sweep.sum()
+    for isweep, nbins in enumerate(info.bins_per_sweep[keep]):
+        key = "sweep%d/V" % isweep
+        if nbins:
+            assert nbins == expected[key].shape[1]
+        else:  ##没有V的sweep
+            assert key not in expected or np.isnan(expected[key]).all()
+
+@pytest.mark.parametrize("name", list(synthetic.VOLUMES))
+@pytest.mark.parametrize("fields", [["dBZ"], ["V"], ["dBZ", "W"]])
+def test_read_fields_baseline(volume, name, fields):
+    ##只解码指定的要素, 结果与完整解码中的这些要素一致
+    expected = {key: value for key, value in load_baseline(name).items()
+                if not key.startswith("sweep") or key.split("/")[1] in fields + ["azimuth", "elevation", "range", "time"]}
+    assert_same_snapshot(snapshot(read_auto(volume(name), fields=fields), product=False), expected)
+
+def _selected_baseline(expected, info, selected, fields):
+    """
+    :param info: 文件的ScanInfo, sweep为文件中的顺序
+    :param selected: 选取的文件中的sweep序号
+    :param fields: 读取结果中的要素
+    :return: 完整解码结果中对应的sweep, 重新编号
+    """
+    keep = np.append(info.fixed_angle[:-1] != info.fixed_angle[1:], True)
+    iprd = np.unique((np.cumsum(keep) - keep)[selected])  ##分开扫描的dBZ/V两层合并为后一层
+    out = {}
+    for inew, isweep in enumerate(iprd):
+        for key in list(fields) + ["azimuth", "elevation", "range", "time"]:
+            out["sweep%d/%s" % (inew, key)] = expected["sweep%d/%s" % (isweep, key)]
+    return out
+
+@pytest.mark.parametrize("name", list(synthetic.VOLUMES))
+@pytest.mark.parametrize("options", [{"sweeps": [0]}, {"sweeps": [-1]}, {"sweeps": [1, 0]},
+                                     {"elevation_range": (0., 1.)}, {"elevation_range": (1., 3.)},
+                                     {"sweeps": [0, -1], "elevation_range": (1., 3.)}])
+def test_read_sweeps_baseline(volume, name, options):
+    ##只解码选取的sweep, 结果与完整解码中的这些sweep一致
+    filename = volume(name)
+    info = read_auto(filename, header_only=True)
+    selected = np.arange(info.nsweeps)
+    if "sweeps" in options:
+        selected = np.unique(selected[options["sweeps"]])
+    if "elevation_range" in options:
+        angle = info.fixed_angle[selected]
+        selected = selected[(angle >= options["elevation_range"][0]) & (angle <= options["elevation_range"][1])]
+    if not selected.size:
+        with pytest.raises(AssertionError):
+            read_auto(filename, **options)
+        return
+    prd = read_auto(filename, **options)
+    baseline = load_baseline(name)
+    ##0.4.0只保留第一个sweep的要素, 只比较其中有的要素
+    fields = [key for key in prd.fields[0].data_vars if "sweep0/" + key in baseline]
+    result = {key: value for key, value in snapshot(prd, product=False).items()
+              if key.startswith("sweep") and key.split("/")[1] not in set(prd.fields[0].data_vars) - set(fields)}
+    assert_same_snapshot(result, _selected_baseline(baseline, info, selected, fields), prefixes=("sweep",))
+
+@pytest.mark.parametrize("name", list(synthetic.VOLUMES))
+@pytest.mark.parametrize("fraction", [0.02, 0.5, 0.97])
+@pytest.mark.parametrize("header_only", [False, True])
+def test_read_auto_closes_on_error(volume, tmp_path, monkeypatch, name, fraction, header_only):
+    ##不完整的文件解码出错时也要立即释放mmap
+    opened = []
+
+    def prepare_for_read(filename):
+        opened.append(_prepare_for_read(filename))
+        return opened[-1]
+
+    monkeypatch.setattr(pycwr.io, "_prepare_for_read", prepare_for_read)
+    with open(volume(name), "rb") as f:
+        raw = f.read()
+    filename = str(tmp_path / name)
+    with open(filename, "wb") as f:
+        f.write(raw[:int(len(raw) * fraction)])
+    try:
+        read_auto(filename, header_only=header_only)
+    except Exception:
+        pass
+    [fid] = opened
+    assert fid.buf is None
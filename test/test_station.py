@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+from pycwr.configure import location_config
+from pycwr.io.util import get_radar_info, get_radar_info_many, get_radar_sitename, _get_radar_type
+
+COLUMNS = ["Abbr.", "Name", "Longitude", "Latitude", "Elevation", "Datatype", "Frequency"]
+
+def expected_row(station_id):
+    """0.4.0中用pandas的站点表查找的结果, 找不到站点信息时为南京雷达(9250)"""
+    radar_info = location_config.radar_info
+    return radar_info.loc[station_id if station_id in radar_info.index else 9250]
+
+def is_missing(value):
+    return value is None or (isinstance(value, float) and np.isnan(value))
+
+def assert_same_value(value, expected, name):
+    """站点表中缺测的值为None或nan"""
+    if is_missing(expected):
+        assert is_missing(value), name
+    elif isinstance(expected, str):
+        assert value == expected, name
+    else:
+        np.testing.assert_equal(float(value), float(expected), err_msg=name)
+
+def test_station_index_matches_radar_info():
+    rows, columns = location_config.station_index
+    radar_info = location_config.radar_info
+    assert sorted(rows) == sorted(int(station_id) for station_id in radar_info.index)
+    assert set(COLUMNS) <= set(columns)
+    for station_id, row in rows.items():
+        for name in COLUMNS:
+            assert_same_value(columns[name][row], radar_info.loc[station_id, name], name)
+
+def test_get_radar_info_many():
+    station_ids = [int(station_id) for station_id in location_config.radar_info.index]
+    filenames = ["Z_RADR_I_Z%04d_20200101000000_O_DOR_SA_CAP.bin" % station_id for station_id in station_ids] + \
+                ["Z_RADR_I_Z0001_20200521191950_O_DOR_DXK_CAR.bin",  ##站点表中没有的站号
+                 "/data/radar/volume.bin"]  ##文件名中没有站号
+    info = get_radar_info_many(filenames)
+    np.testing.assert_array_equal(info["station_id"], station_ids + [1, -1])
+    np.testing.assert_array_equal(info["found"], [True] * len(station_ids) + [False, False])
+    for i, filename in enumerate(filenames):
+        row = expected_row(int(info["station_id"][i]))
+        for name in COLUMNS:
+            assert_same_value(info[name][i], row[name], name)
+        ##与逐个文件查找的结果一致
+        for value, name in zip(get_radar_info(filename), ["Latitude", "Longitude", "Elevation", "Frequency"]):
+            assert_same_value(value, info[name][i], name)
+        assert_same_value(get_radar_sitename(filename), info["Name"][i], "Name")
+    assert info["Name"][-1] == info["Name"][-2] == "NanJing"
+
+def test_get_radar_info_many_default():
+    info = get_radar_info_many(["Z_RADR_I_Z0001_20200521191950_O_DOR_DXK_CAR.bin", "volume.bin",
+                                "Z_RADR_I_Z9250_20200101000000_O_DOR_SA_CAP.bin"], default=9010)
+    assert list(info["Name"]) == ["BeiJing", "BeiJing", "NanJing"]
+    assert list(info["found"]) == [False, False, True]
+    with pytest.raises(KeyError):  ##默认站号也不在站点表中
+        get_radar_info_many(["volume.bin"], default=1)
+    assert {name: len(value) for name, value in get_radar_info_many([]).items()} == \
+           {name: 0 for name in ["station_id", "found"] + list(location_config.station_index[1])}
+
+def test_get_radar_type():
+    assert _get_radar_type("Z_RADR_I_Z9250_20200101000000_O_DOR_SA_CAP.bin") == "SAB"
+    assert _get_radar_type("Z_RADR_I_Z9001_20200101000000_O_DOR_CC_CAP.bin") == "CC"
+    assert _get_radar_type("Z_RADR_I_Z0001_20200521191950_O_DOR_DXK_CAR.bin") is None
+    assert _get_radar_type("volume.bin") is None
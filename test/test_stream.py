@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import shutil
+import numpy as np
+import pytest
+import synthetic
+from pycwr.io import read_auto
+from pycwr.io.WSR98DFile import WSR98DStream, WSR98DBaseData
+
+WSR98D = "Z_RADR_I_Z9250_20200101000000_O_DOR_SAD_CAP_FMT.bin"
+
+def assert_same_sweeps(sweeps, filename):
+    """与一次读入整个文件的结果比较, 各sweep按文件中的顺序, 不合并"""
+    ref = WSR98DBaseData(filename)
+    assert len(sweeps) == ref.nsweeps
+    azimuth = ref.get_azimuth()
+    for isweep, (ppi, fields) in enumerate(zip(sweeps, ref.sweep_fields)):
+        assert ppi.attrs["sweep_number"] == isweep
+        np.testing.assert_array_equal(ppi.azimuth.values,
+                                      azimuth[ref.sweep_start_ray_index[isweep]:ref.sweep_end_ray_index[isweep] + 1])
+        assert set(ppi.data_vars) == set(fields)
+        for key, dat in fields.items():
+            nbins = min(dat.shape[1], ppi.sizes["range"])
+            np.testing.assert_array_equal(ppi[key].values[:, :nbins], dat[:, :nbins])
+
+def test_stream_feed(volume):
+    with open(volume(WSR98D), "rb") as f:
+        raw = f.read()
+    stream = WSR98DStream()
+    sweeps = []
+    rng = np.random.default_rng(0)
+    pos = 0
+    while pos < len(raw):
+        size = int(rng.integers(1, 5000))
+        sweeps += stream.feed(raw[pos:pos + size])
+        pos += size
+    assert stream.finished
+    assert_same_sweeps(sweeps, volume(WSR98D))
+
+@pytest.mark.parametrize("compress, members", [(None, 1), ("gz", 1), ("gz", 3), ("bz2", 1), ("bz2", 3)])
+def test_stream_poll(volume, tmp_path, compress, members):
+    source = volume(WSR98D)
+    if compress is not None:
+        shutil.copy(source, str(tmp_path / "volume.bin"))
+        source = synthetic.make_compressed(str(tmp_path / "volume.bin"), compress, members)
+    with open(source, "rb") as f:
+        data = f.read()
+    path = str(tmp_path / "growing")  ##文件名没有扩展名, 由文件头判断是否压缩
+    open(path, "wb").close()
+    stream = WSR98DStream()
+    sweeps = stream.poll(path)
+    for pos in range(0, len(data), 1000):
+        with open(path, "ab") as f:
+            f.write(data[pos:pos + 1000])
+        sweeps += stream.poll(path)
+    assert stream.finished
+    assert_same_sweeps(sweeps, volume(WSR98D))
+
+MISMATCHED = dict(sweeps=[(0.5, 12, {'dBT': 100, 'dBZ': 100, 'V': 400, 'W': 400}),
+                          (1.5, 13, {'dBZ': 90, 'V': 300, 'W': 300})], log_resolution=1000, doppler_resolution=250)
+
+@pytest.mark.parametrize("name", [WSR98D, "Z_RADR_I_Z9571_20200101000000_O_DOR_SAD_CAP_VCP26.bin", "mismatched"])
+def test_stream_matches_read_auto(volume, tmp_path, name):
+    ##LogResolution与DopplerResolution不同时dBZ插值到V的库, 与read_auto的sweep一致
+    if name == "mismatched":
+        filename = str(tmp_path / "Z_RADR_I_Z9250_20200101000000_O_DOR_SAD_CAP_FMT.bin")
+        synthetic.write_wsr98d(filename, **MISMATCHED)
+    else:
+        filename = volume(name)
+    with open(filename, "rb") as f:
+        sweeps = WSR98DStream().feed(f.read())
+    prd = read_auto(filename)
+    info = read_auto(filename, header_only=True)
+    ##dBZ和V分开扫描的两层在read_auto中合并为后一层, 只比较V的sweep中本层的要素
+    keep = np.append(info.fixed_angle[:-1] != info.fixed_angle[1:], True)
+    merged = np.append(False, ~keep[:-1])
+    for ppi, eppi in zip([ppi for ppi, ikeep in zip(sweeps, keep) if ikeep], prd.fields):
+        np.testing.assert_array_equal(ppi.range.values, eppi.range.values)
+        np.testing.assert_array_equal(ppi.azimuth.values, eppi.azimuth.values)
+        np.testing.assert_array_equal(ppi.time.values, eppi.time.values)
+        for key in set(ppi.data_vars) & set(eppi.data_vars):  ##read_auto只保留第一个sweep中的要素
+            if merged[ppi.attrs["sweep_number"]] and key in ("dBZ", "dBT"):
+                continue
+            np.testing.assert_array_equal(ppi[key].values, eppi[key].values, err_msg=key)
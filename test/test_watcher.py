@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import time
+from compare import assert_same_snapshot
+from make_baseline import snapshot
+from pycwr.core.NRadar import ScanInfo
+from pycwr.io import read_auto
+from pycwr.io.watcher import DirectoryWatcher
+
+WSR98D = "Z_RADR_I_Z9250_20200101000000_O_DOR_SAD_CAP_FMT.bin"
+SAB = "Z_RADR_I_Z9250_20160701000000_O_DOR_SA_CAP.bin"
+
+def drain(watcher, count, timeout=60.):
+    """轮询直到送出count个结果"""
+    results = []
+    deadline = time.monotonic() + timeout
+    while len(results) < count and time.monotonic() < deadline:
+        watcher.poll()
+        while not watcher.results.empty():
+            results.append(watcher.get())
+        time.sleep(0.05)
+    return results
+
+def test_watcher_settle(tmp_path):
+    filename = str(tmp_path / WSR98D)
+    watcher = DirectoryWatcher(str(tmp_path), settle=2.)
+    with open(filename, "wb") as f:
+        f.write(b"\x00" * 10)
+    assert watcher._complete_files(0.) == []  ##新文件
+    assert watcher._complete_files(1.) == []  ##大小和修改时间不变, 但还不到settle秒
+    with open(filename, "ab") as f:  ##仍在写入
+        f.write(b"\x00" * 10)
+    assert watcher._complete_files(2.5) == []
+    assert watcher._complete_files(4.) == []
+    [(name, size, mtime)] = watcher._complete_files(4.5)
+    assert name == filename and size == 20
+    open(str(tmp_path / SAB), "wb").close()  ##空文件不解码
+    assert watcher._complete_files(5.) == watcher._complete_files(10.) == [(name, size, mtime)]
+    os.remove(filename)
+    assert watcher._complete_files(11.) == [] and filename not in watcher._stat
+
+def test_watcher_dedup(volume, tmp_path):
+    filename = str(tmp_path / WSR98D)
+    shutil.copy(volume(WSR98D), filename)
+    (tmp_path / "other.txt").write_bytes(b"\x00" * 10)
+    watcher = DirectoryWatcher(str(tmp_path), pattern="*.bin", workers=1, settle=0.)
+    try:
+        [(name, prd, error)] = drain(watcher, 1)
+        assert name == filename and error is None
+        assert_same_snapshot(snapshot(prd, product=False), snapshot(read_auto(filename), product=False))
+        assert watcher.poll() == 0 and watcher.poll() == 0  ##同一文件只解码一次
+        with open(filename, "wb") as f:  ##文件被覆盖后重新解码
+            f.write(b"\x00" * 64)
+        [(name, prd, error)] = drain(watcher, 1)
+        assert name == filename and prd is None and error is not None
+    finally:
+        watcher.stop()
+
+def test_watcher_header_only_callback(volume, tmp_path):
+    results = []
+    watcher = DirectoryWatcher(str(tmp_path), workers=1, settle=0., header_only=True,
+                               callback=lambda *args: results.append(args))
+    shutil.copy(volume(SAB), str(tmp_path / SAB))
+    try:
+        deadline = time.monotonic() + 60.
+        while not results and time.monotonic() < deadline:
+            watcher.poll()
+            time.sleep(0.05)
+    finally:
+        watcher.stop()
+    [(name, info, error)] = results
+    assert name == str(tmp_path / SAB) and error is None and isinstance(info, ScanInfo)
+    assert watcher.results.empty()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+import synthetic
+from pycwr.configure.default_config import CINRAD_field_mapping
+from pycwr.io import read_auto, write_WSR98D
+from pycwr.io.CfRadialWriter import _packed_encoding
+
+WSR98D = ["Z_RADR_I_Z9250_20200101000000_O_DOR_SAD_CAP_FMT.bin", "Z_RADR_I_Z0001_20200521191950_O_DOR_DXK_CAR.bin"]
+
+def assert_same_sweeps(prd, expected):
+    """写入再读出的PRD与原来的一致"""
+    assert prd.nsweeps == expected.nsweeps
+    np.testing.assert_allclose(prd.scan_info.fixed_angle.values, expected.scan_info.fixed_angle.values)
+    np.testing.assert_allclose(prd.scan_info.nyquist_velocity.values, expected.scan_info.nyquist_velocity.values)
+    for ppi, eppi in zip(prd.fields, expected.fields):
+        np.testing.assert_allclose(ppi.azimuth.values, eppi.azimuth.values, rtol=1e-6)
+        np.testing.assert_allclose(ppi.elevation.values, eppi.elevation.values, rtol=1e-6)
+        np.testing.assert_allclose(ppi.range.values, eppi.range.values)
+        np.testing.assert_array_equal(ppi.time.values.astype("datetime64[us]"), eppi.time.values.astype("datetime64[us]"))
+        for key in eppi.data_vars:
+            np.testing.assert_array_equal(ppi[key].values, eppi[key].values, err_msg=key)
+
+@pytest.mark.parametrize("name", WSR98D)
+@pytest.mark.parametrize("packed", [False, True])
+@pytest.mark.parametrize("compress", [None, "gz", "bz2"])
+def test_write_WSR98D_round_trip(volume, tmp_path, name, packed, compress):
+    prd = read_auto(volume(name), packed=packed)
+    filename = str(tmp_path / "volume.bin")
+    write_WSR98D(prd, filename, compress=compress, site_code="Z9250")
+    ##要素按WSR98D的编码写入, 读出的值完全相同
+    assert_same_sweeps(read_auto(filename), prd)
+
+def test_write_WSR98D_union_of_fields(volume, tmp_path):
+    prd = read_auto(volume(WSR98D[0]))
+    prd.fields[0] = prd.fields[0].drop_vars("dBT")
+    prd.fields[-1] = prd.fields[-1].drop_vars("W")
+    filename = str(tmp_path / "volume.bin")
+    write_WSR98D(prd, filename)
+    back = read_auto(filename)
+    for ppi, eppi in zip(back.fields, prd.fields):
+        assert {"dBT", "W"} <= set(ppi.data_vars)
+        for key in ppi.data_vars:
+            if key in eppi.data_vars:
+                np.testing.assert_array_equal(ppi[key].values, eppi[key].values, err_msg=key)
+            else:  ##该sweep没有的要素写为缺测
+                assert np.isnan(ppi[key].values).all()
+
+def assert_same_cfradial(filename, prd, atol=0.):
+    """CfRadial文件中的径向和要素与PRD一致, 该sweep没有的要素和超出库数的部分为缺测"""
+    from netCDF4 import Dataset, num2date
+    with Dataset(filename) as ncfile:
+        start = ncfile["sweep_start_ray_index"][:]
+        end = ncfile["sweep_end_ray_index"][:]
+        np.testing.assert_allclose(ncfile["fixed_angle"][:], prd.scan_info.fixed_angle.values, rtol=1e-6)
+        ##由units解码为绝对时间
+        times = np.concatenate([ppi.time.values for ppi in prd.fields]).astype("datetime64[us]")
+        decoded = num2date(ncfile["time"][:], ncfile["time"].units, only_use_cftime_datetimes=False,
+                           only_use_python_datetimes=True)
+        np.testing.assert_array_equal(np.array(decoded, dtype="datetime64[us]"), times)
+        for ppi, istart, iend in zip(prd.fields, start, end):
+            rays = slice(istart, iend + 1)
+            np.testing.assert_allclose(ncfile["azimuth"][rays], ppi.azimuth.values, rtol=1e-6)
+            np.testing.assert_allclose(ncfile["elevation"][rays], ppi.elevation.values, rtol=1e-6)
+            for key in set().union(*[eppi.data_vars for eppi in prd.fields]):
+                value = ncfile[CINRAD_field_mapping[key]][rays]
+                mask = np.ma.getmaskarray(value)
+                if key not in ppi.data_vars:
+                    assert mask.all(), key
+                    continue
+                expected = ppi[key].values
+                nbins = expected.shape[1]
+                assert mask[:, nbins:].all(), key
+                np.testing.assert_array_equal(mask[:, :nbins], np.isnan(expected), err_msg=key)
+                np.testing.assert_allclose(value[:, :nbins].filled(np.nan), expected, rtol=1e-6, atol=atol,
+                                           equal_nan=True, err_msg=key)
+
+@pytest.mark.parametrize("name", list(synthetic.VOLUMES))
+@pytest.mark.parametrize("packed", [False, True])
+def test_to_cfradial_round_trip(volume, tmp_path, name, packed):
+    prd = read_auto(volume(name))
+    filename = str(tmp_path / "volume.nc")
+    prd.to_cfradial(filename, packed=packed, chunk_rays=7)
+    ##打包为int16时误差不超过scale_factor的一半
+    atol = max(_packed_encoding(prd, key)[0] for key in prd.fields[0].data_vars) / 2. if packed else 0.
+    assert_same_cfradial(filename, prd, atol=atol)
+
+def test_to_cfradial_union_of_fields(volume, tmp_path):
+    prd = read_auto(volume(WSR98D[0]))
+    prd.fields[0] = prd.fields[0].drop_vars("dBT")
+    prd.fields[-1] = prd.fields[-1].drop_vars("W")
+    filename = str(tmp_path / "volume.nc")
+    prd.to_cfradial(filename)
+    assert_same_cfradial(filename, prd)
+    prd.to_cfradial(filename, fields=["dBT"])
+    from netCDF4 import Dataset
+    with Dataset(filename) as ncfile:
+        assert [name for name in ncfile.variables if name in CINRAD_field_mapping.values()] == \
+               [CINRAD_field_mapping["dBT"]]